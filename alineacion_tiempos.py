@@ -0,0 +1,191 @@
+"""
+Alineación de tiempos de retención entre inyecciones
+Localiza en cada cromatograma los picos de referencia (heptano, estándar
+interno), ajusta una deformación lineal por tramos que los lleva a su tiempo
+nominal y corrige la columna Time antes de asignar las ventanas de rangos_tr.
+Un lote completo se alinea con operaciones matriciales sobre una tabla
+(inyecciones × picos), sin recorrer los picos uno a uno
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+BIBLIOTECA_PREDETERMINADA = Path(__file__).with_name('biblioteca_compuestos.json')
+
+# Búsqueda de cada pico de referencia alrededor de su tiempo nominal (min
+# antes, min después): se toma el pico de mayor área dentro de la ventana. El
+# heptano de Experimento3 sale en 0.88, así que su ventana es más amplia que
+# la tolerancia de identificación
+BUSQUEDA_REFERENCIAS = {
+    'heptano': (0.12, 0.13),
+    'estandar_interno': (0.16, 0.14)
+}
+
+
+def referencias_biblioteca(ruta=None):
+    """Tiempo nominal y ventana de búsqueda de cada referencia de alineación
+
+    Los tiempos nominales salen de la biblioteca de compuestos: el heptano
+    por nombre y el estándar interno por su clase.
+    """
+    with open(ruta or BIBLIOTECA_PREDETERMINADA, 'r', encoding='utf-8') as f:
+        compuestos = json.load(f)['compuestos']
+
+    referencias = {}
+    for compuesto in compuestos:
+        nombre = compuesto['nombre'] if compuesto['nombre'] in BUSQUEDA_REFERENCIAS else compuesto['clase']
+        if nombre in BUSQUEDA_REFERENCIAS:
+            antes, despues = BUSQUEDA_REFERENCIAS[nombre]
+            referencias[nombre] = {'tr': compuesto['tr'],
+                                   'ventana': (round(compuesto['tr'] - antes, 4), round(compuesto['tr'] + despues, 4))}
+    return referencias
+
+
+REFERENCIAS_ALINEACION = referencias_biblioteca()
+
+
+def matriz_lote(tablas, columna):
+    """Apila una columna de varias tablas de picos en una matriz
+    (inyecciones × picos) rellenada con NaN"""
+    longitudes = np.array([len(tabla) for tabla in tablas], dtype=int)
+    matriz = np.full((len(tablas), longitudes.max(initial=0)), np.nan)
+    if longitudes.sum() == 0:
+        return matriz
+
+    valores = np.concatenate([tabla[columna].to_numpy(dtype=float) for tabla in tablas])
+    filas = np.repeat(np.arange(len(tablas)), longitudes)
+    columnas = np.arange(len(valores)) - np.repeat(np.cumsum(longitudes) - longitudes, longitudes)
+    matriz[filas, columnas] = valores
+    return matriz
+
+
+class AlineadorTiempos:
+    def __init__(self, referencias=None):
+        """
+        Args:
+            referencias: {nombre: {'tr': tiempo nominal, 'ventana': (t_min, t_max)}};
+                por defecto REFERENCIAS_ALINEACION
+        """
+        referencias = referencias or REFERENCIAS_ALINEACION
+        self.referencias = dict(sorted(referencias.items(), key=lambda item: item[1]['tr']))
+        self.nominales = np.array([ref['tr'] for ref in self.referencias.values()], dtype=float)
+        self.ventanas = np.array([ref['ventana'] for ref in self.referencias.values()], dtype=float)
+
+    def parametros(self):
+        """Parámetros que determinan la corrección (para el manifiesto)"""
+        return {nombre: {'tr': ref['tr'], 'ventana': list(ref['ventana'])}
+                for nombre, ref in self.referencias.items()}
+
+    def anclas(self, tiempos, areas):
+        """Tiempo y área del pico de referencia de cada inyección
+
+        tiempos y areas son matrices (inyecciones × picos) con NaN de relleno.
+        Devuelve dos matrices (inyecciones × referencias); NaN si la ventana
+        de una referencia no tiene picos.
+        """
+        if tiempos.shape[1] == 0:
+            vacias = np.full((tiempos.shape[0], len(self.referencias)), np.nan)
+            return vacias, vacias.copy()
+
+        t = tiempos[:, :, None]
+        en_ventana = (t >= self.ventanas[:, 0]) & (t <= self.ventanas[:, 1])
+        candidatas = np.where(en_ventana, areas[:, :, None], -np.inf)
+
+        mejor = np.argmax(candidatas, axis=1)
+        encontrada = np.take_along_axis(candidatas, mejor[:, None, :], axis=1)[:, 0, :] > -np.inf
+        tiempos_ancla = np.where(encontrada, np.take_along_axis(tiempos, mejor, axis=1), np.nan)
+        areas_ancla = np.where(encontrada, np.take_along_axis(areas, mejor, axis=1), np.nan)
+        return tiempos_ancla, areas_ancla
+
+    def completar_anclas(self, observados):
+        """Rellena las referencias no encontradas con el desplazamiento medio
+        de las demás (o cero) y anula la corrección de las inyecciones cuyas
+        anclas no quedan en el mismo orden que los tiempos nominales"""
+        desplazamientos = observados - self.nominales
+        encontradas = ~np.isnan(desplazamientos)
+        cuenta = encontradas.sum(axis=1, keepdims=True)
+        medio = np.where(encontradas, desplazamientos, 0.0).sum(axis=1, keepdims=True) / np.maximum(cuenta, 1)
+
+        completos = self.nominales + np.where(encontradas, desplazamientos, medio)
+        desordenadas = (np.diff(completos, axis=1) <= 0).any(axis=1)
+        completos[desordenadas] = self.nominales
+        return completos
+
+    def registro_anclas(self, observados):
+        """{referencia: tiempo observado} de una inyección (None si no se encontró)"""
+        return {ref: (None if np.isnan(t) else round(float(t), 4))
+                for ref, t in zip(self.referencias, observados)}
+
+    def corregir(self, tiempos, observados):
+        """Aplica la deformación lineal por tramos de cada inyección
+
+        Entre dos anclas consecutivas el tiempo se interpola linealmente;
+        antes de la primera y después de la última se aplica el
+        desplazamiento de esa ancla, sin extrapolar la pendiente (la deriva
+        de un tramo de 7 min amplificada hasta los glicéridos los movería de
+        ventana). Con una sola referencia la corrección es un desplazamiento
+        constante.
+        """
+        anclas = self.completar_anclas(observados)
+        if anclas.shape[1] == 1:
+            return tiempos + (self.nominales[0] - anclas[:, :1])
+
+        tramo = (tiempos[:, :, None] >= anclas[:, None, :]).sum(axis=2)
+        tramo = np.clip(tramo, 1, anclas.shape[1] - 1)
+
+        o0 = np.take_along_axis(anclas, tramo - 1, axis=1)
+        o1 = np.take_along_axis(anclas, tramo, axis=1)
+        r0 = self.nominales[tramo - 1]
+        r1 = self.nominales[tramo]
+        interpolados = r0 + (tiempos - o0) * (r1 - r0) / (o1 - o0)
+
+        antes = tiempos < anclas[:, :1]
+        despues = tiempos > anclas[:, -1:]
+        interpolados = np.where(antes, tiempos + (self.nominales[0] - anclas[:, :1]), interpolados)
+        return np.where(despues, tiempos + (self.nominales[-1] - anclas[:, -1:]), interpolados)
+
+    def alinear(self, tablas):
+        """Alinea un lote de tablas de picos {muestra: DataFrame}
+
+        Devuelve las tablas con Time corregido (copias) y, por muestra, el
+        tiempo observado de cada referencia (None si no se encontró).
+        """
+        nombres = list(tablas)
+        if not nombres:
+            return {}, {}
+
+        lista = [tablas[nombre] for nombre in nombres]
+        tiempos = matriz_lote(lista, 'Time')
+        observados, _ = self.anclas(tiempos, matriz_lote(lista, 'Area'))
+        corregidos = self.corregir(tiempos, observados)
+
+        alineadas = {}
+        anclas = {}
+        for i, (nombre, tabla) in enumerate(zip(nombres, lista)):
+            tabla = tabla.copy()
+            tabla['Time'] = corregidos[i, :len(tabla)]
+            alineadas[nombre] = tabla
+            anclas[nombre] = self.registro_anclas(observados[i])
+
+        return alineadas, anclas
+
+
+def anclas_por_bloques(bloques, alineadores):
+    """Anclas de una sola inyección leída por bloques (tablas con Time y Area)
+
+    Recorre los bloques una vez y conserva, para cada alineador y cada
+    referencia, el pico de mayor área entre todos los bloques. Devuelve una
+    matriz (1 × referencias) por alineador, lista para corregir().
+    """
+    mejores_t = [np.full((1, len(a.referencias)), np.nan) for a in alineadores]
+    mejores_a = [np.full((1, len(a.referencias)), -np.inf) for a in alineadores]
+    for bloque in bloques:
+        tiempos, areas = matriz_lote([bloque], 'Time'), matriz_lote([bloque], 'Area')
+        for i, alineador in enumerate(alineadores):
+            t, a = alineador.anclas(tiempos, areas)
+            mejora = np.nan_to_num(a, nan=-np.inf) > mejores_a[i]
+            mejores_t[i] = np.where(mejora, t, mejores_t[i])
+            mejores_a[i] = np.where(mejora, a, mejores_a[i])
+    return mejores_t
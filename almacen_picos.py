@@ -0,0 +1,128 @@
+"""
+Almacén columnar de picos cromatográficos
+Guarda la tabla de picos de todas las inyecciones en Parquet particionado por
+experimento (Procesados/picos/experiment=ExperimentoN/picos.parquet), con tipos
+compactos y sin las celdas de cálculo de la hoja, para leerla con filtros
+por experimento, muestra y rango de tiempo de retención
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+# Esquema del almacén. El área se guarda en float64 para que las métricas
+# calculadas desde el almacén coincidan con las calculadas desde los CSV.
+ESQUEMA = {
+    'sample': 'string',
+    'index': 'int32',
+    'time': 'float32',
+    'height': 'float32',
+    'area': 'float64',
+    'area_pct': 'float32'
+}
+
+# Columnas de la exportación del equipo que alimentan el almacén
+COLUMNAS_ORIGEN = {
+    'Index': 'index',
+    'Time': 'time',
+    'Height': 'height',
+    'Area': 'area',
+    'Area %': 'area_pct'
+}
+
+# Los tiempos se reportan con dos decimales; al leer se redondean para
+# deshacer el error de representación de float32 (8.6 -> 8.6000004)
+DECIMALES_TIEMPO = 6
+
+
+def tabla_picos(df, muestra):
+    """Convierte la hoja exportada de una muestra en filas tipadas del almacén
+
+    Se conservan solo las filas con Time y Area numéricos, igual que al
+    procesar el CSV (se descartan la fila de unidades y la fila Total).
+    """
+    tabla = pd.DataFrame(index=df.index)
+    for origen, destino in COLUMNAS_ORIGEN.items():
+        if origen in df.columns:
+            tabla[destino] = pd.to_numeric(df[origen], errors='coerce')
+        else:
+            tabla[destino] = np.nan
+
+    tabla = tabla[pd.notna(tabla['time']) & pd.notna(tabla['area'])]
+    tabla['index'] = tabla['index'].fillna(-1)
+    tabla.insert(0, 'sample', muestra)
+
+    return tabla.astype(ESQUEMA).reset_index(drop=True)
+
+
+def ruta_particion(directorio_almacen, experimento):
+    """Archivo Parquet de la partición de un experimento"""
+    return Path(directorio_almacen) / f'experiment={experimento}' / 'picos.parquet'
+
+
+def escribir_particion(directorio_almacen, experimento, tablas):
+    """Escribe (reemplazando) la partición de un experimento y devuelve su ruta"""
+    if not PYARROW_DISPONIBLE:
+        raise ImportError("Se requiere pyarrow para escribir el almacén de picos")
+
+    ruta = ruta_particion(directorio_almacen, experimento)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+
+    if tablas:
+        picos = pd.concat(tablas, ignore_index=True)
+    else:
+        picos = pd.DataFrame({col: pd.Series(dtype=tipo) for col, tipo in ESQUEMA.items()})
+
+    picos.to_parquet(ruta, index=False, compression='zstd')
+    return ruta
+
+
+def almacen_disponible(directorio_almacen):
+    """Indica si existe un almacén legible en el directorio"""
+    return PYARROW_DISPONIBLE and Path(directorio_almacen).is_dir() \
+        and any(Path(directorio_almacen).glob('experiment=*/picos.parquet'))
+
+
+def leer_picos(directorio_almacen, experimento=None, muestras=None, t_min=None, t_max=None):
+    """Lee picos del almacén filtrando por experimento, muestras y rango de tiempo
+
+    Los filtros se envían a pyarrow, que descarta particiones y grupos de
+    filas completos antes de leerlos.
+    """
+    if not PYARROW_DISPONIBLE:
+        raise ImportError("Se requiere pyarrow para leer el almacén de picos")
+
+    filtros = []
+    if experimento is not None:
+        filtros.append(('experiment', '==', experimento))
+    if muestras is not None:
+        filtros.append(('sample', 'in', list(muestras)))
+    if t_min is not None:
+        filtros.append(('time', '>=', np.float32(t_min) - np.float32(1e-4)))
+    if t_max is not None:
+        filtros.append(('time', '<=', np.float32(t_max) + np.float32(1e-4)))
+
+    picos = pd.read_parquet(directorio_almacen, filters=filtros or None)
+    picos['experiment'] = picos['experiment'].astype(str)
+    picos['time'] = picos['time'].astype('float64').round(DECIMALES_TIEMPO)
+
+    # El margen de float32 en los filtros se corrige aquí con los tiempos redondeados
+    if t_min is not None:
+        picos = picos[picos['time'] >= t_min]
+    if t_max is not None:
+        picos = picos[picos['time'] <= t_max]
+
+    return picos.reset_index(drop=True)
+
+
+def a_formato_exportacion(picos):
+    """Renombra columnas del almacén al formato de la exportación (Time, Area, ...)"""
+    renombres = {destino: origen for origen, destino in COLUMNAS_ORIGEN.items()}
+    return picos.rename(columns=renombres)
@@ -4,11 +4,15 @@ Análisis sistemático de cromatogramas de biodiesel
 Objetivo: Reconstruir la secuencia histórica de experimentos
 """
 
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import json
 
+from calculos_hoja import cargar_calculos, calculos_muestra
+from cinetica import minutos_muestreo
+from descubrimiento_lotes import DescubridorLotes
+from registro_experimentos import NOMBRE_REGISTRO, cargar_registro, experimentos_activos, nombre_muestra
+
 class AnalizadorCromatogramas:
     def __init__(self, base_dir):
         self.base_dir = Path(base_dir)
@@ -144,23 +148,60 @@ class AnalizadorCromatogramas:
             'MORAN_07Nov2025': moran3
         }
 
+        self.agregar_lotes_descubiertos()
+        self.agregar_tiempos_muestreo()
+
+    def agregar_tiempos_muestreo(self):
+        """Añade 'tiempo_min' (minutos desde el inicio, None si no consta) a cada muestra"""
+        for exp in self.experimentos.values():
+            muestras = exp['muestras']
+            minutos = minutos_muestreo([m.get('tiempo') for m in muestras], [m.get('tipo') for m in muestras])
+            for muestra, tiempo_min in zip(muestras, minutos):
+                muestra['tiempo_min'] = float(tiempo_min) if tiempo_min == tiempo_min else None
+
+    def agregar_lotes_descubiertos(self):
+        """Incorpora las carpetas de lote que no están descritas arriba"""
+        conocidos = {exp['directorio'] for exp in self.experimentos.values()}
+
+        for lote in DescubridorLotes(self.base_dir).escanear():
+            if lote['directorio'] in conocidos:
+                continue
+
+            self.experimentos[f"Lote_{lote['directorio'].split('_')[0]}"] = {
+                'fecha': lote['fecha'],
+                'nombre': f"Lote {lote['directorio']} (descubierto automáticamente)",
+                'directorio': lote['directorio'],
+                'muestras': [{'nombre': Path(pdf).stem, 'tipo': 'Sin clasificar'} for pdf in lote['pdfs']],
+                'archivos_excel': lote['libros'][0] if len(lote['libros']) == 1 else lote['libros'],
+                'archivos_pdf': lote['pdfs']
+            }
+
     def obtener_resultados_fames(self):
-        """Extrae los porcentajes de FAMEs de todos los experimentos"""
+        """Fracción de FAMEs calculada por el analista en cada hoja (celda '% FAMEs')
+
+        Se lee de los cálculos laterales que guarda el extractor
+        (calculos_hoja.json) de cada experimento activo del registro, por
+        nombre de hoja.
+        """
+        procesados_dir = self.base_dir / 'Procesados'
         resultados = {}
 
-        # Experimento 1
-        exp1_file = self.base_dir / 'Experimento1/Cromatograma/cromatogramaExperimento1.xlsx'
-        if exp1_file.exists():
-            df_dict = pd.read_excel(exp1_file, sheet_name=None)
-            resultados['Experimento_1'] = {}
-            for sheet_name in ['2.1', '3.1', '5.1', '6.1', '9.1', '12.1']:
-                if sheet_name in df_dict:
-                    df = df_dict[sheet_name]
-                    # Buscar el valor de % FAMEs en la columna Unnamed: 9
-                    fames_idx = df[df.iloc[:, 9] == '% FAMEs'].index
-                    if len(fames_idx) > 0:
-                        fames_value = df.iloc[fames_idx[0] + 1, 9]
-                        resultados['Experimento_1'][sheet_name] = float(fames_value) if pd.notna(fames_value) else None
+        for entrada in experimentos_activos(cargar_registro(self.base_dir / NOMBRE_REGISTRO)):
+            exp_dir = procesados_dir / entrada['clave']
+            if not (exp_dir / 'metadata.json').exists():
+                continue
+
+            with open(exp_dir / 'metadata.json', 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            calculos = cargar_calculos(exp_dir)
+
+            valores = {}
+            for muestra in metadata.get('muestras', []):
+                registro = calculos_muestra(calculos, nombre_muestra(muestra['archivo_csv']))
+                if registro['fraccion_fames'] is not None:
+                    valores[muestra['nombre_original']] = registro['fraccion_fames']
+            if valores:
+                resultados[entrada['clave'].replace('Experimento', 'Experimento_')] = valores
 
         return resultados
 
@@ -171,12 +212,17 @@ class AnalizadorCromatogramas:
         resumen = {
             'total_experimentos': len(self.experimentos),
             'total_muestras': sum(len(exp['muestras']) for exp in self.experimentos.values()),
-            'periodo': '03/10/2025 - 07/11/2025',
+            'periodo': self._periodo(),
             'experimentos': self.experimentos
         }
 
         return resumen
 
+    def _periodo(self):
+        """Rango de fechas de los experimentos en formato dd/mm/aaaa"""
+        fechas = sorted(datetime.strptime(exp['fecha'], '%Y-%m-%d') for exp in self.experimentos.values())
+        return f"{fechas[0]:%d/%m/%Y} - {fechas[-1]:%d/%m/%Y}"
+
     def imprimir_resumen(self):
         """Imprime un resumen legible"""
         resumen = self.generar_resumen()
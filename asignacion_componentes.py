@@ -0,0 +1,67 @@
+"""
+Asignación exclusiva de picos a componentes
+Cuando las ventanas de tiempo de retención se solapan (p. ej. rangos dados a
+mano), este índice parte el eje de tiempos en intervalos elementales con una
+tabla ordenada de límites y etiqueta cada intervalo con el componente de
+mayor prioridad que lo cubre, de modo que cada pico recibe una sola etiqueta
+con una búsqueda binaria: O(n log k) para n picos y k ventanas
+"""
+
+import numpy as np
+
+SIN_ASIGNAR = -1
+
+
+class IndiceComponentes:
+    def __init__(self, rangos, prioridad=None):
+        """
+        Args:
+            rangos: {componente: (t_min, t_max)} con ambos extremos incluidos
+            prioridad: componentes de mayor a menor prioridad; por defecto el
+                orden de rangos. Los que falten quedan detrás, en el orden de
+                rangos.
+        """
+        self.componentes = list(rangos)
+        orden = [comp for comp in (prioridad or ()) if comp in rangos]
+        orden += [comp for comp in self.componentes if comp not in orden]
+        rango_prioridad = np.array([orden.index(comp) for comp in self.componentes])
+
+        limites = np.array([rangos[comp] for comp in self.componentes], dtype=float).reshape(-1, 2)
+        inicios = limites[:, 0]
+        # El extremo superior es inclusivo: el intervalo acaba justo después de t_max
+        fines = np.nextafter(limites[:, 1], np.inf)
+
+        self.limites = np.unique(np.concatenate((inicios, fines)))
+
+        # Componentes que cubren cada intervalo elemental [limites[i], limites[i+1])
+        cubre = (inicios[None, :] <= self.limites[:, None]) & (fines[None, :] > self.limites[:, None])
+        rangos_cubiertos = np.where(cubre, rango_prioridad[None, :], len(self.componentes))
+        ganador = np.argmin(rangos_cubiertos, axis=1)
+        self.etiquetas = np.where(cubre.any(axis=1), ganador, SIN_ASIGNAR)
+
+    def componentes_ocultos(self):
+        """Componentes que no ganan ningún intervalo (su ventana queda cubierta
+        por completo por otras de mayor prioridad y nunca reciben picos)"""
+        asignados = set(self.etiquetas[self.etiquetas >= 0].tolist())
+        return [comp for i, comp in enumerate(self.componentes) if i not in asignados]
+
+    def etiquetar(self, tiempos):
+        """Índice en self.componentes de cada pico (SIN_ASIGNAR fuera de toda ventana)"""
+        tiempos = np.asarray(tiempos, dtype=float)
+        posicion = np.searchsorted(self.limites, tiempos, side='right') - 1
+        # NaN se ordena al final y cae en el último intervalo, que nunca está cubierto
+        return np.where(posicion >= 0, self.etiquetas[np.maximum(posicion, 0)], SIN_ASIGNAR)
+
+    def nombres(self, tiempos):
+        """Nombre del componente de cada pico (None si no se asigna)"""
+        etiquetas = self.etiquetar(tiempos)
+        nombres = np.array(self.componentes + [None], dtype=object)
+        return nombres[etiquetas]
+
+    def sumar(self, tiempos, valores):
+        """Suma de valores (p. ej. áreas) y número de picos por componente"""
+        etiquetas = self.etiquetar(tiempos) + 1
+        longitud = len(self.componentes) + 1
+        sumas = np.bincount(etiquetas, weights=np.asarray(valores, dtype=float), minlength=longitud)
+        cuentas = np.bincount(etiquetas, minlength=longitud)
+        return sumas[1:], cuentas[1:]
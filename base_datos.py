@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Base de datos SQLite de experimentos, muestras, picos y métricas
+Alternativa opcional a los JSON y CSV de Procesados/: el extractor guarda
+experimentos, muestras y picos y el procesador las métricas de cada muestra,
+cada uno en una sola transacción por lote. Las tablas están indexadas por
+experimento, fecha, catalizador y métrica para que consultas como "conversión
+por catalizador en los últimos 6 meses" no recarguen todos los archivos
+"""
+
+import argparse
+import json
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from almacen_picos import tabla_picos
+from biblioteca_compuestos import CLASE_FAME, BibliotecaCompuestos
+from registro_experimentos import nombre_muestra
+
+NOMBRE_BASE_DATOS = 'resultados.sqlite'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS experimentos (
+    clave TEXT PRIMARY KEY,
+    experimento TEXT,
+    fecha TEXT,
+    tipo TEXT,
+    catalizador TEXT,
+    catalizador_pct REAL,
+    temperatura_c REAL,
+    rpm REAL,
+    relacion_molar REAL,
+    duracion_min REAL,
+    condiciones TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_experimentos_fecha ON experimentos (fecha);
+CREATE INDEX IF NOT EXISTS idx_experimentos_catalizador ON experimentos (catalizador, fecha);
+
+CREATE TABLE IF NOT EXISTS muestras (
+    experimento TEXT NOT NULL REFERENCES experimentos (clave) ON DELETE CASCADE,
+    archivo TEXT NOT NULL,
+    hoja TEXT,
+    nomenclatura TEXT,
+    orden INTEGER,
+    tiempo_min REAL,
+    PRIMARY KEY (experimento, archivo)
+);
+
+CREATE TABLE IF NOT EXISTS picos (
+    experimento TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    indice INTEGER,
+    tiempo REAL,
+    altura REAL,
+    area REAL,
+    area_pct REAL
+);
+CREATE INDEX IF NOT EXISTS idx_picos_muestra ON picos (experimento, archivo, tiempo);
+
+CREATE TABLE IF NOT EXISTS metricas (
+    experimento TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    metrica TEXT NOT NULL,
+    valor REAL,
+    PRIMARY KEY (experimento, archivo, metrica)
+);
+CREATE INDEX IF NOT EXISTS idx_metricas_metrica ON metricas (metrica, experimento);
+"""
+
+# Factores de experimentos (diseno_experimentos.factores_condiciones) con columna propia
+COLUMNAS_FACTORES = ('catalizador', 'catalizador_pct', 'temperatura_c', 'rpm', 'relacion_molar', 'duracion_min')
+
+# Métrica -> columna de tabla_resumen.csv
+COLUMNAS_RESUMEN = {
+    'conversion_fames_pct': 'Conversión FAMEs (%)',
+    'pureza_biodiesel_pct': 'Pureza (%)',
+    'gliceridos.monogliceridos_pct': 'Monoglicéridos (%)',
+    'gliceridos.digliceridos_pct': 'Diglicéridos (%)',
+    'gliceridos.trigliceridos_pct': 'Triglicéridos (%)',
+    'area_fames': 'Área FAMEs',
+    'num_picos_fames': 'Picos FAMEs',
+    'contenido_esteres_pct': 'Ésteres EN 14103 (%)',
+    'fraccion_esteres_sin_identificar_pct': 'Ésteres sin identificar (%)'
+}
+
+
+def metricas_muestra(resultado):
+    """Métricas numéricas de un resultado de muestra; los dict anidados se aplanan como 'grupo.clave'"""
+    metricas = {}
+    for clave, valor in resultado.items():
+        if isinstance(valor, dict):
+            metricas.update({f'{clave}.{subclave}': subvalor for subclave, subvalor in valor.items()
+                             if isinstance(subvalor, (int, float)) and not isinstance(subvalor, bool)})
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool) and clave not in ('orden', 'tiempo_min'):
+            metricas[clave] = valor
+    return metricas
+
+
+def picos_experimento(exp_dir):
+    """Picos de todas las muestras y del estándar interno de un experimento (desde los CSV)"""
+    exp_dir = Path(exp_dir)
+    csv_files = sorted(exp_dir.glob('muestra_*_raw.csv')) + sorted(exp_dir.glob('estandar_interno*_raw.csv'))
+    tablas = [tabla_picos(pd.read_csv(csv_file), nombre_muestra(csv_file)) for csv_file in csv_files]
+    return pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame(columns=['sample'])
+
+
+class BaseDatosResultados:
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.conexion = sqlite3.connect(self.ruta)
+        self.conexion.execute('PRAGMA foreign_keys = ON')
+        self.conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def contiene_experimento(self, clave):
+        return self.conexion.execute('SELECT 1 FROM experimentos WHERE clave = ?', (clave,)).fetchone() is not None
+
+    def guardar_extraccion(self, clave, metadata, picos):
+        """Actualiza experimento y muestras y reemplaza los picos de un lote en una transacción
+
+        picos es la tabla del almacén (sample, index, time, height, area, area_pct).
+        El experimento y sus muestras se actualizan en su sitio (borrar el
+        experimento borraría en cascada las muestras y con ellas el tiempo_min
+        que guarda el procesador); solo se eliminan, con sus métricas, las
+        muestras que ya no están en el lote.
+        """
+        factores = metadata.get('factores', {})
+        columnas = ['experimento', 'fecha', 'tipo', *COLUMNAS_FACTORES, 'condiciones']
+        muestras = [(clave, nombre_muestra(m['archivo_csv']), m.get('nombre_original'), m.get('nomenclatura'),
+                     m.get('orden', 0)) for m in metadata.get('muestras', [])]
+        archivos = [muestra[1] for muestra in muestras]
+        with self.conexion:
+            self.conexion.execute('DELETE FROM picos WHERE experimento = ?', (clave,))
+            self.conexion.execute(
+                f"INSERT INTO experimentos (clave, {', '.join(columnas)}) VALUES ({', '.join('?' * (1 + len(columnas)))}) "
+                f"ON CONFLICT (clave) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columnas)}",
+                (clave, metadata.get('experimento'), metadata.get('fecha'), metadata.get('tipo'),
+                 *(factores.get(columna) for columna in COLUMNAS_FACTORES),
+                 json.dumps(metadata.get('condiciones', {}), ensure_ascii=False)))
+
+            sobrantes = f"experimento = ? AND archivo NOT IN ({', '.join('?' * len(archivos))})"
+            self.conexion.execute(f'DELETE FROM metricas WHERE {sobrantes}', (clave, *archivos))
+            self.conexion.execute(f'DELETE FROM muestras WHERE {sobrantes}', (clave, *archivos))
+            self.conexion.executemany(
+                'INSERT INTO muestras (experimento, archivo, hoja, nomenclatura, orden) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (experimento, archivo) DO UPDATE SET '
+                'hoja = excluded.hoja, nomenclatura = excluded.nomenclatura, orden = excluded.orden', muestras)
+
+            columnas = ['sample', 'index', 'time', 'height', 'area', 'area_pct']
+            filas = picos.reindex(columns=columnas).astype(object).where(picos.reindex(columns=columnas).notna(), None)
+            self.conexion.executemany(
+                'INSERT INTO picos (experimento, archivo, indice, tiempo, altura, area, area_pct) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((clave, *fila) for fila in filas.itertuples(index=False, name=None)))
+
+    def guardar_resultados(self, resultados):
+        """Reemplaza las métricas de todos los experimentos procesados en una transacción"""
+        with self.conexion:
+            for clave, datos in resultados.items():
+                # Sin extracción previa en la base, el experimento se crea con lo que traen los resultados
+                self.conexion.execute('INSERT OR IGNORE INTO experimentos (clave, experimento, fecha) VALUES (?, ?, ?)',
+                                      (clave, datos.get('experimento'), datos.get('fecha')))
+                self.conexion.execute('DELETE FROM metricas WHERE experimento = ?', (clave,))
+                for muestra in datos['muestras']:
+                    archivo = muestra.get('nombre_original', muestra['nombre'])
+                    self.conexion.execute(
+                        'INSERT INTO muestras (experimento, archivo, nomenclatura, orden, tiempo_min) '
+                        'VALUES (?, ?, ?, ?, ?) ON CONFLICT (experimento, archivo) DO UPDATE SET '
+                        'nomenclatura = excluded.nomenclatura, orden = excluded.orden, tiempo_min = excluded.tiempo_min',
+                        (clave, archivo, muestra['nombre'], muestra.get('orden', 0), muestra.get('tiempo_min')))
+                    self.conexion.executemany(
+                        'INSERT INTO metricas (experimento, archivo, metrica, valor) VALUES (?, ?, ?, ?)',
+                        [(clave, archivo, metrica, valor) for metrica, valor in metricas_muestra(muestra).items()])
+
+    def consultar(self, sql, parametros=()):
+        return pd.read_sql_query(sql, self.conexion, params=parametros)
+
+    def tabla_resumen(self, composicion_fames=False):
+        """Misma tabla que tabla_resumen.csv a partir de las métricas
+
+        composicion_fames añade el % de cada FAME de la biblioteca, como la
+        opción del mismo nombre de ProcesadorCromatogramas.
+        """
+        columnas_metricas = dict(COLUMNAS_RESUMEN)
+        if composicion_fames:
+            biblioteca = BibliotecaCompuestos()
+            columnas_metricas.update({f'composicion_fames.{nombre}': f'{biblioteca.etiqueta(nombre)} (%)'
+                                      for nombre, clase in zip(biblioteca.nombres, biblioteca.clases)
+                                      if clase == CLASE_FAME})
+        pivote = ',\n'.join(f"MAX(CASE WHEN m.metrica = '{metrica}' THEN m.valor END) AS \"{columna}\""
+                            for metrica, columna in columnas_metricas.items())
+        tabla = self.consultar(f"""
+            SELECT s.experimento AS Experimento, e.fecha AS Fecha, s.nomenclatura AS Muestra,
+                   s.archivo AS Nombre_Original, s.orden AS Orden, s.tiempo_min AS "Tiempo (min)",
+                   {pivote}
+            FROM muestras s
+            JOIN experimentos e ON e.clave = s.experimento
+            JOIN metricas m ON m.experimento = s.experimento AND m.archivo = s.archivo
+            GROUP BY s.experimento, s.archivo
+            ORDER BY s.experimento, s.orden
+        """)
+        columnas = [c for c in columnas_metricas.values() if c not in ('Área FAMEs', 'Picos FAMEs')]
+        tabla[columnas] = tabla[columnas].round(2)
+        tabla['Área FAMEs'] = tabla['Área FAMEs'].round(2)
+        tabla['Picos FAMEs'] = tabla['Picos FAMEs'].astype('Int64')
+        return tabla
+
+    def metrica_por_condicion(self, metrica='conversion_fames_pct', condicion='catalizador', desde=None):
+        """Promedio, extremos y número de muestras de una métrica agrupada por una condición
+
+        desde es una fecha ISO (solo experimentos desde esa fecha).
+        """
+        if condicion not in ('fecha', 'tipo', *COLUMNAS_FACTORES):
+            raise ValueError(f"Condición desconocida: {condicion}")
+        return self.consultar(f"""
+            SELECT e.{condicion} AS {condicion}, COUNT(*) AS muestras, AVG(m.valor) AS promedio,
+                   MIN(m.valor) AS minimo, MAX(m.valor) AS maximo
+            FROM metricas m
+            JOIN experimentos e ON e.clave = m.experimento
+            WHERE m.metrica = ? AND e.fecha >= ?
+            GROUP BY e.{condicion}
+            ORDER BY e.{condicion}
+        """, (metrica, desde or ''))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Consulta la base de datos de resultados')
+    parser.add_argument('--metrica', default='conversion_fames_pct')
+    parser.add_argument('--por', default='catalizador', help='Condición de agrupación (catalizador, fecha, ...)')
+    parser.add_argument('--meses', type=int, default=6, help='Solo experimentos de los últimos N meses')
+    args = parser.parse_args()
+
+    ruta = Path('/home/user/ExperimentosBiodiesel_row/Procesados') / NOMBRE_BASE_DATOS
+    desde = (date.today() - timedelta(days=30 * args.meses)).isoformat()
+    with BaseDatosResultados(ruta) as base:
+        print(base.metrica_por_condicion(args.metrica, args.por, desde).to_string(index=False))
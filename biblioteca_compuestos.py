@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Biblioteca de compuestos e identificación de picos por nombre
+Lee biblioteca_compuestos.json (tiempo de retención de referencia, retención
+relativa al estándar interno y tolerancia de cada compuesto) y asigna a cada pico el
+compuesto más cercano dentro de su tolerancia. Un lote completo se identifica
+con una sola búsqueda binaria sobre claves (inyección, tiempo)
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from alineacion_tiempos import BIBLIOTECA_PREDETERMINADA, AlineadorTiempos, matriz_lote, referencias_biblioteca
+CLASE_FAME = 'fame'
+SIN_IDENTIFICAR = -1
+
+# Clase de la biblioteca -> componente de los rangos de TR del procesador. El
+# estándar interno (C17:0) es un éster y cae en la ventana de FAMEs; los
+# compuestos de clases que no están aquí (disolventes) son su propio componente
+COMPONENTES_CLASES = {
+    CLASE_FAME: 'fames',
+    'estandar_interno': 'fames',
+    'monogliceridos': 'monogliceridos',
+    'digliceridos': 'digliceridos',
+    'trigliceridos': 'trigliceridos'
+}
+
+# Margen (min) con que se ensanchan las ventanas de clase a cada lado, para
+# que la corrección de deriva no saque un pico de su ventana. Nunca pasa de un
+# tercio del hueco con la ventana vecina
+MARGEN_CLASES = 0.10
+
+# Separación entre inyecciones en el eje de claves (mayor que cualquier tiempo de retención)
+SEPARACION_INYECCIONES = 1.0e4
+
+
+class BibliotecaCompuestos:
+    def __init__(self, ruta=None, retencion_relativa=False):
+        """
+        Args:
+            ruta: JSON con {'compuestos': [{'nombre', 'clase', 'tr', 'rr', 'tolerancia'}, ...]};
+                por defecto biblioteca_compuestos.json junto a este módulo
+            retencion_relativa: Predecir cada tiempo como rr × tiempo del estándar
+                interno (C17:0) de la inyección en lugar de usar tr. En los lotes de
+                2025 los ápices de C16 y C18 se mueven con la carga de la columna y no
+                con el C17:0 (con rr quedan más ésteres sin identificar), así que por
+                defecto se usa tr y la deriva se corrige con AlineadorTiempos
+        """
+        self.ruta = Path(ruta) if ruta else BIBLIOTECA_PREDETERMINADA
+        self.retencion_relativa = retencion_relativa
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            self.compuestos = sorted(json.load(f)['compuestos'], key=lambda c: c['tr'])
+
+        self.nombres = [c['nombre'] for c in self.compuestos]
+        self.clases = np.array([c['clase'] for c in self.compuestos])
+        self.tr = np.array([c['tr'] for c in self.compuestos], dtype=float)
+        self.rr = np.array([c.get('rr', np.nan) for c in self.compuestos], dtype=float)
+        self.tolerancias = np.array([c['tolerancia'] for c in self.compuestos], dtype=float)
+        # Respuesta relativa al estándar interno (EN 14103 la toma como 1)
+        self.factores_respuesta = np.array([c.get('factor_respuesta', 1.0) for c in self.compuestos], dtype=float)
+
+        # El estándar interno de cada inyección fija la escala de las retenciones relativas
+        self.referencia = None
+        if retencion_relativa:
+            estandar = referencias_biblioteca(self.ruta).get('estandar_interno')
+            if estandar is not None:
+                self.referencia = AlineadorTiempos({'estandar_interno': estandar})
+
+    def parametros(self):
+        """Contenido de la biblioteca (para el manifiesto)"""
+        return {'compuestos': self.compuestos, 'retencion_relativa': self.retencion_relativa}
+
+    def tiempos_referencia(self, tiempos, areas):
+        """Tiempo del estándar interno en cada inyección (NaN si no se encuentra
+        o sin retencion_relativa)"""
+        if self.referencia is None:
+            return np.full(len(tiempos), np.nan)
+        return self.referencia.anclas(tiempos, areas)[0][:, 0]
+
+    def tiempos_esperados(self, tr_referencia):
+        """Tiempo esperado de cada compuesto en cada inyección (inyecciones × compuestos)
+
+        Se usa rr × tiempo del estándar interno cuando ambos se conocen y, si
+        no, el tiempo de referencia tr.
+        """
+        relativos = self.rr[None, :] * np.asarray(tr_referencia, dtype=float)[:, None]
+        return np.where(np.isnan(relativos), self.tr[None, :], relativos)
+
+    def identificar_lote(self, tiempos, tr_referencia):
+        """Índice del compuesto de cada pico (SIN_IDENTIFICAR si ninguno está en tolerancia)
+
+        tiempos es una matriz (inyecciones × picos) con NaN de relleno. Las
+        referencias de todas las inyecciones se ordenan en un único eje de
+        claves inyección × SEPARACION_INYECCIONES + tiempo y cada pico busca
+        su vecino más cercano con np.searchsorted.
+        """
+        inyecciones = len(tiempos)
+        desplazamiento = np.arange(inyecciones, dtype=float)[:, None] * SEPARACION_INYECCIONES
+
+        claves_ref = (self.tiempos_esperados(tr_referencia) + desplazamiento).ravel()
+        compuesto_ref = np.tile(np.arange(len(self.compuestos)), inyecciones)
+        orden = np.argsort(claves_ref, kind='stable')
+        claves_ref, compuesto_ref = claves_ref[orden], compuesto_ref[orden]
+
+        claves = (tiempos + desplazamiento).ravel()
+        derecha = np.clip(np.searchsorted(claves_ref, claves), 0, len(claves_ref) - 1)
+        izquierda = np.maximum(derecha - 1, 0)
+        usar_izquierda = np.abs(claves - claves_ref[izquierda]) < np.abs(claves_ref[derecha] - claves)
+        vecino = np.where(usar_izquierda, izquierda, derecha)
+
+        compuesto = compuesto_ref[vecino]
+        dentro = np.abs(claves - claves_ref[vecino]) <= self.tolerancias[compuesto] + 1e-9
+        return np.where(dentro, compuesto, SIN_IDENTIFICAR).reshape(tiempos.shape)
+
+    def areas_lote(self, tiempos, areas, tr_referencia=None):
+        """Área total por compuesto de cada inyección (inyecciones × compuestos)
+
+        Si no se da tr_referencia se busca el estándar interno en cada inyección.
+        """
+        if tr_referencia is None:
+            tr_referencia = self.tiempos_referencia(tiempos, areas)
+        etiquetas = self.identificar_lote(tiempos, tr_referencia) + 1
+
+        columnas = len(self.compuestos) + 1
+        indices = np.arange(len(tiempos))[:, None] * columnas + etiquetas
+        sumas = np.bincount(indices.ravel(), weights=np.nan_to_num(areas).ravel(),
+                            minlength=len(tiempos) * columnas)
+        return sumas.reshape(len(tiempos), columnas)[:, 1:]
+
+    def areas_compuestos(self, df, tr_referencia=None):
+        """Área por compuesto de una tabla de picos {nombre: área}"""
+        if len(df) == 0 or 'Time' not in df.columns or 'Area' not in df.columns:
+            return {nombre: 0.0 for nombre in self.nombres}
+
+        referencia = None if tr_referencia is None else np.array([tr_referencia], dtype=float)
+        areas = self.areas_lote(matriz_lote([df], 'Time'), matriz_lote([df], 'Area'), referencia)[0]
+        return {nombre: float(area) for nombre, area in zip(self.nombres, areas)}
+
+    def etiqueta(self, nombre):
+        """Abreviatura del compuesto (p. ej. C18:1) o su nombre si no tiene"""
+        if nombre not in self.nombres:
+            return nombre
+        return self.compuestos[self.nombres.index(nombre)].get('abreviatura', nombre)
+
+    def area_clase(self, areas_compuestos, clase, corregir_respuesta=False):
+        """Área total de los compuestos de una clase (p. ej. 'estandar_interno')
+
+        Con corregir_respuesta cada área se divide por el factor de respuesta
+        del compuesto.
+        """
+        return float(sum(areas_compuestos.get(nombre, 0.0) / (factor if corregir_respuesta else 1.0)
+                         for nombre, c, factor in zip(self.nombres, self.clases, self.factores_respuesta)
+                         if c == clase))
+
+    def rango_esteres(self):
+        """Intervalo de tiempos que cubre los FAMEs y el estándar interno (ΣA de
+        EN 14103): la ventana de FAMEs de rangos_componentes, con su margen"""
+        return self.rangos_componentes()[COMPONENTES_CLASES[CLASE_FAME]]
+
+    def rangos_componentes(self, margen=MARGEN_CLASES):
+        """Ventana de TR de cada componente del procesador {componente: (t_min, t_max)}
+
+        Cada ventana va desde la primera hasta la última referencia de sus
+        compuestos, con sus tolerancias, y se ensancha margen minutos a cada
+        lado (como mucho un tercio del hueco con la ventana vecina), así que
+        los rangos del procesador y la identificación por nombre usan los
+        mismos tiempos. Lanza ValueError si las ventanas de dos componentes se
+        solapan (un pico contaría en ambos).
+        """
+        rangos = {}
+        for nombre, clase, inicio, fin in zip(self.nombres, self.clases, self.tr - self.tolerancias,
+                                              self.tr + self.tolerancias):
+            componente = COMPONENTES_CLASES.get(clase, nombre)
+            anterior = rangos.get(componente, (inicio, fin))
+            rangos[componente] = (min(anterior[0], inicio), max(anterior[1], fin))
+
+        ordenados = sorted(rangos.items(), key=lambda item: item[1])
+        for (anterior, (_, fin)), (componente, (inicio, _)) in zip(ordenados, ordenados[1:]):
+            if inicio <= fin:
+                raise ValueError(f"En {self.ruta.name} las ventanas de {anterior} (hasta {fin:.4g} min) y "
+                                 f"{componente} (desde {inicio:.4g} min) se solapan")
+
+        inicios = np.array([inicio for _, (inicio, _) in ordenados])
+        fines = np.array([fin for _, (_, fin) in ordenados])
+        huecos = np.concatenate(([np.inf], inicios[1:] - fines[:-1], [np.inf]))
+        inicios = inicios - np.minimum(margen, huecos[:-1] / 3)
+        fines = fines + np.minimum(margen, huecos[1:] / 3)
+        return {componente: (round(float(inicio), 4), round(float(fin), 4))
+                for (componente, _), inicio, fin in zip(ordenados, inicios, fines)}
+
+    def composicion_fames(self, areas_compuestos, area_esteres=None):
+        """Porcentaje de cada FAME identificado sobre el área de ésteres
+
+        area_esteres es el área de todos los picos de ésteres sin el estándar
+        interno, identificados o no; por defecto la suma de los FAMEs
+        identificados. Con ella la composición no suma 100 si quedan ésteres
+        sin identificar (ver fraccion_sin_identificar).
+        """
+        fames = [nombre for nombre, clase in zip(self.nombres, self.clases) if clase == CLASE_FAME]
+        total = sum(areas_compuestos.get(nombre, 0.0) for nombre in fames) if area_esteres is None else area_esteres
+        return {nombre: (areas_compuestos.get(nombre, 0.0) / total * 100 if total > 0 else 0.0)
+                for nombre in fames}
+
+    def fraccion_sin_identificar(self, areas_compuestos, area_esteres):
+        """Porcentaje del área de ésteres (sin el estándar interno) que no se
+        identifica como ningún FAME de la biblioteca (None sin área)"""
+        if area_esteres <= 0:
+            return None
+        return (area_esteres - self.area_clase(areas_compuestos, CLASE_FAME)) / area_esteres * 100
+
+    def identificar(self, tablas):
+        """Nombra los picos de un lote de tablas {muestra: DataFrame}
+
+        Devuelve copias con la columna Name reemplazada por el compuesto
+        identificado; los picos sin identificar conservan su nombre original.
+        """
+        nombres = list(tablas)
+        lista = [tablas[nombre] for nombre in nombres]
+        tiempos = matriz_lote(lista, 'Time')
+        etiquetas = self.identificar_lote(tiempos, self.tiempos_referencia(tiempos, matriz_lote(lista, 'Area')))
+
+        nombres_compuestos = np.array(self.nombres, dtype=object)
+        identificadas = {}
+        for i, (nombre, tabla) in enumerate(zip(nombres, lista)):
+            tabla = tabla.copy()
+            fila = etiquetas[i, :len(tabla)]
+            original = tabla['Name'].to_numpy(dtype=object) if 'Name' in tabla.columns else np.full(len(tabla), None)
+            tabla['Name'] = np.where(fila >= 0, nombres_compuestos[np.maximum(fila, 0)], original)
+            identificadas[nombre] = tabla
+        return identificadas
+
+
+if __name__ == '__main__':
+    from procesar_cromatogramas import ProcesadorCromatogramas
+    from registro_experimentos import nombre_muestra
+
+    parser = argparse.ArgumentParser(description='Identifica los picos de los CSV extraídos con la biblioteca')
+    parser.add_argument('experimentos', nargs='+', help='Carpetas de experimento dentro de Procesados/')
+    args = parser.parse_args()
+
+    procesados_dir = Path('/home/user/ExperimentosBiodiesel_row/Procesados')
+    procesador = ProcesadorCromatogramas(procesados_dir, incremental=False)
+    biblioteca = BibliotecaCompuestos()
+
+    for experimento in args.experimentos:
+        tablas = {nombre_muestra(csv_file): procesador.limpiar_tabla_picos(pd.read_csv(csv_file))
+                  for csv_file in sorted((procesados_dir / experimento).glob('muestra_*_raw.csv'))}
+        for muestra, tabla in biblioteca.identificar(tablas).items():
+            salida = procesados_dir / experimento / f'muestra_{muestra}_identificada.csv'
+            tabla.to_csv(salida, index=False)
+            identificados = (~tabla['Name'].astype(str).str.startswith('UNKNOWN')).sum()
+            print(f"  ✓ {experimento}/{muestra}: {identificados} de {len(tabla)} picos identificados -> {salida.name}")
@@ -0,0 +1,133 @@
+"""
+Caché de hojas de libros Excel
+Lee solo las hojas solicitadas, las memoriza por hash del archivo y las
+persiste en disco para que ejecuciones posteriores no vuelvan a parsear el Excel
+"""
+
+import json
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from manifiesto import calcular_hash_archivo
+
+
+def _nombre_seguro(hoja):
+    """Nombre de archivo válido para una hoja (los nombres pueden tener espacios y puntos)"""
+    return re.sub(r'[^0-9A-Za-z_.-]+', '_', hoja)
+
+
+class CacheLibrosExcel:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._hojas = {}    # (sha256, hoja) -> DataFrame
+        self._indices = {}  # sha256 -> {'hojas': [...], 'archivos': {hoja: archivo}}
+        self._hashes = {}   # (ruta, tamaño, mtime) -> sha256
+
+    def _hash_libro(self, ruta):
+        """Hash del libro, recalculado solo si cambian tamaño o fecha"""
+        estado = ruta.stat()
+        clave = (str(ruta.resolve()), estado.st_size, estado.st_mtime_ns)
+        if clave not in self._hashes:
+            self._hashes[clave] = calcular_hash_archivo(ruta)
+        return self._hashes[clave]
+
+    def _directorio_libro(self, sha):
+        return self.cache_dir / sha if self.cache_dir else None
+
+    def _indice(self, sha, libro=None, ruta=None):
+        """Índice de hojas del libro: nombres disponibles y archivos en caché
+
+        Si el índice no está en memoria ni en disco se construye a partir del
+        libro abierto (o se abre ruta). Devuelve None si no hay de dónde sacarlo.
+        """
+        if sha in self._indices:
+            return self._indices[sha]
+
+        directorio = self._directorio_libro(sha)
+        if directorio is not None and (directorio / 'indice.json').exists():
+            with open(directorio / 'indice.json', 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        elif libro is not None:
+            indice = {'fuente': Path(ruta).name if ruta else '', 'hojas': list(libro.sheet_names),
+                      'archivos': {}}
+        elif ruta is not None:
+            with pd.ExcelFile(ruta) as libro:
+                return self._indice(sha, libro, ruta)
+        else:
+            return None
+
+        self._indices[sha] = indice
+        return indice
+
+    def _guardar_indice(self, sha):
+        directorio = self._directorio_libro(sha)
+        if directorio is None:
+            return
+        directorio.mkdir(parents=True, exist_ok=True)
+        with open(directorio / 'indice.json', 'w', encoding='utf-8') as f:
+            json.dump(self._indices[sha], f, indent=2, ensure_ascii=False)
+
+    def nombres_hojas(self, ruta):
+        """Nombres de todas las hojas del libro"""
+        ruta = Path(ruta)
+        return list(self._indice(self._hash_libro(ruta), ruta=ruta)['hojas'])
+
+    def leer_hojas(self, ruta, hojas=None):
+        """Devuelve {hoja: DataFrame} con las hojas solicitadas que existan en el libro
+
+        Las hojas se buscan primero en memoria, luego en disco y solo las que
+        faltan se parsean del Excel, abriendo el libro como mucho una vez.
+        Con hojas=None se leen todas.
+        """
+        ruta = Path(ruta)
+        sha = self._hash_libro(ruta)
+        directorio = self._directorio_libro(sha)
+
+        libro = None
+        try:
+            indice = self._indice(sha)
+            if indice is None:
+                libro = pd.ExcelFile(ruta)
+                indice = self._indice(sha, libro, ruta)
+
+            if hojas is None:
+                hojas = indice['hojas']
+            hojas = [hoja for hoja in hojas if hoja in indice['hojas']]
+
+            resultado = {}
+            faltantes = []
+            for hoja in hojas:
+                if (sha, hoja) in self._hojas:
+                    resultado[hoja] = self._hojas[(sha, hoja)]
+                elif directorio is not None and hoja in indice['archivos'] \
+                        and (directorio / indice['archivos'][hoja]).exists():
+                    df = pd.read_pickle(directorio / indice['archivos'][hoja])
+                    self._hojas[(sha, hoja)] = df
+                    resultado[hoja] = df
+                else:
+                    faltantes.append(hoja)
+
+            if faltantes:
+                if libro is None:
+                    libro = pd.ExcelFile(ruta)
+
+                for hoja in faltantes:
+                    df = libro.parse(hoja)
+                    self._hojas[(sha, hoja)] = df
+                    resultado[hoja] = df
+
+                    if directorio is not None:
+                        directorio.mkdir(parents=True, exist_ok=True)
+                        archivo = f"{len(indice['archivos']):03d}_{_nombre_seguro(hoja)}.pkl"
+                        df.to_pickle(directorio / archivo)
+                        indice['archivos'][hoja] = archivo
+
+                self._guardar_indice(sha)
+        finally:
+            if libro is not None:
+                libro.close()
+
+        # Conservar el orden solicitado
+        return {hoja: resultado[hoja] for hoja in hojas}
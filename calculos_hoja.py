@@ -0,0 +1,99 @@
+"""
+Cálculos laterales de las hojas de resultados
+Las hojas del equipo llevan a la derecha de la tabla de picos bloques
+etiqueta/valor con los cálculos del analista (área de heptano y del SI,
+pesos, % FAMEs...). El extractor los lee una vez por hoja y los guarda por
+experimento en calculos_hoja.json como registros tipados por muestra, para
+que el procesamiento y el análisis los consulten sin volver a recorrer celdas
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from registro_experimentos import nombre_muestra
+
+NOMBRE_CALCULOS = 'calculos_hoja.json'
+
+# Etiqueta de la hoja -> (campo del registro, tipo)
+CAMPOS_CALCULOS = {
+    'Area heptano (µV.Min)': ('area_heptano', float),
+    'Area SI (µV.Min)': ('area_si', float),
+    'Peso SI (mg)': ('peso_si_mg', float),
+    'Volumen heptano (mL)': ('volumen_heptano_ml', float),
+    'Conc SI (mg/ml)': ('conc_si_mg_ml', float),
+    'Vol SI alicuota (mL)': ('volumen_alicuota_si_ml', float),
+    'Peso muestra (mg)': ('peso_muestra_mg', float),
+    'Area FAMES': ('area_fames', float),
+    '% FAMEs': ('fraccion_fames', float),
+    'R': ('r', float)
+}
+
+
+def registro_vacio():
+    """Registro con todos los campos en None (esquema fijo)"""
+    return {campo: None for campo, _ in CAMPOS_CALCULOS.values()}
+
+
+def leer_calculos_hoja(df):
+    """Bloques de cálculos de una hoja, de izquierda a derecha
+
+    Un bloque es una columna con etiquetas de CAMPOS_CALCULOS cuyo valor está
+    en la columna siguiente, en la misma fila. Las hojas con dos
+    integraciones tienen dos bloques (Unnamed: 8/9 y Unnamed: 17/18).
+    Devuelve una lista de registros tipados.
+    """
+    if df.empty or len(df.columns) < 2:
+        return []
+
+    etiquetas = df.apply(lambda columna: columna.astype(str).str.strip())
+    es_etiqueta = etiquetas.isin(list(CAMPOS_CALCULOS)).to_numpy()
+    columnas_etiqueta = np.flatnonzero(es_etiqueta[:, :-1].any(axis=0))
+
+    bloques = []
+    for j in columnas_etiqueta:
+        filas = np.flatnonzero(es_etiqueta[:, j])
+        valores = pd.to_numeric(df.iloc[filas, j + 1], errors='coerce')
+
+        registro = registro_vacio()
+        for etiqueta, valor in zip(etiquetas.iloc[filas, j], valores):
+            campo, tipo = CAMPOS_CALCULOS[etiqueta]
+            if registro[campo] is None and pd.notna(valor):
+                registro[campo] = tipo(valor)
+        bloques.append(registro)
+
+    return bloques
+
+
+def guardar_calculos(exp_dir, calculos):
+    """Escribe {muestra: [bloques]} en calculos_hoja.json y devuelve la ruta"""
+    ruta = Path(exp_dir) / NOMBRE_CALCULOS
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'campos': [campo for campo, _ in CAMPOS_CALCULOS.values()], 'muestras': calculos},
+                  f, indent=2, ensure_ascii=False)
+    return ruta
+
+
+def cargar_calculos(exp_dir):
+    """{muestra: [bloques]} de un experimento
+
+    Si la extracción es anterior a calculos_hoja.json, los bloques se leen
+    de los CSV del experimento.
+    """
+    exp_dir = Path(exp_dir)
+    ruta = exp_dir / NOMBRE_CALCULOS
+    if ruta.exists():
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)['muestras']
+
+    csv_files = sorted(exp_dir.glob('muestra_*_raw.csv')) + sorted(exp_dir.glob('estandar_interno*_raw.csv'))
+    return {nombre_muestra(csv_file): leer_calculos_hoja(pd.read_csv(csv_file))
+            for csv_file in csv_files}
+
+
+def calculos_muestra(calculos, muestra, bloque=0):
+    """Registro de un bloque de una muestra (registro vacío si no existe)"""
+    bloques = calculos.get(muestra, [])
+    return bloques[bloque] if bloque < len(bloques) else registro_vacio()
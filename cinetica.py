@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Ajuste de modelos cinéticos a las series temporales de los experimentos
+Convierte los tiempos de muestreo del registro ('17:49 (+24 min)', 'Reacción
+a 5 minutos') en minutos y ajusta, por Levenberg-Marquardt con jacobianos
+analíticos, un modelo de pseudo-primer orden para la conversión y el modelo
+reversible de tres etapas TG ⇌ DG ⇌ MG ⇌ GL. Todas las reacciones se ajustan
+a la vez sobre matrices (reacciones × muestras) con NaN de relleno; las
+constantes se reportan con intervalos de confianza. Los ajustes con R²
+negativo o con parámetros no identificables se marcan como no válidos y no
+se reportan sus constantes
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PATRON_DESPLAZAMIENTO = r'\(\s*\+?(-?\d+(?:[.,]\d+)?)\s*min'
+PATRON_HORA = r'(\d{1,2}):(\d{2})'
+PATRON_MINUTOS = r'(\d+(?:[.,]\d+)?)\s*min'
+
+NIVEL_CONFIANZA = 0.95
+
+# Intervalo admisible de las constantes de velocidad (1/min)
+K_MIN, K_MAX = 1e-6, 10.0
+
+# Intervalo admisible del tiempo transcurrido antes de la primera muestra (min)
+T0_MIN, T0_MAX = 1e-2, 1e4
+
+# Un parámetro no es identificable si su intervalo de confianza abarca más de
+# este factor (parámetros logarítmicos) o de estos puntos porcentuales
+MAX_RAZON_IC = 100.0
+MAX_ANCHO_IC = 100.0
+
+
+def minutos_muestreo(tiempos, tipos=None):
+    """Minutos desde el inicio de la reacción de cada muestra de un lote
+
+    Se usa, por orden: el desplazamiento entre paréntesis ('17:49 (+24 min)'),
+    la hora de muestreo respecto a la primera hora del lote y los minutos
+    que aparezcan en el tipo ('Reacción a 5 minutos'). NaN si no hay dato.
+    """
+    tiempos = pd.Series(list(tiempos), dtype=object).fillna('').astype(str)
+    tipos = pd.Series(list(tipos) if tipos is not None else [''] * len(tiempos),
+                      dtype=object).fillna('').astype(str)
+
+    def numero(texto):
+        return pd.to_numeric(texto.str.replace(',', '.', regex=False), errors='coerce')
+
+    minutos = numero(tiempos.str.extract(PATRON_DESPLAZAMIENTO, expand=False))
+
+    hora = tiempos.str.extract(PATRON_HORA).apply(pd.to_numeric, errors='coerce')
+    reloj = hora[0] * 60 + hora[1]
+    minutos = minutos.fillna(reloj - reloj.min())
+
+    minutos = minutos.fillna(numero(tipos.str.extract(PATRON_MINUTOS, expand=False)))
+    return minutos.to_numpy(dtype=float)
+
+
+def expm_lote(matrices, grado=12):
+    """Exponencial de una pila de matrices (..., n, n)
+
+    Escalado y cuadrado: cada matriz se divide por 2^s hasta que su norma 1
+    es <= 0.25, se evalúa la serie de Taylor de grado 12 por Horner (error
+    relativo < 1e-16, sin resolver sistemas) y el resultado se eleva al
+    cuadrado s veces (s distinto para cada matriz).
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    norma = np.abs(matrices).sum(axis=-2).max(axis=-1)
+    with np.errstate(divide='ignore'):
+        s = np.maximum(0, np.ceil(np.log2(norma / 0.25))).astype(int)
+    x = matrices / (2.0 ** s)[..., None, None]
+
+    identidad = np.eye(matrices.shape[-1])
+    resultado = identidad + x / grado
+    for k in range(grado - 1, 0, -1):
+        resultado = identidad + (x @ resultado) / k
+
+    for j in range(int(s.max(initial=0))):
+        resultado = np.where((j < s)[..., None, None], resultado @ resultado, resultado)
+    return resultado
+
+
+def cuantil_t(grados_libertad, nivel=NIVEL_CONFIANZA):
+    """Cuantil bilateral de la t de Student (desarrollo de Cornish-Fisher desde la normal)"""
+    p = 0.5 + nivel / 2
+    # Aproximación racional de la normal inversa (Abramowitz y Stegun 26.2.23)
+    q = np.sqrt(-2 * np.log(1 - p))
+    z = q - (2.515517 + 0.802853 * q + 0.010328 * q ** 2) / (1 + 1.432788 * q + 0.189269 * q ** 2 + 0.001308 * q ** 3)
+    v = np.asarray(grados_libertad, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (z + (z ** 3 + z) / (4 * v) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2)
+             + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3))
+    return np.where(v > 0, t, np.nan)
+
+
+class ModeloPrimerOrden:
+    """Conversión de pseudo-primer orden: X(t) = X∞ - (X∞ - X0) e^(-k t)"""
+
+    nombre = 'primer_orden'
+    parametros = ('conversion_inicial', 'conversion_final', 'k')
+    logaritmicos = (False, False, True)
+    observables = ('conversion_fames_pct',)
+    limites = np.array([[0.0, 0.0, np.log(K_MIN)], [100.0, 100.0, np.log(K_MAX)]])
+
+    def inicial(self, tiempos, observados):
+        y = observados[..., 0]
+        t_medio = np.nanmedian(np.where(tiempos > 0, tiempos, np.nan), axis=1)
+        primero = y[np.arange(len(y)), np.nanargmin(np.where(np.isnan(y), np.inf, tiempos), axis=1)]
+        return np.column_stack((primero, np.nanmax(y, axis=1), np.log(1.0 / np.nan_to_num(t_medio, nan=60.0))))
+
+    def evaluar(self, theta, tiempos):
+        """Predicción (R, N, 1) y jacobiano (R, N, 1, 3) respecto a theta"""
+        x0, xf, k = theta[:, 0:1], theta[:, 1:2], np.exp(theta[:, 2:3])
+        t = np.nan_to_num(tiempos)
+        e = np.exp(-k * t)
+        prediccion = xf - (xf - x0) * e
+        jacobiano = np.stack((e, 1 - e, (xf - x0) * k * t * e), axis=-1)
+        return prediccion[..., None], jacobiano[:, :, None, :]
+
+
+class ModeloTresEtapas:
+    """Transesterificación reversible en tres etapas con metanol en exceso
+
+    TG ⇌ DG ⇌ MG ⇌ GL con constantes de pseudo-primer orden (k1, k_1, k2,
+    k_2, k3, k_3), en % de los moles iniciales de glicérido. La conversión a
+    FAMEs es (DG + 2 MG + 3 GL) / 3. La solución es exp(A (t + t0)) y0 y las
+    derivadas respecto a cada constante son las derivadas de Fréchet de la
+    exponencial, calculadas con la matriz por bloques [[A s, E s], [0, A s]].
+
+    El tiempo de muestreo se cuenta desde la primera muestra, no desde el
+    inicio de la reacción, así que t0 (minutos transcurridos antes de la
+    primera muestra) se ajusta junto con las constantes. Los glicéridos se
+    miden en % de área, que es proporcional a las cadenas de acilo: TG
+    aporta 3, DG 2 y MG 1 de las 3 cadenas de cada glicérido inicial.
+    """
+
+    nombre = 'tres_etapas'
+    parametros = ('k1', 'k_1', 'k2', 'k_2', 'k3', 'k_3', 't0')
+    logaritmicos = (True,) * 7
+    observables = ('trigliceridos_pct', 'digliceridos_pct', 'monogliceridos_pct', 'conversion_fames_pct')
+    limites = np.log([[K_MIN] * 6 + [T0_MIN], [K_MAX] * 6 + [T0_MAX]])
+
+    # Estado [TG, DG, MG, GL] (% de moles de glicérido) -> observables (% de área)
+    OBSERVACION = np.array([[1, 0, 0, 0],
+                            [0, 2 / 3, 0, 0],
+                            [0, 0, 1 / 3, 0],
+                            [0, 1 / 3, 2 / 3, 1]], dtype=float)
+    ESTADO_INICIAL = np.array([100.0, 0.0, 0.0, 0.0])
+
+    def __init__(self):
+        # dA/dk de cada constante: (especie que reacciona, especie que se forma)
+        self.derivadas = np.zeros((6, 4, 4))
+        for p, (origen, destino) in enumerate([(0, 1), (1, 0), (1, 2), (2, 1), (2, 3), (3, 2)]):
+            self.derivadas[p, origen, origen] = -1
+            self.derivadas[p, destino, origen] = 1
+
+    def matriz(self, k):
+        """Matriz del sistema lineal y' = A y para cada reacción (R, 4, 4)"""
+        return np.einsum('rp,pij->rij', k, self.derivadas)
+
+    def inicial(self, tiempos, observados):
+        """k1 del decaimiento de TG (TG ≈ 100 e^(-k1 (t + t0))) con t0 de una hora;
+        las demás etapas igual y las inversas 10 veces menores"""
+        t0 = 60.0
+        fraccion_tg = np.clip(observados[..., 0] / 100, 1e-3, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.nanmedian(-np.log(fraccion_tg) / (tiempos + t0), axis=1)
+        k = np.log(np.clip(np.nan_to_num(k, nan=1 / 60), 1e-4, 1))
+        return np.column_stack([k, k - 2.3, k, k - 2.3, k, k - 2.3, np.full(len(k), np.log(t0))])
+
+    def evaluar(self, theta, tiempos):
+        """Predicción (R, N, 4) y jacobiano (R, N, 4, 7) respecto a log k y log t0"""
+        k, t0 = np.exp(theta[:, :6]), np.exp(theta[:, 6])
+        r, n = tiempos.shape
+        s = (np.nan_to_num(tiempos) + t0[:, None])[:, :, None, None]
+        matriz = self.matriz(k)
+        a = matriz[:, None] * s                                                             # (R, N, 4, 4)
+        e = (k[:, :, None, None] * self.derivadas[None])[:, None] * s[:, :, None]           # (R, N, 6, 4, 4)
+
+        bloques = np.zeros((r, n, 6, 8, 8))
+        bloques[..., :4, :4] = a[:, :, None]
+        bloques[..., 4:, 4:] = a[:, :, None]
+        bloques[..., :4, 4:] = e
+        exponencial = expm_lote(bloques)
+
+        estado = exponencial[:, :, 0, :4, :4] @ self.ESTADO_INICIAL
+        derivada_estado = exponencial[..., :4, 4:] @ self.ESTADO_INICIAL                     # (R, N, 6, 4)
+        # d estado / d log t0 = t0 A exp(A s) y0
+        derivada_t0 = t0[:, None, None] * np.einsum('rij,rnj->rni', matriz, estado)
+        derivada_estado = np.concatenate((derivada_estado, derivada_t0[:, :, None]), axis=2)
+        prediccion = estado @ self.OBSERVACION.T
+        jacobiano = np.einsum('oi,rnpi->rnop', self.OBSERVACION, derivada_estado)
+        return prediccion, jacobiano
+
+
+MODELOS = {modelo.nombre: modelo for modelo in (ModeloPrimerOrden, ModeloTresEtapas)}
+
+
+def ajustar_lote(modelo, tiempos, observados, max_iteraciones=100, tolerancia=1e-8):
+    """Levenberg-Marquardt simultáneo para todas las reacciones
+
+    tiempos es (R, N) y observados (R, N, O) con NaN donde no hay dato. Cada
+    reacción tiene su propio amortiguamiento, acepta o rechaza su paso de
+    forma independiente y deja de evaluarse cuando converge; los parámetros
+    se mantienen dentro de modelo.limites. Devuelve un dict de arrays por
+    reacción: theta, covarianza, en_limite, ssr, r2, puntos,
+    grados_libertad e iteraciones.
+    """
+    tiempos = np.asarray(tiempos, dtype=float)
+    observados = np.asarray(observados, dtype=float)
+    validos = np.isfinite(observados) & np.isfinite(tiempos)[:, :, None]
+    y = np.where(validos, observados, 0.0)
+
+    def residuos(theta, filas):
+        prediccion, jacobiano = modelo.evaluar(theta, tiempos[filas])
+        r = np.where(validos[filas], prediccion - y[filas], 0.0).reshape(len(theta), -1)
+        j = np.where(validos[filas, ..., None], jacobiano, 0.0).reshape(len(theta), -1, theta.shape[1])
+        return r, j
+
+    todas = np.arange(len(tiempos))
+    theta = np.clip(modelo.inicial(tiempos, np.where(validos, observados, np.nan)), *modelo.limites)
+    r, j = residuos(theta, todas)
+    ssr = np.sum(r ** 2, axis=1)
+    amortiguamiento = np.full(len(theta), 1e-2)
+    iteraciones = np.zeros(len(theta), dtype=int)
+    activas = todas
+
+    for _ in range(max_iteraciones):
+        ja, ra = j[activas], r[activas]
+        jtj = np.einsum('rmp,rmq->rpq', ja, ja)
+        gradiente = np.einsum('rmp,rm->rp', ja, ra)
+        diagonal = np.einsum('rpp->rp', jtj) + 1e-12
+        sistema = jtj + (amortiguamiento[activas, None] * diagonal)[:, :, None] * np.eye(theta.shape[1])
+        paso = -np.linalg.solve(sistema, gradiente[..., None])[..., 0]
+
+        candidato = np.clip(theta[activas] + paso, *modelo.limites)
+        r_nuevo, j_nuevo = residuos(candidato, activas)
+        ssr_nuevo = np.sum(r_nuevo ** 2, axis=1)
+        acepta = np.isfinite(ssr_nuevo) & (ssr_nuevo <= ssr[activas])
+        convergida = acepta & (ssr[activas] - ssr_nuevo <= tolerancia * (1 + ssr_nuevo))
+
+        aceptadas = activas[acepta]
+        theta[aceptadas] = candidato[acepta]
+        r[aceptadas], j[aceptadas], ssr[aceptadas] = r_nuevo[acepta], j_nuevo[acepta], ssr_nuevo[acepta]
+        amortiguamiento[activas] = np.where(acepta, amortiguamiento[activas] / 3, amortiguamiento[activas] * 4)
+        iteraciones[activas] += 1
+
+        activas = activas[~convergida & (amortiguamiento[activas] < 1e10)]
+        if len(activas) == 0:
+            break
+
+    puntos = validos.reshape(len(theta), -1).sum(axis=1)
+    grados_libertad = puntos - theta.shape[1]
+    varianza = np.where(grados_libertad > 0, ssr / np.maximum(grados_libertad, 1), np.nan)
+    # Los parámetros que terminan en un límite se tratan como fijos al estimar la covarianza
+    en_limite = np.isclose(theta, modelo.limites[0]) | np.isclose(theta, modelo.limites[1])
+    j = np.where(en_limite[:, None, :], 0.0, j)
+    covarianza = np.linalg.pinv(np.einsum('rmp,rmq->rpq', j, j)) * varianza[:, None, None]
+
+    centrados = np.where(validos, observados - np.nanmean(np.where(validos, observados, np.nan), axis=1, keepdims=True), 0.0)
+    total = np.sum(centrados.reshape(len(theta), -1) ** 2, axis=1)
+    r2 = np.where(total > 0, 1 - ssr / np.where(total > 0, total, 1), np.nan)
+
+    return {'theta': theta, 'covarianza': covarianza, 'en_limite': en_limite, 'ssr': ssr, 'r2': r2,
+            'puntos': puntos, 'grados_libertad': grados_libertad, 'iteraciones': iteraciones}
+
+
+def constantes(modelo, ajuste, nivel=NIVEL_CONFIANZA):
+    """{parámetro: {'valor', 'ic_inf', 'ic_sup', 'en_limite'}} por reacción
+
+    Los intervalos de los parámetros logarítmicos se calculan en escala log
+    y se transforman (intervalos asimétricos y siempre positivos). Un
+    parámetro en el límite de su intervalo admisible no está determinado por
+    los datos y no tiene intervalo.
+    """
+    error = np.sqrt(np.clip(np.einsum('rpp->rp', ajuste['covarianza']), 0, None))
+    semiancho = cuantil_t(ajuste['grados_libertad'], nivel)[:, None] * error
+    semiancho = np.where(ajuste['en_limite'], np.nan, semiancho)
+    inferior, superior = ajuste['theta'] - semiancho, ajuste['theta'] + semiancho
+
+    transformar = np.array(modelo.logaritmicos)
+    with np.errstate(over='ignore'):
+        valores, inferior, superior = (np.where(transformar, np.exp(m), m)
+                                       for m in (ajuste['theta'], inferior, superior))
+
+    def numero(x):
+        return float(x) if np.isfinite(x) else None
+
+    return [{nombre: {'valor': numero(valores[i, p]), 'ic_inf': numero(inferior[i, p]),
+                      'ic_sup': numero(superior[i, p]), 'en_limite': bool(ajuste['en_limite'][i, p])}
+             for p, nombre in enumerate(modelo.parametros)}
+            for i in range(len(valores))]
+
+
+def motivos_fallo(ajuste, valores, logaritmicos):
+    """Motivos por los que un ajuste no es válido ([] si lo es)
+
+    Falla si R² es negativo o no se puede calcular, o si algún parámetro no
+    es identificable: en el límite de su intervalo admisible, sin intervalo
+    de confianza o con un intervalo más ancho que MAX_RAZON_IC (factor, en
+    los logarítmicos) o MAX_ANCHO_IC (puntos porcentuales).
+    """
+    motivos = []
+    if ajuste['r2'] is None or ajuste['r2'] < 0:
+        motivos.append('R² negativo' if ajuste['r2'] is not None else 'R² no calculable')
+
+    for (parametro, valor), logaritmico in zip(valores.items(), logaritmicos):
+        if valor['en_limite']:
+            motivos.append(f'{parametro} en el límite')
+        elif valor['ic_inf'] is None or valor['ic_sup'] is None:
+            motivos.append(f'{parametro} sin intervalo de confianza')
+        elif (valor['ic_inf'] <= 0 or valor['ic_sup'] / valor['ic_inf'] > MAX_RAZON_IC if logaritmico
+              else valor['ic_sup'] - valor['ic_inf'] > MAX_ANCHO_IC):
+            motivos.append(f'{parametro} no identificable')
+    return motivos
+
+
+def tabla_cinetica(resultados):
+    """Una fila por muestra con su tiempo y los observables de los modelos"""
+    filas = []
+    for experimento, datos in resultados.items():
+        for muestra in datos['muestras']:
+            fila = {'Experimento': experimento, 'Muestra': muestra['nombre'],
+                    'tiempo_min': muestra.get('tiempo_min'),
+                    'conversion_fames_pct': muestra.get('conversion_fames_pct')}
+            fila.update(muestra.get('gliceridos', {}))
+            filas.append(fila)
+    tabla = pd.DataFrame(filas)
+    columnas = [c for c in tabla.columns if c not in ('Experimento', 'Muestra')]
+    tabla[columnas] = tabla[columnas].apply(pd.to_numeric, errors='coerce')
+    return tabla
+
+
+def matrices_cinetica(tabla, observables):
+    """Tiempos (R, N) y observados (R, N, O) de las reacciones con tiempos de muestreo
+
+    Una reacción es un experimento; se descartan las muestras sin tiempo.
+    """
+    tabla = tabla[tabla['tiempo_min'].notna()].sort_values(['Experimento', 'tiempo_min'], kind='stable')
+    grupos = list(tabla.groupby('Experimento', sort=False))
+    n = max((len(grupo) for _, grupo in grupos), default=0)
+
+    tiempos = np.full((len(grupos), n), np.nan)
+    observados = np.full((len(grupos), n, len(observables)), np.nan)
+    for i, (_, grupo) in enumerate(grupos):
+        tiempos[i, :len(grupo)] = grupo['tiempo_min'].to_numpy()
+        observados[i, :len(grupo)] = grupo.reindex(columns=list(observables)).to_numpy(dtype=float)
+    return [experimento for experimento, _ in grupos], tiempos, observados
+
+
+def ajustar_experimentos(resultados, modelos=tuple(MODELOS), nivel=NIVEL_CONFIANZA):
+    """Ajusta cada modelo a todas las reacciones con tiempos de muestreo
+
+    Devuelve {experimento: {modelo: {'valido', 'motivos', 'constantes', 'r2',
+    'ssr', 'puntos', 'iteraciones'}}}; las constantes de los ajustes no
+    válidos (ver motivos_fallo) son None. No se ajustan las reacciones con
+    menos de tres tiempos o con menos datos que parámetros + 1.
+    """
+    tabla = tabla_cinetica(resultados)
+    ajustes = {}
+
+    for nombre in modelos:
+        modelo = MODELOS[nombre]()
+        experimentos, tiempos, observados = matrices_cinetica(tabla, modelo.observables)
+        suficientes = ((np.isfinite(observados).sum(axis=(1, 2)) > len(modelo.parametros))
+                       & (np.isfinite(observados).any(axis=2).sum(axis=1) >= 3))
+        if not suficientes.any():
+            continue
+
+        ajuste = ajustar_lote(modelo, tiempos[suficientes], observados[suficientes])
+        for i, (experimento, valores) in enumerate(zip(np.array(experimentos)[suficientes],
+                                                      constantes(modelo, ajuste, nivel))):
+            resultado = {
+                'r2': float(ajuste['r2'][i]) if np.isfinite(ajuste['r2'][i]) else None,
+                'ssr': float(ajuste['ssr'][i]),
+                'puntos': int(ajuste['puntos'][i]),
+                'iteraciones': int(ajuste['iteraciones'][i])
+            }
+            motivos = motivos_fallo(resultado, valores, modelo.logaritmicos)
+            ajustes.setdefault(str(experimento), {})[nombre] = {
+                'valido': not motivos,
+                'motivos': motivos,
+                'constantes': None if motivos else valores,
+                **resultado
+            }
+
+    return ajustes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ajusta modelos cinéticos a los experimentos con tiempos de muestreo')
+    parser.add_argument('--modelos', nargs='+', choices=list(MODELOS), default=list(MODELOS))
+    parser.add_argument('--nivel', type=float, default=NIVEL_CONFIANZA, help='Nivel de confianza de los intervalos')
+    args = parser.parse_args()
+
+    procesados_dir = Path('/home/user/ExperimentosBiodiesel_row/Procesados')
+    with open(procesados_dir / 'resultados_consolidados.json', 'r', encoding='utf-8') as f:
+        resultados = json.load(f)
+
+    ajustes = ajustar_experimentos(resultados, args.modelos, args.nivel)
+    output_file = procesados_dir / 'cinetica.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({'nivel_confianza': args.nivel, 'experimentos': ajustes}, f, indent=2, ensure_ascii=False)
+
+    for experimento, modelos in ajustes.items():
+        print(f"\n{experimento}:")
+        for nombre, ajuste in modelos.items():
+            r2 = f"{ajuste['r2']:.3f}" if ajuste['r2'] is not None else '-'
+            print(f"  {nombre} (R² = {r2}, {ajuste['puntos']} puntos)")
+            if not ajuste['valido']:
+                print(f"    ! Ajuste no válido: {', '.join(ajuste['motivos'])}")
+                continue
+            for parametro, valor in ajuste['constantes'].items():
+                ic = (f"[{valor['ic_inf']:.4g}, {valor['ic_sup']:.4g}]"
+                      if valor['ic_inf'] is not None and valor['ic_sup'] is not None else '')
+                nota = ' (en el límite)' if valor['en_limite'] else ''
+                print(f"    {parametro:20} {valor['valor']:.4g} {ic}{nota}")
+    print(f"\n✓ Ajustes cinéticos guardados en {output_file}")
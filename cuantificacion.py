@@ -0,0 +1,77 @@
+"""
+Cuantificación del contenido de ésteres metílicos (EN 14103)
+Calcula el contenido de FAMEs (% m/m) por estándar interno con los cálculos
+laterales de cada hoja (peso de muestra, peso y concentración del SI) y
+ajusta curvas de calibración del estándar interno a partir de las
+inyecciones de estándar (estandar_interno*_raw.csv). Todas las fórmulas
+operan sobre arrays para cuantificar un lote completo de una vez
+"""
+
+import numpy as np
+
+def contenido_esteres(area_fames, area_si, masa_si_mg, peso_muestra_mg):
+    """Contenido de ésteres (% m/m) por estándar interno, EN 14103
+
+    C = (ΣA - A_SI) / A_SI × (C_SI × V_SI) / m × 100, con area_fames = ΣA - A_SI
+    (áreas de FAMEs ya corregidas por sus factores de respuesta) y
+    masa_si_mg = C_SI × V_SI. Acepta arrays; devuelve NaN donde falte algún
+    dato o el área del SI sea cero.
+    """
+    area_fames = np.asarray(area_fames, dtype=float)
+    area_si = np.asarray(area_si, dtype=float)
+    masa_si_mg = np.asarray(masa_si_mg, dtype=float)
+    peso_muestra_mg = np.asarray(peso_muestra_mg, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        contenido = area_fames / area_si * masa_si_mg / peso_muestra_mg * 100
+    return np.where((area_si > 0) & (peso_muestra_mg > 0), contenido, np.nan)
+
+
+class CurvaCalibracion:
+    """Respuesta del detector frente a concentración: área = pendiente × C + ordenada
+
+    Con un solo punto (o sin_ordenada) la recta pasa por el origen y la
+    pendiente es el factor de respuesta.
+    """
+
+    def __init__(self, pendiente, ordenada=0.0, r2=None, puntos=()):
+        self.pendiente = float(pendiente)
+        self.ordenada = float(ordenada)
+        self.r2 = r2
+        self.puntos = [tuple(map(float, punto)) for punto in puntos]
+
+    @classmethod
+    def ajustar(cls, concentraciones, areas, sin_ordenada=False):
+        """Ajuste por mínimos cuadrados de una curva (un punto por inyección de estándar)
+
+        Se descartan las inyecciones sin respuesta (área no positiva), p. ej.
+        cuando el pico del estándar no se identificó.
+        """
+        x = np.asarray(concentraciones, dtype=float)
+        y = np.asarray(areas, dtype=float)
+        validos = np.isfinite(x) & np.isfinite(y) & (y > 0)
+        x, y = x[validos], y[validos]
+        if len(x) == 0:
+            raise ValueError("No hay puntos de calibración con respuesta del estándar")
+
+        con_ordenada = not sin_ordenada and len(np.unique(x)) >= 2
+        diseno = np.column_stack((x, np.ones_like(x))) if con_ordenada else x[:, None]
+        coeficientes, *_ = np.linalg.lstsq(diseno, y, rcond=None)
+
+        ajuste = diseno @ coeficientes
+        dispersion = np.sum((y - y.mean()) ** 2)
+        r2 = float(1 - np.sum((y - ajuste) ** 2) / dispersion) if len(x) > 2 and dispersion > 0 else None
+
+        return cls(coeficientes[0], coeficientes[1] if con_ordenada else 0.0, r2, zip(x, y))
+
+    def concentracion(self, areas):
+        """Concentración (mg/mL) que corresponde a cada área"""
+        return (np.asarray(areas, dtype=float) - self.ordenada) / self.pendiente
+
+    def a_dict(self):
+        return {'pendiente': self.pendiente, 'ordenada': self.ordenada, 'r2': self.r2,
+                'puntos': [list(punto) for punto in self.puntos]}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(datos['pendiente'], datos['ordenada'], datos.get('r2'), datos.get('puntos', ()))
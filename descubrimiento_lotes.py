@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Descubrimiento de lotes de GC y modo vigilancia
+Encuentra las carpetas de lote con prefijo de fecha (p. ej. 20251107_MORAN 7-11-25/),
+indexa sus libros Excel y PDFs, añade al registro los lotes nuevos y, en modo
+vigilancia, lanza extracción y procesamiento cuando llega una carpeta nueva
+"""
+
+import argparse
+import re
+import string
+import time
+from pathlib import Path
+
+from cache_libros import CacheLibrosExcel
+from registro_experimentos import NOMBRE_REGISTRO, archivos_fuente, cargar_registro, guardar_registro
+
+PATRON_LOTE = re.compile(r'^(\d{4})(\d{2})(\d{2})_')
+EXTENSIONES_LIBRO = {'.xls', '.xlsx'}
+PATRON_ESTANDAR_INTERNO = r'(?i)^std'
+
+
+class DescubridorLotes:
+    def __init__(self, base_dir, registro_file=None):
+        self.base_dir = Path(base_dir)
+        self.procesados_dir = self.base_dir / 'Procesados'
+        self.registro_file = Path(registro_file) if registro_file else self.base_dir / NOMBRE_REGISTRO
+        self.cache_libros = CacheLibrosExcel(self.procesados_dir / '.cache_libros')
+
+    def escanear(self):
+        """Índice de las carpetas de lote ordenadas por fecha
+
+        Cada lote es {'directorio', 'fecha', 'libros', 'pdfs'} con rutas
+        relativas a base_dir.
+        """
+        lotes = []
+        for directorio in self.base_dir.iterdir():
+            coincidencia = PATRON_LOTE.match(directorio.name)
+            if not directorio.is_dir() or not coincidencia:
+                continue
+
+            archivos = sorted(p for p in directorio.iterdir() if p.is_file())
+            lotes.append({
+                'directorio': directorio.name,
+                'fecha': '-'.join(coincidencia.groups()),
+                'libros': [p.relative_to(self.base_dir).as_posix() for p in archivos
+                           if p.suffix.lower() in EXTENSIONES_LIBRO and not p.name.startswith('~$')],
+                'pdfs': [p.relative_to(self.base_dir).as_posix() for p in archivos
+                         if p.suffix.lower() == '.pdf']
+            })
+
+        return sorted(lotes, key=lambda lote: (lote['fecha'], lote['directorio']))
+
+    def lotes_nuevos(self, registro=None):
+        """Lotes con archivos que ninguna entrada del registro usa como fuente
+
+        Cuenta como nuevo un libro no registrado o, en lotes sin libro
+        Excel, algún PDF no registrado.
+        """
+        registro = registro or cargar_registro(self.registro_file)
+        fuentes = {archivo for entrada in registro['experimentos'] for archivo in archivos_fuente(entrada)}
+
+        nuevos = []
+        for lote in self.escanear():
+            libros = [libro for libro in lote['libros'] if libro not in fuentes]
+            pdfs = [pdf for pdf in lote['pdfs'] if pdf not in fuentes]
+            if libros or (not lote['libros'] and pdfs):
+                nuevos.append(dict(lote, libros=libros, pdfs=pdfs))
+        return nuevos
+
+    def _siguiente_numero(self, registro):
+        """Siguiente N libre para la clave ExperimentoN"""
+        numeros = [int(m.group(1)) for entrada in registro['experimentos']
+                   for m in [re.match(r'^Experimento(\d+)$', entrada['clave'])] if m]
+        return max(numeros, default=0) + 1
+
+    def entrada_registro(self, lote, libro, numero):
+        """Entrada de registro generada para un lote nuevo
+
+        Cada hoja del libro (o cada PDF, si libro es None) es una muestra
+        salvo la del estándar interno; la nomenclatura sigue el esquema
+        E[experimento][letra].
+        """
+        patron_std = re.compile(PATRON_ESTANDAR_INTERNO)
+        if libro is not None:
+            origenes = [('hoja', hoja) for hoja in self.cache_libros.nombres_hojas(self.base_dir / libro)]
+        else:
+            origenes = [('pdf', pdf) for pdf in lote['pdfs']]
+
+        def nombre(origen):
+            tipo, valor = origen
+            return valor if tipo == 'hoja' else Path(valor).stem
+
+        muestras = []
+        estandar_interno = None
+        for origen in origenes:
+            if patron_std.match(nombre(origen)):
+                estandar_interno = {'patron': PATRON_ESTANDAR_INTERNO} if libro else {'pdf': origen[1]}
+                continue
+
+            orden = len(muestras) + 1
+            letra = string.ascii_lowercase[(orden - 1) % 26] * ((orden - 1) // 26 + 1)
+            muestras.append({
+                origen[0]: origen[1],
+                'archivo': 'muestra_' + re.sub(r'[^0-9A-Za-z]+', '_', nombre(origen)).strip('_'),
+                'nomenclatura': f'E{numero}{letra}',
+                'orden': orden
+            })
+
+        entrada = {'clave': f'Experimento{numero}', 'activo': True}
+        if libro is not None:
+            entrada['fuente'] = libro
+        entrada.update({
+            'experimento': f'Experimento {numero}',
+            'fecha': lote['fecha'],
+            'tipo': f"Lote {lote['directorio']} (descubierto automáticamente)",
+            'muestras': muestras
+        })
+        if estandar_interno is not None:
+            entrada['estandar_interno'] = estandar_interno
+        return entrada
+
+    def registrar_lotes_nuevos(self, directorios=None):
+        """Añade al registro una entrada por cada libro nuevo (o por cada lote
+        nuevo solo con PDFs) y devuelve las entradas
+
+        Con directorios solo se registran los lotes de esas carpetas (p. ej.
+        los que ya terminaron de copiarse en modo vigilancia).
+        """
+        registro = cargar_registro(self.registro_file)
+        entradas = []
+
+        for lote in self.lotes_nuevos(registro):
+            if directorios is not None and lote['directorio'] not in directorios:
+                continue
+            for libro in lote['libros'] or [None]:
+                entrada = self.entrada_registro(lote, libro, self._siguiente_numero(registro))
+                registro['experimentos'].append(entrada)
+                entradas.append(entrada)
+                print(f"  ✓ Lote nuevo {lote['directorio']} -> {entrada['clave']} "
+                      f"({len(entrada['muestras'])} muestras)")
+
+        if entradas:
+            guardar_registro(self.registro_file, registro)
+        return entradas
+
+    def _firma_directorio(self, directorio):
+        """Tamaño y fecha de cada archivo, para saber si la copia ya terminó"""
+        ruta = self.base_dir / directorio
+        return tuple(sorted((p.name, p.stat().st_size, p.stat().st_mtime_ns)
+                            for p in ruta.iterdir() if p.is_file()))
+
+    def publicar(self):
+        """Extrae y procesa lo que haya cambiado (ambos pasos son incrementales)"""
+        from extract_raw_data import ExtractorDatosCromatogramas
+        from procesar_cromatogramas import ProcesadorCromatogramas
+
+        ExtractorDatosCromatogramas(self.base_dir, registro_file=self.registro_file).ejecutar_extraccion()
+
+        procesador = ProcesadorCromatogramas(self.procesados_dir, registro_file=self.registro_file)
+        procesador.procesar_todos_experimentos()
+        procesador.generar_tabla_resumen()
+
+    def vigilar(self, intervalo=5.0, max_ciclos=None):
+        """Sondea base_dir y publica cada lote nuevo en cuanto termina de copiarse
+
+        Un lote se considera completo cuando su contenido no cambia entre dos
+        sondeos consecutivos. Se usa sondeo (no inotify) para no depender de
+        la plataforma ni del sistema de archivos compartido. Si un ciclo
+        falla (libro a medio escribir, error de extracción o procesamiento)
+        se informa y se reintenta en el siguiente sondeo: los lotes que no
+        llegaron a registrarse vuelven a aparecer como nuevos y, si ya estaban
+        registrados, se repite la publicación.
+        """
+        print(f"Vigilando {self.base_dir} cada {intervalo:.0f} s (Ctrl+C para salir)...")
+        firmas_previas = {}
+        ciclos = 0
+        publicacion_pendiente = False
+
+        try:
+            while max_ciclos is None or ciclos < max_ciclos:
+                ciclos += 1
+                nuevos = self.lotes_nuevos()
+
+                firmas = {lote['directorio']: self._firma_directorio(lote['directorio']) for lote in nuevos}
+                estables = [d for d, firma in firmas.items() if firmas_previas.get(d) == firma]
+                firmas_previas = firmas
+
+                try:
+                    if estables:
+                        print(f"\nLotes nuevos listos: {', '.join(estables)}")
+                        if self.registrar_lotes_nuevos(estables):
+                            publicacion_pendiente = True
+                    if publicacion_pendiente:
+                        self.publicar()
+                        publicacion_pendiente = False
+                except Exception as e:
+                    print(f"  ! Error en el ciclo {ciclos}: {e}; se reintentará en el próximo sondeo")
+
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            print("\nVigilancia detenida")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Descubre lotes de GC nuevos y los publica')
+    parser.add_argument('--vigilar', action='store_true',
+                        help='Quedarse sondeando y publicar cada lote nuevo al llegar')
+    parser.add_argument('--intervalo', type=float, default=5.0,
+                        help='Segundos entre sondeos en modo vigilancia')
+    args = parser.parse_args()
+
+    base_dir = '/home/user/ExperimentosBiodiesel_row'
+    descubridor = DescubridorLotes(base_dir)
+
+    if args.vigilar:
+        descubridor.vigilar(intervalo=args.intervalo)
+    else:
+        for lote in descubridor.escanear():
+            print(f"{lote['fecha']}  {lote['directorio']}: "
+                  f"{len(lote['libros'])} libro(s), {len(lote['pdfs'])} PDF(s)")
+        if descubridor.registrar_lotes_nuevos():
+            descubridor.publicar()
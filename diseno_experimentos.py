@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Superficie de respuesta y propuesta de nuevas corridas
+Normaliza las condiciones de reacción del registro ('CaO 1%', '50-55°C',
+'100-600', '6:1', '2 horas') en factores numéricos, ajusta por mínimos
+cuadrados con regularización ridge un modelo cuadrático (lineales, cuadrados
+e interacciones en unidades codificadas) de la conversión y la pureza de
+todo el historial, con una fila por corrida (las muestras de una reacción no
+son réplicas), y propone el siguiente lote de corridas maximizando la
+respuesta predicha más un término de exploración
+"""
+
+import argparse
+import json
+import sys
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Factor -> (mínimo, máximo) admisibles para proponer corridas
+FACTORES = {
+    'temperatura_c': (40.0, 65.0),
+    'catalizador_pct': (0.5, 3.0),
+    'relacion_molar': (3.0, 12.0),
+    'rpm': (100.0, 800.0)
+}
+
+# Muestra que representa cada corrida en el ajuste
+CRITERIOS_CORRIDA = ('final', 'maxima')
+
+RESPUESTAS = ('conversion_fames_pct', 'pureza_biodiesel_pct')
+
+NUMERO = r'(\d+(?:[.,]\d+)?)'
+SEMILLA = 20251003
+
+
+def _numero(serie):
+    return pd.to_numeric(serie.str.replace(',', '.', regex=False), errors='coerce').astype(float)
+
+
+def _centro_rango(serie, campo):
+    """'50-55°C' -> 52.5, '600' -> 600; avisa una vez por cada rango distinto
+    (el modelo solo ve su centro, no el intervalo de operación)"""
+    partes = serie.str.extract(NUMERO + r'(?:\s*(?:-|–|a)\s*' + NUMERO + ')?')
+    centro = pd.concat([_numero(partes[0]), _numero(partes[1])], axis=1).mean(axis=1)
+    for texto in pd.unique(serie[partes[1].notna()]):
+        print(f"  ! {campo} '{texto}' es un rango; se usa su centro ({centro[serie == texto].iloc[0]:g})")
+    return centro
+
+
+def normalizar_condiciones(condiciones):
+    """Factores numéricos de una lista de diccionarios de condiciones
+
+    Devuelve un DataFrame con una fila por diccionario: catalizador (tipo),
+    catalizador_pct, temperatura_c, rpm (centro de los rangos),
+    relacion_molar (metanol:aceite), duracion_min y los volúmenes y masas
+    que ya son numéricos. Los valores que no se pueden interpretar quedan NaN.
+    """
+    crudo = pd.DataFrame(list(condiciones)).astype(object)
+
+    def columna(*nombres):
+        serie = pd.Series([None] * len(crudo), dtype=object, index=crudo.index)
+        for nombre in nombres:
+            if nombre in crudo.columns:
+                serie = serie.fillna(crudo[nombre])
+        return serie.fillna('').astype(str)
+
+    factores = pd.DataFrame(index=crudo.index)
+    catalizador = columna('catalizador').str.extract(r'^\s*([A-Za-z][\w()]*)?\s*(?:' + NUMERO + r'\s*%)?')
+    factores['catalizador'] = catalizador[0]
+    factores['catalizador_pct'] = _numero(catalizador[1]).fillna(
+        _numero(columna('porcentaje_catalizador', 'catalizador_pct').str.extract(NUMERO, expand=False)))
+
+    factores['temperatura_c'] = _centro_rango(columna('temperatura', 'temperatura_c'), 'temperatura')
+    factores['rpm'] = _centro_rango(columna('rpm'), 'rpm')
+
+    relacion = columna('relacion_molar').str.extract(NUMERO + r'\s*(?::\s*' + NUMERO + ')?')
+    factores['relacion_molar'] = _numero(relacion[0]) / _numero(relacion[1]).fillna(1.0)
+
+    duracion = columna('duracion_min', 'duracion').str.extract(NUMERO + r'\s*(h|hora|min)?')
+    factores['duracion_min'] = _numero(duracion[0]) * np.where(duracion[1].fillna('').str.startswith('h'), 60, 1)
+
+    for nombre in ('aceite_ml', 'aceite_g', 'metanol_ml'):
+        factores[nombre] = _numero(columna(nombre).str.extract(NUMERO, expand=False))
+    return factores
+
+
+def factores_condiciones(condiciones):
+    """Factores numéricos de un solo diccionario de condiciones (sin los que no se interpretan)"""
+    factores = normalizar_condiciones([condiciones]).iloc[0]
+    return {campo: (valor.item() if hasattr(valor, 'item') else valor)
+            for campo, valor in factores.items() if pd.notna(valor)}
+
+
+def tabla_diseno(procesados_dir, resultados):
+    """Una fila por muestra con sus factores y respuestas
+
+    Las condiciones del experimento (metadata.json) se combinan con las que
+    declare cada muestra del registro ('condiciones' por muestra).
+    """
+    procesados_dir = Path(procesados_dir)
+    filas, condiciones = [], []
+
+    for experimento, datos in resultados.items():
+        metadata_file = procesados_dir / experimento / 'metadata.json'
+        metadata = json.loads(metadata_file.read_text(encoding='utf-8')) if metadata_file.exists() else {}
+        por_muestra = {m.get('nomenclatura'): m.get('condiciones', {}) for m in metadata.get('muestras', [])}
+
+        for muestra in datos['muestras']:
+            condiciones.append({**metadata.get('condiciones', {}), **por_muestra.get(muestra['nombre'], {})})
+            filas.append({'Experimento': experimento, 'Muestra': muestra['nombre'],
+                          'orden': muestra.get('orden'), 'tiempo_min': muestra.get('tiempo_min'),
+                          **{respuesta: muestra.get(respuesta) for respuesta in RESPUESTAS}})
+
+    tabla = pd.DataFrame(filas)
+    if tabla.empty:
+        return tabla
+    tabla = pd.concat([tabla, normalizar_condiciones(condiciones)], axis=1)
+    numericas = ['orden', 'tiempo_min', *RESPUESTAS]
+    tabla[numericas] = tabla[numericas].apply(pd.to_numeric, errors='coerce')
+    return tabla
+
+
+def tabla_corridas(tabla, criterio='final'):
+    """Una fila por corrida (experimento y condiciones) de la tabla de diseño
+
+    Las muestras de una corrida son puntos de la misma reacción a distintos
+    tiempos, no réplicas independientes. Con criterio 'final' cada corrida
+    se representa por su última muestra (mayor tiempo_min si todas sus
+    muestras lo tienen o, si no, la de mayor orden en el experimento) y
+    con 'maxima' por la de mayor conversión.
+    """
+    if criterio not in CRITERIOS_CORRIDA:
+        raise ValueError(f"Criterio desconocido: {criterio} (opciones: {', '.join(CRITERIOS_CORRIDA)})")
+    if tabla.empty:
+        return tabla
+
+    claves = ['Experimento', *[f for f in FACTORES if f in tabla.columns]]
+    tabla = tabla.assign(_posicion=np.arange(len(tabla), dtype=float))
+    if criterio == 'final':
+        con_tiempos = tabla['tiempo_min'].notna().groupby(
+            [tabla[c] for c in claves], dropna=False, sort=False).transform('all')
+        tabla['_orden'] = tabla['tiempo_min'].where(con_tiempos, tabla['orden'])
+    else:
+        tabla['_orden'] = tabla[RESPUESTAS[0]]
+    corridas = (tabla.sort_values(['_orden', '_posicion'], na_position='first', kind='stable')
+                .groupby(claves, dropna=False, sort=False).tail(1))
+    return corridas.sort_values('_posicion').drop(columns=['_posicion', '_orden']).reset_index(drop=True)
+
+
+class SuperficieRespuesta:
+    def __init__(self, factores=None, ridge=1e-3):
+        """
+        Args:
+            factores: {factor: (mínimo, máximo)}; por defecto FACTORES. Los
+                límites codifican cada factor a [-1, 1] y acotan las propuestas
+            ridge: Penalización de los coeficientes (salvo la ordenada), que
+                mantiene el ajuste estable con pocas corridas o factores colineales
+        """
+        self.factores = dict(factores or FACTORES)
+        self.ridge = ridge
+        self.activos = []
+        self.coeficientes = None
+
+    def codificar(self, valores, factores):
+        bajo = np.array([self.factores[f][0] for f in factores])
+        alto = np.array([self.factores[f][1] for f in factores])
+        return 2 * (np.asarray(valores, dtype=float) - bajo) / (alto - bajo) - 1
+
+    def decodificar(self, codificados, factores):
+        bajo = np.array([self.factores[f][0] for f in factores])
+        alto = np.array([self.factores[f][1] for f in factores])
+        return bajo + (np.asarray(codificados) + 1) / 2 * (alto - bajo)
+
+    def terminos(self, x):
+        """Matriz de diseño cuadrática: 1, x_i, x_i², x_i·x_j"""
+        columnas = [np.ones(len(x)), *x.T, *(x ** 2).T]
+        columnas += [x[:, i] * x[:, j] for i, j in combinations(range(x.shape[1]), 2)]
+        return np.column_stack(columnas)
+
+    def nombres_terminos(self):
+        nombres = ['ordenada', *self.activos, *[f'{f}²' for f in self.activos]]
+        return nombres + [f'{a}·{b}' for a, b in combinations(self.activos, 2)]
+
+    def ajustar(self, tabla, respuestas=RESPUESTAS):
+        """Ajusta todas las respuestas a la vez sobre las corridas con datos completos
+
+        Sólo entran al modelo los factores con al menos dos valores distintos
+        en el historial; el resto no se puede estimar.
+        """
+        respuestas = list(respuestas)
+        disponibles = [f for f in self.factores if f in tabla.columns]
+        completas = tabla[respuestas].notna().all(axis=1)
+        self.activos = [f for f in disponibles if tabla.loc[completas, f].nunique() >= 2]
+        filas = completas & tabla[self.activos].notna().all(axis=1)
+
+        self.respuestas = respuestas
+        self.x = self.codificar(tabla.loc[filas, self.activos].to_numpy(dtype=float), self.activos)
+        y = tabla.loc[filas, respuestas].to_numpy(dtype=float)
+        diseno = self.terminos(self.x)
+
+        # Ridge como mínimos cuadrados aumentados: [X; √λ I] β = [Y; 0]
+        penalizacion = np.sqrt(self.ridge) * np.eye(diseno.shape[1])[1:]
+        aumentada = np.vstack((diseno, penalizacion))
+        objetivo = np.vstack((y, np.zeros((len(penalizacion), y.shape[1]))))
+        self.coeficientes, *_ = np.linalg.lstsq(aumentada, objetivo, rcond=None)
+        self.inversa = np.linalg.pinv(aumentada.T @ aumentada)
+
+        residuos = y - diseno @ self.coeficientes
+        self.corridas = len(y)
+        grados_libertad = max(self.corridas - diseno.shape[1], 1)
+        self.varianza = (residuos ** 2).sum(axis=0) / grados_libertad
+        dispersion = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.r2 = np.where(dispersion > 0, 1 - (residuos ** 2).sum(axis=0) / dispersion, np.nan)
+        return self
+
+    def predecir(self, x_codificado):
+        """Media (n, R) y desviación de la media (n, R) en puntos codificados de los factores activos"""
+        diseno = self.terminos(np.atleast_2d(x_codificado))
+        apalancamiento = np.einsum('ij,jk,ik->i', diseno, self.inversa, diseno)
+        return diseno @ self.coeficientes, np.sqrt(np.outer(apalancamiento, self.varianza))
+
+    def proponer(self, n=4, respuesta=RESPUESTAS[0], exploracion=1.0, candidatos=4096,
+                 distancia_min=0.3, semilla=SEMILLA):
+        """Siguiente lote de n corridas dentro de los límites de todos los factores
+
+        Se puntúan candidatos aleatorios con media + exploracion × desviación
+        (límite de confianza superior) y se eligen de mayor a menor exigiendo
+        una distancia codificada mínima entre propuestas y con las corridas
+        ya hechas. Los factores que el modelo no estima se exploran sólo por
+        esa distancia; sin factores activos las corridas hechas no ocupan
+        ningún punto del espacio y no limitan las propuestas.
+        """
+        factores = list(self.factores)
+        generador = np.random.default_rng(semilla)
+        puntos = generador.uniform(-1, 1, size=(candidatos, len(factores)))
+        activos = [factores.index(f) for f in self.activos]
+
+        media, desviacion = self.predecir(puntos[:, activos])
+        k = self.respuestas.index(respuesta)
+        puntuacion = media[:, k] + exploracion * desviacion[:, k]
+
+        if activos:
+            distancia = np.linalg.norm(puntos[:, None, activos] - self.x[None], axis=2).min(axis=1, initial=np.inf)
+        else:
+            distancia = np.full(len(puntos), np.inf)
+        disponible = distancia >= distancia_min
+
+        elegidas = []
+        for indice in np.argsort(-puntuacion, kind='stable'):
+            if len(elegidas) == n:
+                break
+            if not disponible[indice]:
+                continue
+            elegidas.append(indice)
+            disponible &= np.linalg.norm(puntos - puntos[indice], axis=1) >= distancia_min
+        if len(elegidas) < n:
+            print(f"  ! Sólo {len(elegidas)} de {n} propuestas a distancia codificada >= {distancia_min:g} "
+                  "de las corridas hechas y entre sí")
+
+        valores = self.decodificar(puntos[elegidas], factores)
+        return [{**{f: float(round(v, 2)) for f, v in zip(factores, fila)},
+                 **{f'{r}_predicha': float(media[i, j]) for j, r in enumerate(self.respuestas)},
+                 **{f'{r}_desviacion': float(desviacion[i, j]) for j, r in enumerate(self.respuestas)}}
+                for fila, i in zip(valores, elegidas)]
+
+    def resumen(self):
+        """Coeficientes y calidad del ajuste (para el reporte)"""
+        return {
+            'factores_activos': self.activos,
+            'corridas': self.corridas,
+            'ridge': self.ridge,
+            'terminos': self.nombres_terminos(),
+            'respuestas': {r: {'coeficientes': self.coeficientes[:, j].tolist(),
+                               'r2': float(self.r2[j]) if np.isfinite(self.r2[j]) else None,
+                               'desviacion_residual': float(np.sqrt(self.varianza[j]))}
+                           for j, r in enumerate(self.respuestas)}
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ajusta la superficie de respuesta y propone nuevas corridas')
+    parser.add_argument('--propuestas', type=int, default=4, help='Número de corridas a proponer')
+    parser.add_argument('--respuesta', choices=RESPUESTAS, default=RESPUESTAS[0])
+    parser.add_argument('--exploracion', type=float, default=1.0,
+                        help='Peso de la incertidumbre frente a la respuesta predicha')
+    parser.add_argument('--criterio', choices=CRITERIOS_CORRIDA, default='final',
+                        help='Muestra de cada corrida que entra al ajuste (final o de conversión máxima)')
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    args = parser.parse_args()
+
+    procesados_dir = Path('/home/user/ExperimentosBiodiesel_row/Procesados')
+    with open(procesados_dir / 'resultados_consolidados.json', 'r', encoding='utf-8') as f:
+        resultados = json.load(f)
+
+    tabla = tabla_diseno(procesados_dir, resultados)
+    if tabla.empty:
+        print("No hay muestras procesadas; no se ajusta el modelo")
+        sys.exit(0)
+
+    superficie = SuperficieRespuesta().ajustar(tabla_corridas(tabla, args.criterio))
+    propuestas = superficie.proponer(args.propuestas, args.respuesta, args.exploracion, semilla=args.semilla)
+
+    columnas_factores = ['catalizador', 'catalizador_pct', 'temperatura_c', 'rpm', 'relacion_molar', 'duracion_min']
+    condiciones = (tabla.groupby('Experimento')[columnas_factores].first()
+                   .astype(object).where(lambda df: df.notna(), None).to_dict(orient='index'))
+
+    output_file = procesados_dir / 'diseno_experimentos.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({'condiciones': condiciones, 'modelo': superficie.resumen(), 'propuestas': propuestas},
+                  f, indent=2, ensure_ascii=False)
+
+    print(f"Factores en el modelo: {', '.join(superficie.activos) or 'ninguno'} ({superficie.corridas} corridas)")
+    for i, propuesta in enumerate(propuestas, 1):
+        factores = ', '.join(f"{f}={propuesta[f]:g}" for f in superficie.factores)
+        print(f"  {i}. {factores} -> {propuesta[args.respuesta + '_predicha']:.2f}% "
+              f"± {propuesta[args.respuesta + '_desviacion']:.2f}")
+    print(f"\n✓ Diseño guardado en {output_file}")
@@ -1,178 +1,209 @@
 #!/usr/bin/env python3
 """
-Script para extraer datos crudos de cromatogramas Excel a archivos CSV
-Organiza los datos por experimento en la carpeta Procesados/
+Script para extraer datos crudos de cromatogramas Excel (o de sus reportes PDF)
+a archivos CSV. Organiza los datos por experimento en la carpeta Procesados/
 """
 
-import pandas as pd
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import json
 
+from almacen_picos import PYARROW_DISPONIBLE, escribir_particion, tabla_picos
+from base_datos import NOMBRE_BASE_DATOS, BaseDatosResultados, picos_experimento
+from cache_libros import CacheLibrosExcel
+from calculos_hoja import guardar_calculos, leer_calculos_hoja
+from diseno_experimentos import factores_condiciones
+from manifiesto import ManifiestoProcesamiento
+from pdf_cromatogramas import PYPDF_DISPONIBLE, LectorPDFCromatogramas
+from registro_experimentos import (NOMBRE_REGISTRO, archivos_fuente, buscar_hoja, cargar_registro,
+                                   experimentos_activos, nombre_muestra, usa_libro)
+
 class ExtractorDatosCromatogramas:
-    def __init__(self, base_dir):
+    def __init__(self, base_dir, incremental=True, registro_file=None, base_datos=None):
         self.base_dir = Path(base_dir)
         self.procesados_dir = self.base_dir / 'Procesados'
         self.metadata = {}
 
-    def extraer_experimento1(self):
-        """Extrae datos del Experimento 1 (03/10/2025)"""
-        print("Extrayendo Experimento 1...")
-
-        exp1_dir = self.procesados_dir / 'Experimento1'
-        source_file = self.base_dir / 'Experimento1/Cromatograma/cromatogramaExperimento1.xlsx'
-
-        if not source_file.exists():
-            print(f"ERROR: No se encuentra {source_file}")
+        # Base SQLite opcional (base_datos.py) donde se guardan experimentos, muestras y picos
+        self.base_datos = Path(base_datos) if base_datos else None
+
+        # Registro declarativo de experimentos, libros fuente y hojas
+        self.registro_file = Path(registro_file) if registro_file else self.base_dir / NOMBRE_REGISTRO
+
+        # Caché de hojas Excel compartida por todas las extracciones
+        self.cache_libros = CacheLibrosExcel(self.procesados_dir / '.cache_libros')
+
+        # Lector de reportes PDF, para muestras sin hoja en el libro
+        self.lector_pdf = None
+        if PYPDF_DISPONIBLE:
+            self.lector_pdf = LectorPDFCromatogramas(self.procesados_dir / '.cache_pdf')
+
+        # Manifiesto para omitir libros Excel que no cambiaron desde la última extracción
+        self.manifiesto = None
+        if incremental:
+            self.manifiesto = ManifiestoProcesamiento(self.procesados_dir / 'manifiesto.json')
+
+    def __getstate__(self):
+        """Estado enviado a los procesos de trabajo (sin manifiesto ni caché en memoria)"""
+        estado = self.__dict__.copy()
+        estado['metadata'] = {}
+        estado['manifiesto'] = None
+        estado['cache_libros'] = CacheLibrosExcel(self.cache_libros.cache_dir)
+        if self.lector_pdf is not None:
+            estado['lector_pdf'] = LectorPDFCromatogramas(self.lector_pdf.cache_dir)
+        return estado
+
+    def _extraccion_vigente(self, entrada):
+        """Metadata de la extracción previa si los archivos fuente, la entrada
+        del registro y los archivos derivados no cambiaron; None en otro caso"""
+        metadata_file = self.procesados_dir / entrada['clave'] / 'metadata.json'
+        if self.manifiesto is None or not metadata_file.exists():
+            return None
+
+        fuentes = [self.base_dir / archivo for archivo in archivos_fuente(entrada)]
+        if self.manifiesto.vigente(f"extraccion:{entrada['clave']}", fuentes, entrada) is None:
+            return None
+
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _registrar_extraccion(self, entrada, derivados):
+        """Registra en el manifiesto los archivos fuente y los derivados"""
+        if self.manifiesto is None:
             return
 
-        # Leer todas las hojas
-        df_dict = pd.read_excel(source_file, sheet_name=None)
+        fuentes = [self.base_dir / archivo for archivo in archivos_fuente(entrada)]
+        self.manifiesto.registrar(f"extraccion:{entrada['clave']}", fuentes, entrada,
+                                  derivados=derivados)
+
+    def _guardar_almacen_picos(self, clave, tablas):
+        """Escribe la partición del experimento en el almacén columnar de picos"""
+        if not PYARROW_DISPONIBLE:
+            return []
+
+        ruta = escribir_particion(self.procesados_dir / 'picos', clave, tablas)
+        print(f"  ✓ Almacén de picos actualizado -> {ruta.relative_to(self.procesados_dir)}")
+        return [ruta]
+
+    def _tabla_especificacion(self, especificacion, hoja, df_dict):
+        """(nombre original, tabla de picos) de una muestra o del estándar interno
+
+        Se usa la hoja del libro si existe; si no, la tabla "Peak results"
+        del PDF indicado en 'pdf'. Devuelve (None, None) si no hay ninguna.
+        """
+        if hoja is not None:
+            return hoja, df_dict[hoja]
+
+        if 'pdf' in especificacion:
+            if self.lector_pdf is None:
+                print(f"  ! Se requiere pypdf para leer {especificacion['pdf']}")
+                return None, None
+            ruta = self.base_dir / especificacion['pdf']
+            return ruta.stem, self.lector_pdf.tabla_picos(ruta)
+
+        return None, None
+
+    def extraer_experimento(self, entrada):
+        """Extrae un experimento del registro: una unidad de trabajo independiente
+
+        Escribe un CSV por muestra (y del estándar interno si existe), la
+        partición del almacén de picos, los cálculos laterales de las hojas
+        (calculos_hoja.json) y metadata.json. Devuelve
+        (metadata, derivados) o None si falta algún archivo fuente.
+        """
+        clave = entrada['clave']
+        print(f"Extrayendo {clave} ({entrada['experimento']}, {entrada['fecha']})...")
+
+        exp_dir = self.procesados_dir / clave
+        source_file = self.base_dir / entrada['fuente'] if entrada.get('fuente') else None
+
+        faltantes = [archivo for archivo in archivos_fuente(entrada) if not (self.base_dir / archivo).exists()]
+        if faltantes:
+            print(f"ERROR: No se encuentra {self.base_dir / faltantes[0]}")
+            return None
+
+        exp_dir.mkdir(parents=True, exist_ok=True)
+
+        especificaciones = list(entrada['muestras'])
+        if entrada.get('estandar_interno'):
+            especificaciones.append(entrada['estandar_interno'])
+
+        # Resolver los nombres reales de las hojas y leer solo esas; el libro
+        # no se abre si todas las muestras vienen de sus PDFs
+        nombres_hojas = []
+        if source_file is not None and any(usa_libro(espec) for espec in especificaciones):
+            nombres_hojas = self.cache_libros.nombres_hojas(source_file)
+        hojas = {id(espec): buscar_hoja(espec, nombres_hojas) for espec in especificaciones}
+
+        df_dict = {}
+        if any(hoja is not None for hoja in hojas.values()):
+            df_dict = self.cache_libros.leer_hojas(
+                source_file, [hoja for hoja in hojas.values() if hoja is not None])
+
+        derivados = []
+        tablas = []
+        calculos = {}
 
         metadata = {
-            'experimento': 'Experimento 1',
-            'fecha': '2025-10-03',
-            'fuente': str(source_file),
-            'tipo': 'Transesterificación con CaO',
-            'condiciones': {
-                'aceite_ml': 100,
-                'metanol_ml': 25.51,
-                'catalizador': 'CaO 1%',
-                'temperatura': '50-55°C',
-                'rpm': '100-600',
-                'duracion_min': 120,
-                'relacion_molar': '6:1'
-            },
-            'muestras': []
+            'experimento': entrada['experimento'],
+            'fecha': entrada['fecha'],
+            'fuente': str(source_file if source_file is not None
+                          else self.base_dir / Path(archivos_fuente(entrada)[0]).parent),
+            'tipo': entrada['tipo']
         }
+        if 'condiciones' in entrada:
+            metadata['condiciones'] = entrada['condiciones']
+            metadata['factores'] = factores_condiciones(entrada['condiciones'])
+        metadata['muestras'] = []
 
         # Procesar cada muestra
-        for sheet_name in ['2.1', '3.1', '5.1', '6.1', '9.1', '12.1']:
-            if sheet_name in df_dict:
-                df = df_dict[sheet_name]
-
-                # Guardar CSV
-                csv_file = exp1_dir / f'muestra_{sheet_name.replace(".", "_")}_raw.csv'
-                df.to_csv(csv_file, index=False)
-
-                metadata['muestras'].append({
-                    'nombre': sheet_name,
-                    'archivo_csv': str(csv_file.relative_to(self.procesados_dir))
-                })
-
-                print(f"  ✓ Extraída muestra {sheet_name} -> {csv_file.name}")
-
-        # Guardar metadata
-        with open(exp1_dir / 'metadata.json', 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
-
-        self.metadata['Experimento1'] = metadata
-        print(f"  ✓ Metadata guardada\n")
-
-    def extraer_experimento2(self):
-        """Extrae datos del MORAN 20/10/2025"""
-        print("Extrayendo Experimento 2 (MORAN 20/10/2025)...")
-
-        exp2_dir = self.procesados_dir / 'Experimento2'
-        source_file = self.base_dir / '20251020_MORAN 20-10-25/2025-10-20 MORAN.XLS'
-
-        if not source_file.exists():
-            print(f"ERROR: No se encuentra {source_file}")
-            return
-
-        df_dict = pd.read_excel(source_file, sheet_name=None)
-
-        metadata = {
-            'experimento': 'MORAN Experimento 1',
-            'fecha': '2025-10-20',
-            'fuente': str(source_file),
-            'tipo': 'Análisis de diferentes condiciones',
-            'muestras': []
-        }
-
-        for sheet_name in ['1.1', '8.1', '10.1', '11.1', 'SN1', 'SN2']:
-            if sheet_name in df_dict:
-                df = df_dict[sheet_name]
-
-                csv_file = exp2_dir / f'muestra_{sheet_name.replace(".", "_")}_raw.csv'
-                df.to_csv(csv_file, index=False)
-
-                metadata['muestras'].append({
-                    'nombre': sheet_name,
-                    'archivo_csv': str(csv_file.relative_to(self.procesados_dir))
-                })
-
-                print(f"  ✓ Extraída muestra {sheet_name} -> {csv_file.name}")
-
-        # También extraer el estándar interno
-        if 'std interno_20_10_2025 02_32_28' in df_dict:
-            df_std = df_dict['std interno_20_10_2025 02_32_28']
-            csv_file = exp2_dir / 'estandar_interno_raw.csv'
-            df_std.to_csv(csv_file, index=False)
-            print(f"  ✓ Extraído estándar interno -> {csv_file.name}")
-
-        with open(exp2_dir / 'metadata.json', 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
-
-        self.metadata['Experimento2'] = metadata
-        print(f"  ✓ Metadata guardada\n")
-
-    def extraer_experimento3(self):
-        """Extrae datos del MORAN 07/11/2025"""
-        print("Extrayendo Experimento 3 (MORAN 07/11/2025)...")
-
-        exp3_dir = self.procesados_dir / 'Experimento3'
-        source_file = self.base_dir / '20251107_MORAN 7-11-25/2025-11-07 MORAN.XLS'
-
-        if not source_file.exists():
-            print(f"ERROR: No se encuentra {source_file}")
-            return
-
-        df_dict = pd.read_excel(source_file, sheet_name=None)
-
-        metadata = {
-            'experimento': 'MORAN Experimento 2',
-            'fecha': '2025-11-07',
-            'fuente': str(source_file),
-            'tipo': 'Nuevas reacciones y puntos de control',
-            'muestras': []
-        }
-
-        sheets_map = {
-            '6.2': 'muestra_6_2',
-            '12.2': 'muestra_12_2',
-            '5_07_11_2025 12_25_25 p. m.': 'muestra_RXN5',
-            '10_07_11_2025 12_52_05 p. m.': 'muestra_RXN10',
-            'MITAD': 'muestra_MITAD',
-            'FINAL': 'muestra_FINAL'
-        }
-
-        for sheet_name, nombre_archivo in sheets_map.items():
-            if sheet_name in df_dict:
-                df = df_dict[sheet_name]
-
-                csv_file = exp3_dir / f'{nombre_archivo}_raw.csv'
-                df.to_csv(csv_file, index=False)
-
-                metadata['muestras'].append({
-                    'nombre': sheet_name,
-                    'archivo_csv': str(csv_file.relative_to(self.procesados_dir))
-                })
-
-                print(f"  ✓ Extraída muestra {sheet_name} -> {csv_file.name}")
+        for muestra in entrada['muestras']:
+            sheet_name, df = self._tabla_especificacion(muestra, hojas[id(muestra)], df_dict)
+            if df is None:
+                print(f"  ! No se encuentra la hoja ni el PDF de {muestra['archivo']}")
+                continue
+
+            # Guardar CSV
+            csv_file = exp_dir / f"{muestra['archivo']}_raw.csv"
+            df.to_csv(csv_file, index=False)
+            derivados.append(csv_file)
+            tablas.append(tabla_picos(df, nombre_muestra(csv_file)))
+            calculos[nombre_muestra(csv_file)] = leer_calculos_hoja(df)
+
+            info = {
+                'nombre_original': sheet_name,
+                'nomenclatura': muestra.get('nomenclatura', nombre_muestra(csv_file)),
+                'archivo_csv': str(csv_file.relative_to(self.procesados_dir))
+            }
+            for campo in ('tiempo', 'tipo', 'peso_muestra_mg', 'condiciones'):
+                if campo in muestra:
+                    info[campo] = muestra[campo]
+            info['orden'] = muestra.get('orden', 0)
+            metadata['muestras'].append(info)
+
+            print(f"  ✓ Extraída muestra {sheet_name} -> {csv_file.name}")
 
         # Extraer estándar interno
-        std_sheet = 'STD INT_07_11_2025 09_45_09 a. m.'
-        if std_sheet in df_dict:
-            df_std = df_dict[std_sheet]
-            csv_file = exp3_dir / 'estandar_interno_raw.csv'
-            df_std.to_csv(csv_file, index=False)
-            print(f"  ✓ Extraído estándar interno -> {csv_file.name}")
-
-        with open(exp3_dir / 'metadata.json', 'w', encoding='utf-8') as f:
+        if entrada.get('estandar_interno'):
+            espec_std = entrada['estandar_interno']
+            _, df_std = self._tabla_especificacion(espec_std, hojas[id(espec_std)], df_dict)
+            if df_std is not None:
+                csv_file = exp_dir / 'estandar_interno_raw.csv'
+                df_std.to_csv(csv_file, index=False)
+                derivados.append(csv_file)
+                tablas.append(tabla_picos(df_std, 'estandar_interno'))
+                calculos['estandar_interno'] = leer_calculos_hoja(df_std)
+                print(f"  ✓ Extraído estándar interno -> {csv_file.name}")
+
+        derivados += self._guardar_almacen_picos(clave, tablas)
+        derivados.append(guardar_calculos(exp_dir, calculos))
+
+        with open(exp_dir / 'metadata.json', 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2, ensure_ascii=False)
 
-        self.metadata['Experimento3'] = metadata
         print(f"  ✓ Metadata guardada\n")
+        return metadata, derivados
 
     def crear_documentacion(self):
         """Crea archivo README con documentación de los datos"""
@@ -197,6 +228,7 @@ Cada carpeta de experimento contiene:
 - `muestra_*_raw.csv`: Datos crudos de cada muestra analizada
 - `metadata.json`: Información sobre el experimento (fecha, condiciones, fuente)
 - `estandar_interno_raw.csv`: Datos del estándar interno (cuando aplica)
+- `calculos_hoja.json`: Cálculos laterales de cada hoja (áreas, pesos, % FAMEs) como registros tipados
 
 ## Formato de los datos CSV
 
@@ -247,20 +279,61 @@ Consulta el archivo `metadata.json` en cada carpeta para información detallada
 
         print(f"✓ Metadata global guardada: {metadata_file}\n")
 
-    def ejecutar_extraccion(self):
-        """Ejecuta la extracción completa"""
+    def ejecutar_extraccion(self, workers=None):
+        """Ejecuta la extracción de todos los experimentos activos del registro
+
+        Cada experimento es una unidad de trabajo independiente; con
+        workers > 1 se extraen en paralelo en un ProcessPoolExecutor.
+        """
         print("=" * 80)
         print("EXTRACCIÓN DE DATOS CRUDOS DE CROMATOGRAMAS")
         print("=" * 80)
         print()
 
-        self.extraer_experimento1()
-        self.extraer_experimento2()
-        self.extraer_experimento3()
+        entradas = experimentos_activos(cargar_registro(self.registro_file))
+
+        metadata_exp = {}
+        pendientes = []
+        for entrada in entradas:
+            metadata = self._extraccion_vigente(entrada)
+            if metadata is not None:
+                metadata_exp[entrada['clave']] = metadata
+                print(f"Sin cambios en los archivos fuente de {entrada['clave']}, se conserva la extracción\n")
+            else:
+                pendientes.append(entrada)
+
+        if workers and workers > 1 and len(pendientes) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                extraidos = list(executor.map(self.extraer_experimento, pendientes))
+        else:
+            extraidos = [self.extraer_experimento(entrada) for entrada in pendientes]
+
+        for entrada, extraido in zip(pendientes, extraidos):
+            if extraido is not None:
+                metadata, derivados = extraido
+                metadata_exp[entrada['clave']] = metadata
+                self._registrar_extraccion(entrada, derivados)
+
+        # Mantener el orden del registro
+        for entrada in entradas:
+            if entrada['clave'] in metadata_exp:
+                self.metadata[entrada['clave']] = metadata_exp[entrada['clave']]
+
+        if self.base_datos is not None:
+            extraidos_ahora = {entrada['clave'] for entrada, extraido in zip(pendientes, extraidos) if extraido}
+            with BaseDatosResultados(self.base_datos) as base:
+                for clave, metadata in self.metadata.items():
+                    if clave in extraidos_ahora or not base.contiene_experimento(clave):
+                        base.guardar_extraccion(clave, metadata, picos_experimento(self.procesados_dir / clave))
+            print(f"✓ Base de datos actualizada: {self.base_datos}\n")
 
         self.crear_documentacion()
         self.guardar_metadata_global()
 
+        if self.manifiesto is not None:
+            self.manifiesto.registrar_archivo(self.procesados_dir / 'metadata_global.json')
+            self.manifiesto.guardar()
+
         print("=" * 80)
         print("EXTRACCIÓN COMPLETADA")
         print("=" * 80)
@@ -271,6 +344,14 @@ Consulta el archivo `metadata.json` en cada carpeta para información detallada
         print(f"Total de muestras extraídas: {total_muestras}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extrae los libros Excel y PDFs del registro a Procesados/')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Número de procesos para extraer experimentos en paralelo')
+    parser.add_argument('--base-datos', action='store_true',
+                        help=f'Guardar experimentos, muestras y picos en Procesados/{NOMBRE_BASE_DATOS}')
+    args = parser.parse_args()
+
     base_dir = '/home/user/ExperimentosBiodiesel_row'
-    extractor = ExtractorDatosCromatogramas(base_dir)
-    extractor.ejecutar_extraccion()
+    extractor = ExtractorDatosCromatogramas(
+        base_dir, base_datos=Path(base_dir) / 'Procesados' / NOMBRE_BASE_DATOS if args.base_datos else None)
+    extractor.ejecutar_extraccion(workers=args.workers)
@@ -0,0 +1,114 @@
+"""
+Manifiesto de procesamiento incremental
+Registra hash, tamaño y fecha de modificación de archivos fuente y derivados
+para que la extracción y el procesamiento solo recalculen lo que cambió
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+VERSION_MANIFIESTO = 1
+
+
+def calcular_hash_archivo(ruta, tamano_bloque=1 << 20):
+    """Calcula el SHA-256 del contenido de un archivo"""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_parametros(parametros):
+    """Huella estable de un conjunto de parámetros serializables en JSON"""
+    texto = json.dumps(parametros, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class ManifiestoProcesamiento:
+    def __init__(self, ruta_manifiesto):
+        self.ruta = Path(ruta_manifiesto)
+        self.raiz = self.ruta.parent
+        self.datos = {'version': VERSION_MANIFIESTO, 'archivos': {}, 'unidades': {}}
+
+        if self.ruta.exists():
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('version') == VERSION_MANIFIESTO:
+                self.datos = datos
+
+    def _clave_archivo(self, ruta):
+        """Ruta relativa al directorio del manifiesto, con separador '/'"""
+        return Path(os.path.relpath(Path(ruta).resolve(), self.raiz.resolve())).as_posix()
+
+    def huella_archivo(self, ruta):
+        """Devuelve {sha256, tamano, mtime_ns} de un archivo
+
+        Si tamaño y fecha coinciden con lo registrado se reutiliza el hash
+        guardado; en otro caso se recalcula a partir del contenido.
+        """
+        ruta = Path(ruta)
+        estado = ruta.stat()
+        registrado = self.datos['archivos'].get(self._clave_archivo(ruta))
+
+        if (registrado and registrado['tamano'] == estado.st_size
+                and registrado['mtime_ns'] == estado.st_mtime_ns):
+            return dict(registrado)
+
+        return {
+            'sha256': calcular_hash_archivo(ruta),
+            'tamano': estado.st_size,
+            'mtime_ns': estado.st_mtime_ns
+        }
+
+    def registrar_archivo(self, ruta):
+        """Registra la huella actual de un archivo y la devuelve"""
+        huella = self.huella_archivo(ruta)
+        self.datos['archivos'][self._clave_archivo(ruta)] = huella
+        return huella
+
+    def vigente(self, clave, entradas, parametros=None):
+        """Devuelve el registro de una unidad de trabajo si sigue vigente
+
+        Una unidad está vigente cuando sus parámetros no cambiaron y todos
+        los archivos registrados (entradas y artefactos derivados) existen
+        con el mismo contenido. En otro caso devuelve None.
+        """
+        registro = self.datos['unidades'].get(clave)
+        if registro is None or registro['parametros'] != huella_parametros(parametros):
+            return None
+
+        claves_entradas = {self._clave_archivo(ruta) for ruta in entradas}
+        if not claves_entradas <= registro['archivos'].keys():
+            return None
+
+        for clave_archivo, esperado in registro['archivos'].items():
+            ruta = self.raiz / clave_archivo
+            if not ruta.exists():
+                return None
+            huella = self.huella_archivo(ruta)
+            if huella['sha256'] != esperado:
+                return None
+            self.datos['archivos'][clave_archivo] = huella
+
+        return registro
+
+    def registrar(self, clave, entradas, parametros=None, derivados=(), resultado=None):
+        """Registra una unidad de trabajo con sus entradas, derivados y resultado"""
+        archivos = {}
+        for ruta in list(entradas) + list(derivados):
+            archivos[self._clave_archivo(ruta)] = self.registrar_archivo(ruta)['sha256']
+
+        self.datos['unidades'][clave] = {
+            'parametros': huella_parametros(parametros),
+            'archivos': archivos,
+            'resultado': resultado
+        }
+
+    def guardar(self):
+        """Escribe el manifiesto en disco"""
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.datos, f, indent=2, ensure_ascii=False)
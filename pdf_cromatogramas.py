@@ -0,0 +1,295 @@
+"""
+Lectura de los reportes PDF del cromatógrafo
+Extrae de cada PDF la tabla "Peak results" con el mismo esquema que la
+exportación a Excel (Index, Name, Time, Quantity, Height, Area, Area %) y la
+traza vectorial del cromatograma, calibrando los ejes con las etiquetas de
+sus marcas. Los resultados se guardan en caché por hash del archivo
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from manifiesto import calcular_hash_archivo
+
+try:
+    import pypdf
+    from pypdf.generic import DecodedStreamObject
+    PYPDF_DISPONIBLE = True
+except ImportError:
+    PYPDF_DISPONIBLE = False
+
+# Columnas de la tabla "Peak results" y la línea de unidades que sigue al encabezado
+COLUMNAS_REPORTE = {
+    'Index': None,
+    'Name': None,
+    'Time': '[Min]',
+    'Quantity': '[% Area]',
+    'Height': '[µV]',
+    'Area': '[µV.Min]',
+    'Area %': '[%]'
+}
+COLUMNAS_NUMERICAS = ['Time', 'Quantity', 'Height', 'Area', 'Area %']
+
+INICIO_TABLA = 'Peak results :'
+FIN_ENCABEZADO_PAGINA = 'PAGECOUNT'
+
+# Las páginas con más trazos que esto son gráficos del cromatograma, no texto
+MIN_TRAZOS_PAGINA_GRAFICA = 1000
+
+# Posición del centro de un número respecto a su línea base, en tamaños de fuente
+CENTRO_VERTICAL_DIGITOS = 0.35
+
+NUMERO = re.compile(r'-?[\d,]*\.?\d+')
+SEGMENTO = re.compile(rb'([\d.]+ [\d.]+ [\d.]+) RG\n(?:[^\n]*\n)*?([\d.]+) w\n'
+                      rb'(-?[\d.]+) (-?[\d.]+) m\n(-?[\d.]+) (-?[\d.]+) l\nS\n')
+BLOQUE_TEXTO = re.compile(rb'q\n(?:(?!Q\n)[^\n]*\n)*?BT\n.*?ET\nQ\n', re.S)
+MATRIZ_INICIAL = re.compile(rb'^\s*((?:-?[\d.]+\s+){6})cm')
+
+
+def _numero(texto):
+    return float(texto.replace(',', ''))
+
+
+def _columnas_pagina(lineas):
+    """Columnas de la tabla de picos en una página: {columna: [valores]}
+
+    El reporte escribe la tabla por columnas: el encabezado (y su línea de
+    unidades) seguido de todos los valores. En las columnas numéricas la
+    tabla termina en la primera línea que no es un número.
+    """
+    # Encabezados de columnas vacías que la extracción de texto junta en una línea
+    separadas = []
+    for linea in lineas:
+        partes = linea.split(' ')
+        if len(partes) > 1 and all(parte in COLUMNAS_REPORTE for parte in partes):
+            separadas.extend(partes)
+        else:
+            separadas.append(linea)
+    lineas = separadas
+
+    columnas = {}
+    actual = None
+    i = 0
+    while i < len(lineas):
+        linea = lineas[i]
+        unidad = COLUMNAS_REPORTE.get(linea, False)
+        if unidad is not False and linea not in columnas and \
+                (unidad is None or (i + 1 < len(lineas) and lineas[i + 1] == unidad)):
+            actual = linea
+            columnas[actual] = []
+            i += 1 if unidad is None else 2
+            continue
+
+        if actual in COLUMNAS_NUMERICAS and not NUMERO.fullmatch(linea):
+            break
+        if actual is not None:
+            columnas[actual].append(linea)
+        i += 1
+
+    return columnas
+
+
+class LectorPDFCromatogramas:
+    def __init__(self, cache_dir=None):
+        if not PYPDF_DISPONIBLE:
+            raise ImportError("Se requiere pypdf para leer los reportes PDF")
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._tablas = {}   # sha256 -> DataFrame
+        self._trazas = {}   # sha256 -> (tiempo, señal)
+        self._hashes = {}   # (ruta, tamaño, mtime) -> sha256
+
+    def _hash_pdf(self, ruta):
+        """Hash del PDF, recalculado solo si cambian tamaño o fecha"""
+        estado = ruta.stat()
+        clave = (str(ruta.resolve()), estado.st_size, estado.st_mtime_ns)
+        if clave not in self._hashes:
+            self._hashes[clave] = calcular_hash_archivo(ruta)
+        return self._hashes[clave]
+
+    def _archivo_cache(self, sha, nombre):
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / sha / nombre
+
+    def tabla_picos(self, ruta):
+        """Tabla de picos del reporte con el esquema de la exportación a Excel
+
+        Solo se extrae el texto de las páginas necesarias: se omiten las
+        páginas gráficas y la lectura se detiene al terminar la tabla. No se
+        incluyen la fila de unidades ni la fila Total.
+        """
+        ruta = Path(ruta)
+        sha = self._hash_pdf(ruta)
+        if sha in self._tablas:
+            return self._tablas[sha]
+
+        archivo = self._archivo_cache(sha, 'picos.pkl')
+        if archivo is not None and archivo.exists():
+            tabla = pd.read_pickle(archivo)
+        else:
+            tabla = self._leer_tabla(ruta)
+            if archivo is not None:
+                archivo.parent.mkdir(parents=True, exist_ok=True)
+                tabla.to_pickle(archivo)
+
+        self._tablas[sha] = tabla
+        return tabla
+
+    def _leer_tabla(self, ruta):
+        filas = []
+        en_tabla = False
+
+        for pagina in pypdf.PdfReader(ruta).pages:
+            if pagina.get_contents() is None or \
+                    pagina.get_contents().get_data().count(b' l\n') > MIN_TRAZOS_PAGINA_GRAFICA:
+                continue
+
+            lineas = [linea.strip() for linea in pagina.extract_text().splitlines()]
+            if not en_tabla:
+                if INICIO_TABLA not in lineas:
+                    continue
+                lineas = lineas[lineas.index(INICIO_TABLA) + 1:]
+                en_tabla = True
+            else:
+                if FIN_ENCABEZADO_PAGINA in lineas:
+                    lineas = lineas[lineas.index(FIN_ENCABEZADO_PAGINA) + 1:]
+                if not lineas or lineas[0] != 'Index':
+                    break
+
+            columnas = _columnas_pagina(lineas)
+            indices = [valor for valor in columnas.get('Index', []) if valor != 'Total']
+            n = len(indices)
+            if n:
+                filas.append(pd.DataFrame({
+                    'Index': [int(valor) for valor in indices],
+                    'Name': columnas.get('Name', [])[:n],
+                    **{col: [_numero(valor) for valor in columnas.get(col, [])[:n]]
+                       for col in COLUMNAS_NUMERICAS}
+                }, columns=list(COLUMNAS_REPORTE)))
+
+            if 'Total' in columnas.get('Index', []):
+                break
+
+        if not filas:
+            raise ValueError(f"No se encontró la tabla de picos en {ruta}")
+        return pd.concat(filas, ignore_index=True)
+
+    def traza(self, ruta):
+        """Traza del cromatograma (tiempo en min, señal en µV) de la primera página
+
+        La traza está formada por los segmentos del estilo de trazo más
+        frecuente de la página; los ejes se calibran con las etiquetas
+        numéricas de sus marcas. Para cada columna
+        de puntos se toma el punto medio del trazo, así que la resolución es la
+        del dibujo (un punto de página); alturas y áreas de referencia deben
+        tomarse de tabla_picos.
+        """
+        ruta = Path(ruta)
+        sha = self._hash_pdf(ruta)
+        if sha in self._trazas:
+            return self._trazas[sha]
+
+        archivo = self._archivo_cache(sha, 'traza.npz')
+        if archivo is not None and archivo.exists():
+            with np.load(archivo) as datos:
+                traza = (datos['tiempo'], datos['senal'])
+        else:
+            traza = self._leer_traza(ruta)
+            if archivo is not None:
+                archivo.parent.mkdir(parents=True, exist_ok=True)
+                np.savez(archivo, tiempo=traza[0], senal=traza[1])
+
+        self._trazas[sha] = traza
+        return traza
+
+    def _leer_traza(self, ruta):
+        pagina = pypdf.PdfReader(ruta).pages[0]
+        contenido = pagina.get_contents().get_data()
+
+        # Matriz que aplica la página a todos los trazos (la primera 'cm' del contenido)
+        matriz = np.array([1.0, 0.0, 0.0, 1.0, 0.0, 0.0])
+        inicial = MATRIZ_INICIAL.match(contenido)
+        if inicial:
+            matriz = np.array(inicial.group(1).split(), dtype=float)
+
+        trazos = SEGMENTO.findall(contenido)
+        if not trazos:
+            raise ValueError(f"No hay trazos vectoriales en {ruta}")
+
+        # La traza se dibuja como miles de segmentos con el mismo color y grosor
+        estilos = [(color, grosor) for color, grosor, *_ in trazos]
+        estilo = max(set(estilos), key=estilos.count)
+        segmentos = np.array([puntos for color, grosor, *puntos in trazos
+                              if (color, grosor) == estilo], dtype=float)
+
+        # Descartar segmentos aislados (marcas de los ejes): cada segmento de la
+        # traza empieza donde acaba el anterior o acaba donde empieza el siguiente
+        unido = np.all(segmentos[1:, :2] == segmentos[:-1, 2:], axis=1)
+        conectados = np.concatenate(([False], unido)) | np.concatenate((unido, [False]))
+        segmentos = segmentos[conectados]
+        puntos = np.vstack((segmentos[:, :2], segmentos[:, 2:]))
+
+        x = puntos[:, 0] * matriz[0] + puntos[:, 1] * matriz[2] + matriz[4]
+        y = puntos[:, 0] * matriz[1] + puntos[:, 1] * matriz[3] + matriz[5]
+
+        # Un valor por columna: punto medio entre el mínimo y el máximo del trazo
+        orden = np.argsort(x, kind='stable')
+        x, y = x[orden], y[orden]
+        columnas, inicios = np.unique(x, return_index=True)
+        centro = 0.5 * (np.minimum.reduceat(y, inicios) + np.maximum.reduceat(y, inicios))
+
+        calibrar_x, calibrar_y = self._calibracion_ejes(pagina, contenido, ruta)
+        return calibrar_x(columnas), calibrar_y(centro)
+
+    def _calibracion_ejes(self, pagina, contenido, ruta):
+        """Funciones lineales posición -> tiempo y posición -> señal
+
+        Se ajustan por mínimos cuadrados con las etiquetas de las marcas. Las
+        etiquetas del eje X están centradas bajo su marca, así que su borde
+        izquierdo se corrige con un término proporcional al número de
+        caracteres; las del eje Y se centran verticalmente sobre la marca.
+        """
+        etiquetas = []
+
+        def visitante(texto, cm, tm, fuente, tamano):
+            texto = texto.strip()
+            if NUMERO.fullmatch(texto):
+                x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+                y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+                etiquetas.append((_numero(texto), len(texto), x, y, tamano * abs(cm[3])))
+
+        # Solo se extrae el texto: los miles de trazos de la página no hacen falta aquí
+        bloques = BLOQUE_TEXTO.findall(contenido)
+        inicial = MATRIZ_INICIAL.match(contenido)
+        texto = DecodedStreamObject()
+        texto.set_data((inicial.group(0) + b'\n' if inicial else b'') + b''.join(bloques))
+        escritor = pypdf.PdfWriter()
+        copia = escritor.add_page(pagina)
+        copia.replace_contents(texto)
+        copia.extract_text(visitor_text=visitante)
+
+        etiquetas = np.array(etiquetas)
+        if len(etiquetas) < 4:
+            raise ValueError(f"No hay suficientes etiquetas de ejes en {ruta}")
+
+        # Eje X: la fila de etiquetas más numerosa con la misma línea base
+        filas, conteos = np.unique(np.round(etiquetas[:, 3], 1), return_counts=True)
+        en_eje_x = np.round(etiquetas[:, 3], 1) == filas[np.argmax(conteos)]
+        eje_x = etiquetas[en_eje_x]
+        eje_y = etiquetas[~en_eje_x & (etiquetas[:, 2] < eje_x[:, 2].min() + eje_x[:, 4].max())]
+        if len(eje_x) < 2 or len(eje_y) < 2:
+            raise ValueError(f"No se pudieron identificar los ejes en {ruta}")
+
+        # borde_izquierdo = a + b * valor - c * caracteres
+        sistema = np.column_stack((np.ones(len(eje_x)), eje_x[:, 0], -eje_x[:, 1]))
+        a, b, _ = np.linalg.lstsq(sistema, eje_x[:, 2], rcond=None)[0]
+
+        # centro_vertical = d + e * valor
+        centro = eje_y[:, 3] + CENTRO_VERTICAL_DIGITOS * eje_y[:, 4]
+        e, d = np.polyfit(eje_y[:, 0], centro, 1)
+
+        return (lambda x: (x - a) / b), (lambda y: (y - d) / e)
@@ -7,27 +7,173 @@ Implementa la metodología descrita en analisis_biodiesel.tex
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import json
+import sys
+
+from alineacion_tiempos import REFERENCIAS_ALINEACION, AlineadorTiempos, anclas_por_bloques
+from base_datos import NOMBRE_BASE_DATOS, BaseDatosResultados
+from biblioteca_compuestos import CLASE_FAME, BibliotecaCompuestos
+from calculos_hoja import NOMBRE_CALCULOS, cargar_calculos, calculos_muestra
+from cinetica import minutos_muestreo
+from remuestreo import NIVEL_CONFIANZA, REMUESTRAS, SEMILLA, bootstrap_resultados, pares_consecutivos, valores_bootstrap
+from cuantificacion import CurvaCalibracion, contenido_esteres
+from asignacion_componentes import IndiceComponentes
+from almacen_picos import a_formato_exportacion, almacen_disponible, leer_picos
+from manifiesto import ManifiestoProcesamiento
+from registro_experimentos import NOMBRE_REGISTRO, cargar_registro, experimentos_activos, nombre_muestra
+
+# Orden en que se resuelven los picos que caen en varias ventanas
+PRIORIDAD_COMPONENTES = ('fames', 'heptano', 'metanol', 'monogliceridos', 'digliceridos', 'trigliceridos')
+
+# Ventana donde se buscan los picos candidatos a estándar interno (C17:0)
+VENTANA_ESTANDAR = REFERENCIAS_ALINEACION['estandar_interno']['ventana']
+
+# Contenido de ésteres por encima de este valor (% m/m) se marca como no plausible
+MAX_CONTENIDO_ESTERES = 100.0
+
+# Diferencia máxima (%) entre el área del SI elegido y la de la hoja para
+# publicar el contenido de ésteres (con más, el pico elegido no es el de la hoja)
+MAX_DISCREPANCIA_SI = 10.0
 
 class ProcesadorCromatogramas:
-    def __init__(self, procesados_dir):
+    def __init__(self, procesados_dir, incremental=True, tamano_bloque=None, registro_file=None,
+                 alinear=False, asignacion_exclusiva=True, base_datos=None, rangos_biblioteca=False,
+                 composicion_fames=False):
         self.procesados_dir = Path(procesados_dir)
         self.resultados = {}
 
+        # Base SQLite opcional (base_datos.py) donde se guardan las métricas de cada muestra
+        self.base_datos = Path(base_datos) if base_datos else None
+
+        # Registro de experimentos (por defecto junto a Procesados/)
+        self.registro_file = Path(registro_file) if registro_file else self.procesados_dir.parent / NOMBRE_REGISTRO
+
+        # Con tamano_bloque los CSV se leen por bloques de ese número de filas
+        self.tamano_bloque = tamano_bloque
+
+        # Almacén columnar de picos escrito por el extractor (si existe se usa en lugar de los CSV)
+        self.almacen_dir = self.procesados_dir / 'picos'
+
+        # Manifiesto para omitir muestras cuyo CSV y parámetros no cambiaron
+        self.manifiesto = None
+        if incremental:
+            self.manifiesto = ManifiestoProcesamiento(self.procesados_dir / 'manifiesto.json')
+
+        # Con alinear, los tiempos de retención de cada inyección se corrigen
+        # con los picos de referencia antes de asignar los rangos
+        self.alineador = AlineadorTiempos() if alinear else None
+
+        # Biblioteca para identificar cada pico y dar la composición de FAMEs.
+        # La composición por FAME solo va a la tabla resumen con
+        # composicion_fames: el ápice del grupo C18 se mueve entre 7.87 y
+        # 8.10 min según la carga y cambia de nombre entre inyecciones
+        self.biblioteca = BibliotecaCompuestos()
+        self.composicion_fames = composicion_fames
+
         # Rangos de tiempo de retención para identificación de componentes
-        self.rangos_tr = {
-            'heptano': (0.96, 0.99),
-            'metanol': (2.20, 2.35),
-            'fames': (6.50, 11.50),
-            'monogliceridos': (7.40, 8.60),
-            'digliceridos': (7.70, 8.40),
-            'trigliceridos': (7.00, 7.25)
-        }
+        # (los validados de analisis_biodiesel.tex). Con rangos_biblioteca se
+        # derivan de las clases de la biblioteca, cuyos tiempos de glicéridos
+        # aún están por confirmar con patrones
+        self.rangos_biblioteca = rangos_biblioteca
+        if rangos_biblioteca:
+            self.rangos_tr = self.biblioteca.rangos_componentes()
+        else:
+            self.rangos_tr = {
+                'heptano': (0.96, 0.99),
+                'metanol': (2.20, 2.35),
+                'fames': (6.50, 11.50),
+                'monogliceridos': (7.40, 8.60),
+                'digliceridos': (7.70, 8.40),
+                'trigliceridos': (7.00, 7.25)
+            }
+
+        # Los rangos validados se solapan: con asignacion_exclusiva cada pico
+        # cuenta solo para el componente de mayor prioridad que lo contiene
+        # (primero los FAMEs); sin ella se usan los rangos solapados
+        self.asignacion_exclusiva = asignacion_exclusiva
+        self.prioridad_componentes = list(PRIORIDAD_COMPONENTES)
+        self._indice = None
+        if asignacion_exclusiva:
+            ocultos = self.indice_componentes().componentes_ocultos()
+            if ocultos:
+                print(f"  ! Las ventanas de {', '.join(ocultos)} quedan dentro de otras de mayor prioridad "
+                      f"y no reciben picos (ver --rangos-biblioteca)")
 
         # Parámetros del estándar interno
         self.peso_si = 103.8  # mg
         self.volumen_total_si = 10.0  # mL
         self.conc_si = self.peso_si / self.volumen_total_si  # mg/mL
+        self.volumen_alicuota_si = 1.0  # mL de solución de SI añadidos a cada muestra
+
+    def __getstate__(self):
+        """Estado enviado a los procesos de trabajo (sin resultados acumulados)"""
+        estado = self.__dict__.copy()
+        estado['resultados'] = {}
+        estado['manifiesto'] = None
+        return estado
+
+    def _parametros_procesamiento(self):
+        """Parámetros que determinan el resultado de procesar una muestra"""
+        parametros = {
+            'rangos_tr': self.rangos_tr,
+            'peso_si': self.peso_si,
+            'volumen_total_si': self.volumen_total_si,
+            'asignacion_exclusiva': self.asignacion_exclusiva,
+            'prioridad_componentes': self.prioridad_componentes,
+            'biblioteca': self.biblioteca.parametros()
+        }
+        if self.alineador is not None:
+            parametros['alineacion'] = self.alineador.parametros()
+        return parametros
+
+    def _resultado_vigente(self, csv_file):
+        """Resultado previo de una muestra si su CSV y los parámetros no cambiaron"""
+        if self.manifiesto is None:
+            return None
+
+        clave = f"procesamiento:{csv_file.relative_to(self.procesados_dir).as_posix()}"
+        registro = self.manifiesto.vigente(clave, [csv_file], self._parametros_procesamiento())
+        if registro is None:
+            return None
+
+        return dict(registro['resultado'])
+
+    def _registrar_resultado(self, csv_file, resultado):
+        """Guarda en el manifiesto el resultado de una muestra recién procesada"""
+        if self.manifiesto is None:
+            return
+
+        clave = f"procesamiento:{csv_file.relative_to(self.procesados_dir).as_posix()}"
+        self.manifiesto.registrar(clave, [csv_file], self._parametros_procesamiento(),
+                                  resultado=dict(resultado))
+
+    def indice_componentes(self):
+        """Índice de asignación exclusiva para los rangos y la prioridad actuales"""
+        clave = (tuple(self.rangos_tr.items()), tuple(self.prioridad_componentes))
+        if self._indice is None or self._indice[0] != clave:
+            self._indice = (clave, IndiceComponentes(self.rangos_tr, self.prioridad_componentes))
+        return self._indice[1]
+
+    def picos_reasignados(self, tiempos, alineados):
+        """Número de picos cuyo componente cambia al alinear sus tiempos
+
+        Con asignación exclusiva se compara la etiqueta de IndiceComponentes;
+        con rangos solapados, la pertenencia a cada ventana.
+        """
+        tiempos = np.asarray(tiempos, dtype=float)
+        alineados = np.asarray(alineados, dtype=float)
+        if self.asignacion_exclusiva:
+            indice = self.indice_componentes()
+            return int((indice.etiquetar(tiempos) != indice.etiquetar(alineados)).sum())
+
+        limites = np.array(list(self.rangos_tr.values()), dtype=float)
+
+        def ventanas(t):
+            return (t[:, None] >= limites[:, 0]) & (t[:, None] <= limites[:, 1])
+
+        return int((ventanas(tiempos) != ventanas(alineados)).any(axis=1).sum())
 
     def identificar_picos_rango(self, df, t_min, t_max):
         """Identifica picos en un rango de tiempo de retención"""
@@ -42,6 +188,9 @@ class ProcesadorCromatogramas:
         if componente not in self.rangos_tr:
             return pd.DataFrame()
 
+        if self.asignacion_exclusiva and 'Time' in df.columns:
+            return df[self.indice_componentes().nombres(df['Time']) == componente].copy()
+
         t_min, t_max = self.rangos_tr[componente]
         return self.identificar_picos_rango(df, t_min, t_max)
 
@@ -53,18 +202,154 @@ class ProcesadorCromatogramas:
 
         return picos['Area'].sum()
 
-    def calcular_conversion_fames(self, df):
-        """Calcula el porcentaje de conversión a FAMEs"""
-        area_fames = self.calcular_area_total_componente(df, 'fames')
-        area_heptano = self.calcular_area_total_componente(df, 'heptano')
+    def integrar_componentes(self, df, tr_referencia=None):
+        """Integra todos los componentes de rangos_tr en una sola pasada
+
+        Con asignación exclusiva cada pico se etiqueta con IndiceComponentes y
+        las áreas se suman con np.bincount. Con rangos solapados se ordenan los
+        tiempos de retención una vez, se localizan los límites de cada ventana
+        con np.searchsorted y las áreas son diferencias de la suma acumulada.
+        En ambos casos no se filtra ni se copia el DataFrame por componente.
+
+        Además suma el área de cada compuesto de la biblioteca; tr_referencia
+        (tiempo del estándar interno, si se conoce de antemano, p. ej. al leer
+        por bloques) evita buscarlo en df.
+        """
+        integracion = {
+            'area_total': 0.0,
+            'num_picos_total': len(df),
+            'componentes': {comp: {'area': 0.0, 'num_picos': 0} for comp in self.rangos_tr},
+            'compuestos': {nombre: 0.0 for nombre in self.biblioteca.nombres},
+            'area_rango_esteres': 0.0,
+            'candidatos_si': []
+        }
 
         if 'Area' in df.columns:
-            area_total = df['Area'].sum()
+            integracion['area_total'] = float(df['Area'].sum())
+
+        if 'Time' not in df.columns or 'Area' not in df.columns:
+            return integracion
+
+        integracion['compuestos'] = self.biblioteca.areas_compuestos(df, tr_referencia)
+
+        tiempos = df['Time'].to_numpy(dtype=float)
+        areas = df['Area'].to_numpy(dtype=float)
+        componentes = list(self.rangos_tr)
+
+        t_min, t_max = self.biblioteca.rango_esteres()
+        integracion['area_rango_esteres'] = float(areas[(tiempos >= t_min) & (tiempos <= t_max)].sum())
+
+        en_ventana = (tiempos >= VENTANA_ESTANDAR[0]) & (tiempos <= VENTANA_ESTANDAR[1])
+        integracion['candidatos_si'] = [[float(t), float(a)] for t, a in zip(tiempos[en_ventana], areas[en_ventana])]
+
+        if self.asignacion_exclusiva:
+            areas_componentes, picos_componentes = self.indice_componentes().sumar(tiempos, areas)
         else:
-            return 0.0
+            orden = np.argsort(tiempos, kind='stable')
+            tiempos = tiempos[orden]
+            area_acumulada = np.concatenate(([0.0], np.cumsum(areas[orden])))
+
+            limites = np.array([self.rangos_tr[comp] for comp in componentes], dtype=float)
+            inicio = np.searchsorted(tiempos, limites[:, 0], side='left')
+            fin = np.searchsorted(tiempos, limites[:, 1], side='right')
+
+            areas_componentes = area_acumulada[fin] - area_acumulada[inicio]
+            picos_componentes = fin - inicio
+
+        for comp, area, num_picos in zip(componentes, areas_componentes, picos_componentes):
+            integracion['componentes'][comp] = {'area': float(area), 'num_picos': int(num_picos)}
+
+        return integracion
+
+    def integrar_csv_por_bloques(self, csv_file, tamano_bloque):
+        """Integra un CSV leyéndolo por bloques, sin cargar la tabla completa
+
+        Solo se leen las columnas Time y Area; cada bloque se limpia e integra
+        con integrar_componentes y las áreas y conteos se acumulan. El
+        resultado tiene la misma forma que el de integrar_componentes.
+
+        Una primera pasada localiza el estándar interno (escala de las retenciones
+        relativas de la biblioteca) y, con alineación, los picos de
+        referencia; en la segunda se corrige Time en cada bloque. Con
+        alineación el resultado incluye además anclas_tr y
+        picos_reasignados_alineacion, como en la alineación en memoria.
+        """
+        def leer_bloques():
+            return pd.read_csv(csv_file, chunksize=tamano_bloque,
+                               usecols=lambda columna: columna in ('Time', 'Area'))
+
+        anclas = None
+        tr_referencia = np.nan
+        buscadores = [b for b in (self.alineador, self.biblioteca.referencia) if b is not None]
+        if buscadores:
+            encontradas = anclas_por_bloques((self.limpiar_tabla_picos(bloque) for bloque in leer_bloques()),
+                                             buscadores)
+            if self.alineador is not None:
+                anclas = encontradas.pop(0)
+            if self.biblioteca.referencia is not None:
+                referencia = encontradas.pop(0)
+                if anclas is not None:
+                    referencia = self.alineador.corregir(referencia, anclas)
+                tr_referencia = referencia[0, 0]
+
+        integracion = {
+            'area_total': 0.0,
+            'num_picos_total': 0,
+            'componentes': {comp: {'area': 0.0, 'num_picos': 0} for comp in self.rangos_tr},
+            'compuestos': {nombre: 0.0 for nombre in self.biblioteca.nombres},
+            'area_rango_esteres': 0.0,
+            'candidatos_si': []
+        }
+        reasignados = 0
+
+        for bloque in leer_bloques():
+            bloque = self.limpiar_tabla_picos(bloque)
+            if anclas is not None:
+                tiempos = bloque['Time'].to_numpy(dtype=float)
+                alineados = self.alineador.corregir(tiempos[None, :], anclas)[0]
+                reasignados += self.picos_reasignados(tiempos, alineados)
+                bloque = bloque.assign(Time=alineados)
+            parcial = self.integrar_componentes(bloque, tr_referencia=tr_referencia)
+
+            integracion['area_total'] += parcial['area_total']
+            integracion['num_picos_total'] += parcial['num_picos_total']
+            integracion['area_rango_esteres'] += parcial['area_rango_esteres']
+            integracion['candidatos_si'] += parcial['candidatos_si']
+            for comp, valores in parcial['componentes'].items():
+                integracion['componentes'][comp]['area'] += valores['area']
+                integracion['componentes'][comp]['num_picos'] += valores['num_picos']
+            for nombre, area in parcial['compuestos'].items():
+                integracion['compuestos'][nombre] += area
+
+        if anclas is not None:
+            integracion['anclas_tr'] = self.alineador.registro_anclas(anclas[0])
+            integracion['picos_reasignados_alineacion'] = reasignados
+        return integracion
+
+    def _area_componente(self, integracion, componente):
+        """Área de un componente dentro de un resultado de integrar_componentes"""
+        return integracion['componentes'].get(componente, {}).get('area', 0.0)
+
+    def _area_esteres(self, integracion):
+        """ΣA - A_SI de EN 14103: área de los picos del rango de ésteres sin el
+        estándar interno, con los FAMEs identificados corregidos por su factor
+        de respuesta (los no identificados cuentan con factor 1)"""
+        compuestos = integracion['compuestos']
+        correccion = (self.biblioteca.area_clase(compuestos, CLASE_FAME, corregir_respuesta=True)
+                      - self.biblioteca.area_clase(compuestos, CLASE_FAME))
+        return (integracion['area_rango_esteres'] - self.biblioteca.area_clase(compuestos, 'estandar_interno')
+                + correccion)
+
+    def calcular_conversion_fames(self, df, integracion=None):
+        """Calcula el porcentaje de conversión a FAMEs"""
+        if integracion is None:
+            integracion = self.integrar_componentes(df)
+
+        area_fames = self._area_componente(integracion, 'fames')
+        area_heptano = self._area_componente(integracion, 'heptano')
 
         # Excluir heptano del área total
-        area_total_sin_si = area_total - area_heptano
+        area_total_sin_si = integracion['area_total'] - area_heptano
 
         if area_total_sin_si > 0:
             conversion = (area_fames / area_total_sin_si) * 100
@@ -73,12 +358,15 @@ class ProcesadorCromatogramas:
 
         return conversion
 
-    def calcular_pureza_biodiesel(self, df):
+    def calcular_pureza_biodiesel(self, df, integracion=None):
         """Calcula la pureza del biodiesel"""
-        area_fames = self.calcular_area_total_componente(df, 'fames')
-        area_mag = self.calcular_area_total_componente(df, 'monogliceridos')
-        area_dag = self.calcular_area_total_componente(df, 'digliceridos')
-        area_tag = self.calcular_area_total_componente(df, 'trigliceridos')
+        if integracion is None:
+            integracion = self.integrar_componentes(df)
+
+        area_fames = self._area_componente(integracion, 'fames')
+        area_mag = self._area_componente(integracion, 'monogliceridos')
+        area_dag = self._area_componente(integracion, 'digliceridos')
+        area_tag = self._area_componente(integracion, 'trigliceridos')
 
         area_total_productos = area_fames + area_mag + area_dag + area_tag
 
@@ -89,66 +377,265 @@ class ProcesadorCromatogramas:
 
         return pureza
 
-    def calcular_contenido_gliceridos(self, df):
+    def calcular_contenido_gliceridos(self, df, integracion=None):
         """Calcula el contenido relativo de glicéridos"""
-        area_total = df['Area'].sum() if 'Area' in df.columns else 1.0
-        area_heptano = self.calcular_area_total_componente(df, 'heptano')
-        area_total_sin_si = area_total - area_heptano
+        if integracion is None:
+            integracion = self.integrar_componentes(df)
+
+        area_heptano = self._area_componente(integracion, 'heptano')
+        area_total_sin_si = integracion['area_total'] - area_heptano
 
         if area_total_sin_si == 0:
             area_total_sin_si = 1.0
 
         resultados = {
-            'monogliceridos_pct': (self.calcular_area_total_componente(df, 'monogliceridos') / area_total_sin_si) * 100,
-            'digliceridos_pct': (self.calcular_area_total_componente(df, 'digliceridos') / area_total_sin_si) * 100,
-            'trigliceridos_pct': (self.calcular_area_total_componente(df, 'trigliceridos') / area_total_sin_si) * 100
+            'monogliceridos_pct': (self._area_componente(integracion, 'monogliceridos') / area_total_sin_si) * 100,
+            'digliceridos_pct': (self._area_componente(integracion, 'digliceridos') / area_total_sin_si) * 100,
+            'trigliceridos_pct': (self._area_componente(integracion, 'trigliceridos') / area_total_sin_si) * 100
         }
 
         return resultados
 
-    def cuantificar_fames(self, df, peso_muestra_mg):
-        """Cuantificación absoluta de FAMEs usando estándar interno"""
-        area_fames = self.calcular_area_total_componente(df, 'fames')
-        area_heptano = self.calcular_area_total_componente(df, 'heptano')
+    def cuantificar_fames(self, df, peso_muestra_mg, integracion=None, masa_si_mg=None):
+        """Contenido de ésteres (% m/m, EN 14103) usando el estándar interno (C17:0)
+
+        masa_si_mg es la masa de SI añadida a la muestra; por defecto
+        conc_si × volumen_alicuota_si. Devuelve 0.0 si no hay pico de SI.
+        """
+        if integracion is None:
+            integracion = self.integrar_componentes(df)
+
+        if masa_si_mg is None:
+            masa_si_mg = self.conc_si * self.volumen_alicuota_si
+
+        contenido = contenido_esteres(self._area_esteres(integracion),
+                                      self.biblioteca.area_clase(integracion['compuestos'], 'estandar_interno'),
+                                      masa_si_mg, peso_muestra_mg)
+        return float(np.nan_to_num(contenido))
+
+    def curva_calibracion(self, exp_path):
+        """Curva de respuesta del estándar interno ajustada con las inyecciones
+        de estándar del experimento (estandar_interno*_raw.csv)
+
+        La concentración de cada inyección es la de sus cálculos laterales
+        (calculos_hoja.json) o, si no la tiene, conc_si. Las inyecciones de
+        estándar se alinean siempre con los picos de referencia (solo tienen
+        heptano y SI, así que la corrección es segura aunque el lote entre
+        muestras no se alinee). La curva se guarda en el manifiesto y solo se
+        reajusta si cambian los CSV del estándar o calculos_hoja.json.
+        Devuelve None sin estándar.
+        """
+        std_files = sorted(exp_path.glob('estandar_interno*_raw.csv'))
+        if not std_files:
+            return None
 
-        if area_heptano == 0:
-            return 0.0
+        alineador = self.alineador or AlineadorTiempos()
+        calculos_file = exp_path / NOMBRE_CALCULOS
+        entradas = std_files + ([calculos_file] if calculos_file.exists() else [])
+
+        clave = f"calibracion:{exp_path.relative_to(self.procesados_dir).as_posix()}"
+        parametros = {'conc_si': self.conc_si, 'biblioteca': self.biblioteca.parametros(),
+                      'alineacion': alineador.parametros()}
+        if self.manifiesto is not None:
+            registro = self.manifiesto.vigente(clave, entradas, parametros)
+            if registro is not None:
+                return CurvaCalibracion.desde_dict(registro['resultado'])
+
+        calculos = cargar_calculos(exp_path)
+        tablas, _ = alineador.alinear({nombre_muestra(std_file): self.limpiar_tabla_picos(pd.read_csv(std_file))
+                                       for std_file in std_files})
+        concentraciones = []
+        areas = []
+        for nombre, tabla in tablas.items():
+            conc = calculos_muestra(calculos, nombre)['conc_si_mg_ml']
+            concentraciones.append(self.conc_si if conc is None else conc)
+            areas.append(self.biblioteca.area_clase(self.biblioteca.areas_compuestos(tabla), 'estandar_interno'))
 
-        # C_FAMEs = (A_FAMEs / A_SI) * (m_SI / m_muestra) * C_SI
-        conc_fames = (area_fames / area_heptano) * (self.peso_si / peso_muestra_mg) * self.conc_si
+        try:
+            curva = CurvaCalibracion.ajustar(concentraciones, areas)
+        except ValueError:
+            return None
 
-        return conc_fames
+        if self.manifiesto is not None:
+            self.manifiesto.registrar(clave, entradas, parametros, resultado=curva.a_dict())
+        return curva
+
+    def seleccionar_estandar(self, muestra, area_si_hoja):
+        """Toma como SI el candidato de VENTANA_ESTANDAR cuya área se acerca más
+        a la del SI de la hoja
+
+        La biblioteca suma todos los picos que identifica como C17:0; con el
+        área de la hoja se elige un solo pico y el resto de la ventana cuenta
+        como ésteres. Todos los picos de la ventana entran en ΣA con factor 1,
+        así que el cambio solo mueve área entre el SI y los ésteres. Guarda la
+        diferencia relativa con la hoja en discrepancia_si_pct (None sin dato).
+        """
+        candidatos = muestra.get('candidatos_si') or []
+        if np.isnan(area_si_hoja) or area_si_hoja <= 0 or not candidatos:
+            muestra['discrepancia_si_pct'] = None
+            return
 
-    def procesar_muestra(self, csv_file, nombre_muestra, peso_muestra_mg=None):
-        """Procesa una muestra completa y calcula todos los parámetros"""
-        try:
-            df = pd.read_csv(csv_file)
+        areas = np.array([area for _, area in candidatos], dtype=float)
+        elegida = float(areas[np.argmin(np.abs(areas - area_si_hoja))])
+        muestra['area_esteres'] += muestra['area_estandar_interno'] - elegida
+        muestra['area_estandar_interno'] = elegida
+        muestra['discrepancia_si_pct'] = (elegida - area_si_hoja) / area_si_hoja * 100
+
+    def cuantificar_muestras(self, exp_path, metadata, muestras):
+        """Contenido de ésteres (EN 14103) y concentración de SI por curva de
+        todas las muestras de un experimento, calculados como arrays
+
+        El peso de muestra y los datos del SI salen de los cálculos laterales
+        de cada hoja (calculos_hoja.json); si faltan se usan peso_muestra_mg
+        de metadata.json y los parámetros del procesador. Las muestras sin peso quedan en None.
+        El pico del SI se elige contra el área de SI de la hoja cuando la hay
+        (seleccionar_estandar). Un contenido por encima de
+        MAX_CONTENIDO_ESTERES, o con un SI que difiere de la hoja en más de
+        MAX_DISCREPANCIA_SI, se marca como no plausible: contenido_esteres_pct
+        queda en None y el valor calculado se guarda en
+        contenido_esteres_calculado_pct (para la validación). La curva del
+        estándar se aplica al área del SI de cada muestra (la respuesta para
+        la que se ajustó): concentracion_si_mg_ml y recuperacion_si_pct
+        frente a la concentración añadida.
+        Devuelve la curva de calibración usada (o None).
+        """
+        if not muestras:
+            return None
+
+        pesos_metadata = {nombre_muestra(m.get('archivo_csv', '')): m.get('peso_muestra_mg')
+                          for m in metadata.get('muestras', [])}
+        calculos = cargar_calculos(exp_path)
+        registros = [calculos_muestra(calculos, m['nombre_original']) for m in muestras]
+
+        def campo(registro, nombre, defecto):
+            return defecto if registro[nombre] is None else registro[nombre]
 
-            # Limpiar datos: remover filas de encabezados repetidos
-            if 'Time' in df.columns:
-                # Convertir Time a numérico, marcando errores como NaN
-                df['Time'] = pd.to_numeric(df['Time'], errors='coerce')
-                df = df[pd.notna(df['Time'])]
+        for muestra, registro in zip(muestras, registros):
+            self.seleccionar_estandar(muestra, campo(registro, 'area_si', np.nan))
 
-            # Convertir Area a numérico
-            if 'Area' in df.columns:
-                df['Area'] = pd.to_numeric(df['Area'], errors='coerce')
-                df = df[pd.notna(df['Area'])]
+        pesos = np.array([campo(r, 'peso_muestra_mg', pesos_metadata.get(m['nombre_original']) or np.nan)
+                          for m, r in zip(muestras, registros)], dtype=float)
+        conc_si = np.array([campo(r, 'conc_si_mg_ml', self.conc_si) for r in registros], dtype=float)
+        masas_si = conc_si * np.array([campo(r, 'volumen_alicuota_si_ml', self.volumen_alicuota_si)
+                                       for r in registros], dtype=float)
+        areas_fames = np.array([m['area_esteres'] for m in muestras], dtype=float)
+        areas_si = np.array([m['area_estandar_interno'] for m in muestras], dtype=float)
+
+        contenidos = contenido_esteres(areas_fames, areas_si, masas_si, pesos)
+
+        curva = self.curva_calibracion(exp_path)
+        if curva is not None:
+            concentraciones_si = np.where(areas_si > 0, curva.concentracion(areas_si), np.nan)
+        else:
+            concentraciones_si = np.full(len(muestras), np.nan)
+
+        for muestra, peso, contenido, concentracion, conc in zip(muestras, pesos, contenidos,
+                                                                  concentraciones_si, conc_si):
+            muestra['peso_muestra_mg'] = None if np.isnan(peso) else float(peso)
+            muestra['concentracion_si_mg_ml'] = None if np.isnan(concentracion) else float(concentracion)
+            muestra['recuperacion_si_pct'] = None if np.isnan(concentracion) else float(concentracion / conc * 100)
+
+            calculado = None if np.isnan(contenido) else float(contenido)
+            discrepancia = muestra['discrepancia_si_pct']
+            motivos = []
+            if calculado is not None and calculado > MAX_CONTENIDO_ESTERES:
+                motivos.append(f"> {MAX_CONTENIDO_ESTERES:.0f}%")
+            if calculado is not None and discrepancia is not None and abs(discrepancia) > MAX_DISCREPANCIA_SI:
+                motivos.append(f"SI {discrepancia:+.1f}% frente a la hoja")
+
+            muestra['contenido_esteres_calculado_pct'] = calculado
+            muestra['contenido_esteres_plausible'] = None if calculado is None else not motivos
+            muestra['contenido_esteres_pct'] = None if motivos else calculado
+            if motivos:
+                print(f"  ! {muestra['nombre']}: contenido de ésteres {calculado:.1f}% no plausible "
+                      f"({'; '.join(motivos)}); no se publica")
+
+        return curva
+
+    def limpiar_tabla_picos(self, df):
+        """Deja solo las filas de picos con Time y Area numéricos"""
+        # Limpiar datos: remover filas de encabezados repetidos
+        if 'Time' in df.columns:
+            # Convertir Time a numérico, marcando errores como NaN
+            df['Time'] = pd.to_numeric(df['Time'], errors='coerce')
+            df = df[pd.notna(df['Time'])]
+
+        # Convertir Area a numérico
+        if 'Area' in df.columns:
+            df['Area'] = pd.to_numeric(df['Area'], errors='coerce')
+            df = df[pd.notna(df['Area'])]
+
+        return df
+
+    def cargar_picos_experimento(self, experimento_dir):
+        """Tablas de picos por muestra leídas del almacén columnar
+
+        Lee solo la partición del experimento. Devuelve None si el almacén no
+        existe o no se puede leer, y entonces se usan los CSV.
+        """
+        if not almacen_disponible(self.almacen_dir):
+            return None
+
+        picos = leer_picos(self.almacen_dir, experimento=experimento_dir)
+        return {
+            muestra: a_formato_exportacion(grupo.drop(columns=['experiment', 'sample'])).reset_index(drop=True)
+            for muestra, grupo in picos.groupby('sample', sort=False)
+        }
+
+    def procesar_muestra(self, csv_file, nombre_muestra, peso_muestra_mg=None, df=None):
+        """Procesa una muestra completa y calcula todos los parámetros
+
+        Si se pasa df (tabla de picos ya tipada, p. ej. del almacén columnar)
+        no se lee el CSV; si el procesador alinea, df debe venir ya alineado
+        (procesar_experimento alinea el lote completo). Si el procesador tiene
+        tamano_bloque, el CSV se integra por bloques y nunca se carga completo
+        en memoria.
+        """
+        try:
+            # Una sola integración alimenta todas las métricas
+            if df is None and self.tamano_bloque:
+                integracion = self.integrar_csv_por_bloques(csv_file, self.tamano_bloque)
+            else:
+                anclas = None
+                if df is None:
+                    df = self.limpiar_tabla_picos(pd.read_csv(csv_file))
+                    if self.alineador is not None:
+                        tablas, anclas = self.alineador.alinear({nombre_muestra: df})
+                        reasignados = self.picos_reasignados(df['Time'], tablas[nombre_muestra]['Time'])
+                        df = tablas[nombre_muestra]
+                integracion = self.integrar_componentes(df)
+                if anclas is not None:
+                    integracion['anclas_tr'] = anclas[nombre_muestra]
+                    integracion['picos_reasignados_alineacion'] = reasignados
 
             resultados = {
                 'nombre': nombre_muestra,
                 'archivo': str(csv_file),
-                'conversion_fames_pct': self.calcular_conversion_fames(df),
-                'pureza_biodiesel_pct': self.calcular_pureza_biodiesel(df),
-                'gliceridos': self.calcular_contenido_gliceridos(df),
-                'area_heptano': self.calcular_area_total_componente(df, 'heptano'),
-                'area_fames': self.calcular_area_total_componente(df, 'fames'),
-                'num_picos_total': len(df),
-                'num_picos_fames': len(self.identificar_componente(df, 'fames'))
+                'conversion_fames_pct': self.calcular_conversion_fames(df, integracion),
+                'pureza_biodiesel_pct': self.calcular_pureza_biodiesel(df, integracion),
+                'gliceridos': self.calcular_contenido_gliceridos(df, integracion),
+                'area_heptano': self._area_componente(integracion, 'heptano'),
+                'area_fames': self._area_componente(integracion, 'fames'),
+                'num_picos_total': integracion['num_picos_total'],
+                'num_picos_fames': integracion['componentes']['fames']['num_picos'],
+                'area_esteres': self._area_esteres(integracion),
+                'area_estandar_interno': self.biblioteca.area_clase(integracion['compuestos'], 'estandar_interno'),
+                'candidatos_si': integracion['candidatos_si']
             }
 
+            # Composición sobre todos los ésteres (sin el SI): los picos sin
+            # identificar no se reparten entre los FAMEs identificados
+            area_esteres = integracion['area_rango_esteres'] - resultados['area_estandar_interno']
+            resultados['composicion_fames'] = self.biblioteca.composicion_fames(integracion['compuestos'], area_esteres)
+            resultados['fraccion_esteres_sin_identificar_pct'] = self.biblioteca.fraccion_sin_identificar(
+                integracion['compuestos'], area_esteres)
+
+            for clave in ('anclas_tr', 'picos_reasignados_alineacion'):
+                if clave in integracion:
+                    resultados[clave] = integracion[clave]
+
             if peso_muestra_mg:
-                resultados['concentracion_fames_mg_ml'] = self.cuantificar_fames(df, peso_muestra_mg)
+                resultados['contenido_esteres_pct'] = self.cuantificar_fames(df, peso_muestra_mg, integracion)
 
             return resultados
 
@@ -156,9 +643,13 @@ class ProcesadorCromatogramas:
             print(f"Error procesando {csv_file}: {e}")
             return None
 
-    def procesar_experimento(self, experimento_dir, experimento_num):
-        """Procesa todas las muestras de un experimento"""
-        print(f"\nProcesando Experimento {experimento_num}...")
+    def procesar_experimento(self, experimento_dir, executor=None):
+        """Procesa todas las muestras de un experimento
+
+        Si se proporciona un executor, cada muestra se procesa como una tarea
+        independiente y los resultados se recogen en el orden de los archivos.
+        """
+        print(f"\nProcesando {experimento_dir}...")
 
         exp_path = self.procesados_dir / experimento_dir
         metadata_file = exp_path / 'metadata.json'
@@ -178,19 +669,24 @@ class ProcesadorCromatogramas:
 
         # Crear mapeo de archivos CSV a nomenclatura
         nomenclatura_map = {}
-        for muestra_info in metadata.get('muestras', []):
+        muestras_info = metadata.get('muestras', [])
+        minutos = minutos_muestreo([m.get('tiempo') for m in muestras_info], [m.get('tipo') for m in muestras_info])
+        for muestra_info, tiempo_min in zip(muestras_info, minutos):
             archivo_csv = muestra_info.get('archivo_csv', '')
-            nombre_archivo = Path(archivo_csv).stem.replace('muestra_', '').replace('_raw', '')
+            nombre_archivo = nombre_muestra(archivo_csv)
             nomenclatura_map[nombre_archivo] = {
                 'nomenclatura': muestra_info.get('nomenclatura', nombre_archivo),
-                'orden': muestra_info.get('orden', 0)
+                'orden': muestra_info.get('orden', 0),
+                'tiempo_min': float(tiempo_min) if np.isfinite(tiempo_min) else None
             }
 
         # Procesar cada muestra
         csv_files = sorted(exp_path.glob('muestra_*_raw.csv'))
 
+        tareas = []
+        resultados_muestras = []
         for csv_file in csv_files:
-            nombre_archivo = csv_file.stem.replace('muestra_', '').replace('_raw', '')
+            nombre_archivo = nombre_muestra(csv_file)
 
             # Obtener nomenclatura actualizada
             if nombre_archivo in nomenclatura_map:
@@ -200,13 +696,70 @@ class ProcesadorCromatogramas:
                 nomenclatura = nombre_archivo
                 orden = 0
 
-            print(f"  Procesando {nombre_archivo} → {nomenclatura}...")
+            tareas.append((csv_file, nomenclatura, nombre_archivo, orden))
+
+            # Reutilizar el resultado si la muestra no cambió desde la última ejecución
+            resultado = self._resultado_vigente(csv_file)
+            if resultado is not None:
+                resultado['nombre'] = nomenclatura
+                resultado['archivo'] = str(csv_file)
+                print(f"  Sin cambios {nombre_archivo} → {nomenclatura}")
+            else:
+                print(f"  Procesando {nombre_archivo} → {nomenclatura}...")
+            resultados_muestras.append(resultado)
+
+        pendientes = [i for i, resultado in enumerate(resultados_muestras) if resultado is None]
+
+        # Tablas de picos del almacén columnar; sin almacén (o en modo por
+        # bloques) cada muestra lee su CSV
+        tablas = None
+        if pendientes and not self.tamano_bloque:
+            tablas = self.cargar_picos_experimento(experimento_dir)
+        tablas = tablas or {}
+
+        # La alineación corrige todas las muestras pendientes en una sola
+        # operación matricial; las que no están en el almacén leen su CSV
+        anclas = {}
+        reasignados = {}
+        if pendientes and self.alineador is not None and not self.tamano_bloque:
+            lote = {tareas[i][2]: tablas[tareas[i][2]] if tareas[i][2] in tablas
+                    else self.limpiar_tabla_picos(pd.read_csv(tareas[i][0]))
+                    for i in pendientes}
+            tablas, anclas = self.alineador.alinear(lote)
+            reasignados = {nombre: self.picos_reasignados(tabla['Time'], tablas[nombre]['Time'])
+                           for nombre, tabla in lote.items()}
+
+        if executor is not None:
+            futuros = [executor.submit(self.procesar_muestra, tareas[i][0], tareas[i][1],
+                                       df=tablas.get(tareas[i][2]))
+                       for i in pendientes]
+            nuevos = [futuro.result() for futuro in futuros]
+        else:
+            nuevos = [self.procesar_muestra(tareas[i][0], tareas[i][1], df=tablas.get(tareas[i][2]))
+                      for i in pendientes]
+
+        for i, resultado in zip(pendientes, nuevos):
+            resultados_muestras[i] = resultado
+            if resultado and tareas[i][2] in anclas:
+                resultado['anclas_tr'] = anclas[tareas[i][2]]
+                resultado['picos_reasignados_alineacion'] = reasignados[tareas[i][2]]
+            if resultado:
+                self._registrar_resultado(tareas[i][0], resultado)
 
-            resultado = self.procesar_muestra(csv_file, nomenclatura)
+        for (csv_file, nomenclatura, nombre_archivo, orden), resultado in zip(tareas, resultados_muestras):
             if resultado:
                 resultado['nombre_original'] = nombre_archivo
                 resultado['orden'] = orden
+                resultado['tiempo_min'] = nomenclatura_map.get(nombre_archivo, {}).get('tiempo_min')
                 resultados_exp['muestras'].append(resultado)
+                if resultado.get('picos_reasignados_alineacion'):
+                    print(f"  ! {resultado['nombre']}: la alineación cambia de componente "
+                          f"{resultado['picos_reasignados_alineacion']} pico(s)")
+
+        # Cuantificación EN 14103 del lote completo
+        curva = self.cuantificar_muestras(exp_path, metadata, resultados_exp['muestras'])
+        if curva is not None:
+            resultados_exp['curva_calibracion'] = curva.a_dict()
 
         # Calcular estadísticas del experimento
         if resultados_exp['muestras']:
@@ -222,55 +775,157 @@ class ProcesadorCromatogramas:
                 'pureza_std': np.std(purezas)
             }
 
-        self.resultados[f'Experimento{experimento_num}'] = resultados_exp
+        self.resultados[experimento_dir] = resultados_exp
 
         # Guardar resultados del experimento
         output_file = exp_path / 'resultados_procesados.json'
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(resultados_exp, f, indent=2, ensure_ascii=False)
 
+        if self.manifiesto is not None:
+            self.manifiesto.guardar()
+
         print(f"  ✓ Resultados guardados en {output_file.name}")
 
-    def procesar_todos_experimentos(self):
-        """Procesa todos los experimentos"""
+    def calcular_bootstrap(self):
+        """Intervalos bootstrap por experimento y diferencias entre experimentos consecutivos
+
+        Cada experimento y cada par se registran en el manifiesto con los
+        valores que remuestrean; solo se recalculan los que cambiaron. Cada
+        experimento tiene su propia semilla, así que el resultado es el mismo
+        que recalculando todo.
+        """
+        experimentos = list(self.resultados)
+        pares = pares_consecutivos(experimentos)
+        parametros = {exp: {'experimento': exp, 'valores': valores_bootstrap(self.resultados[exp]),
+                            'remuestras': REMUESTRAS, 'semilla': SEMILLA, 'nivel': NIVEL_CONFIANZA}
+                      for exp in experimentos}
+        unidades = ([(f"bootstrap:{exp}", parametros[exp], exp) for exp in experimentos]
+                    + [(f"bootstrap:{a} - {b}", [parametros[a], parametros[b]], (a, b)) for a, b in pares])
+
+        vigentes = {}
+        if self.manifiesto is not None:
+            for clave, params, unidad in unidades:
+                registro = self.manifiesto.vigente(clave, [], params)
+                if registro is not None:
+                    vigentes[unidad] = registro['resultado']
+
+        pendientes_exp = [exp for exp in experimentos if exp not in vigentes]
+        pendientes_pares = [par for par in pares if par not in vigentes]
+        nuevo = {'experimentos': {}, 'diferencias': {}}
+        if pendientes_exp or pendientes_pares:
+            nuevo = bootstrap_resultados(self.resultados, pares=pendientes_pares, experimentos=pendientes_exp)
+            print(f"✓ Bootstrap recalculado para {len(pendientes_exp)} experimento(s) "
+                  f"y {len(pendientes_pares)} par(es)")
+
+        salida = {'remuestras': REMUESTRAS, 'semilla': SEMILLA, 'nivel_confianza': NIVEL_CONFIANZA,
+                  'experimentos': {}, 'diferencias': {}}
+        for clave, params, unidad in unidades:
+            if isinstance(unidad, tuple):
+                destino, nombre = salida['diferencias'], f"{unidad[0]} - {unidad[1]}"
+                resultado = vigentes.get(unidad, nuevo['diferencias'].get(nombre))
+            else:
+                destino, nombre = salida['experimentos'], unidad
+                resultado = vigentes.get(unidad, nuevo['experimentos'].get(nombre))
+            destino[nombre] = resultado
+            if self.manifiesto is not None and unidad not in vigentes:
+                self.manifiesto.registrar(clave, [], params, resultado=resultado)
+
+        if self.manifiesto is not None:
+            self.manifiesto.guardar()
+        return salida
+
+    def procesar_todos_experimentos(self, workers=None):
+        """Procesa todos los experimentos
+
+        Con workers > 1 las muestras se reparten en un ProcessPoolExecutor;
+        el orden de los resultados es el mismo que en la ejecución serial.
+        """
         print("=" * 80)
         print("PROCESAMIENTO DE CROMATOGRAMAS")
         print("=" * 80)
 
-        self.procesar_experimento('Experimento1', 1)
-        self.procesar_experimento('Experimento2', 2)
-        self.procesar_experimento('Experimento3', 3)
+        experimentos = [entrada['clave'] for entrada in experimentos_activos(cargar_registro(self.registro_file))]
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for experimento_dir in experimentos:
+                    self.procesar_experimento(experimento_dir, executor=executor)
+        else:
+            for experimento_dir in experimentos:
+                self.procesar_experimento(experimento_dir)
+
+        # Intervalos bootstrap (solo se remuestrea lo que cambió)
+        if self.resultados:
+            bootstrap = self.calcular_bootstrap()
+            for exp_name, intervalos in bootstrap['experimentos'].items():
+                self.resultados[exp_name]['intervalos_bootstrap'] = intervalos
+            with open(self.procesados_dir / 'bootstrap.json', 'w', encoding='utf-8') as f:
+                json.dump(bootstrap, f, indent=2, ensure_ascii=False)
 
         # Guardar resultados consolidados
         output_file = self.procesados_dir / 'resultados_consolidados.json'
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(self.resultados, f, indent=2, ensure_ascii=False)
 
+        if self.base_datos is not None:
+            with BaseDatosResultados(self.base_datos) as base:
+                base.guardar_resultados(self.resultados)
+            print(f"✓ Métricas guardadas en {self.base_datos}")
+
         print("\n" + "=" * 80)
         print("PROCESAMIENTO COMPLETADO")
         print("=" * 80)
         print(f"\nResultados consolidados guardados en: {output_file}")
 
+    def comprobar_composicion(self, exp_name, muestras):
+        """Avisa si el FAME mayoritario no es el mismo en todas las muestras de
+        un experimento (el mismo aceite no cambia de perfil: el pico principal
+        se ha identificado como compuestos distintos)"""
+        mayoritarios = {}
+        for muestra in muestras:
+            composicion = muestra.get('composicion_fames') or {}
+            if composicion and max(composicion.values()) > 0:
+                nombre = max(composicion, key=composicion.get)
+                mayoritarios.setdefault(self.biblioteca.etiqueta(nombre), []).append(muestra['nombre'])
+        if len(mayoritarios) > 1:
+            detalle = '; '.join(f"{fame} en {', '.join(nombres)}" for fame, nombres in mayoritarios.items())
+            print(f"  ! {exp_name}: el FAME mayoritario cambia entre muestras ({detalle}); "
+                  f"revisar la biblioteca antes de usar la composición")
+
     def generar_tabla_resumen(self):
         """Genera una tabla resumen de todos los resultados"""
         data = []
 
         for exp_name, exp_data in self.resultados.items():
             for muestra in exp_data['muestras']:
-                data.append({
+                fila = {
                     'Experimento': exp_name,
                     'Fecha': exp_data['fecha'],
                     'Muestra': muestra['nombre'],
                     'Nombre_Original': muestra.get('nombre_original', muestra['nombre']),
                     'Orden': muestra.get('orden', 0),
+                    'Tiempo (min)': muestra.get('tiempo_min'),
                     'Conversión FAMEs (%)': round(muestra['conversion_fames_pct'], 2),
                     'Pureza (%)': round(muestra['pureza_biodiesel_pct'], 2),
                     'Monoglicéridos (%)': round(muestra['gliceridos']['monogliceridos_pct'], 2),
                     'Diglicéridos (%)': round(muestra['gliceridos']['digliceridos_pct'], 2),
                     'Triglicéridos (%)': round(muestra['gliceridos']['trigliceridos_pct'], 2),
                     'Área FAMEs': round(muestra['area_fames'], 2),
-                    'Picos FAMEs': muestra['num_picos_fames']
-                })
+                    'Picos FAMEs': muestra['num_picos_fames'],
+                    'Ésteres EN 14103 (%)': (round(muestra['contenido_esteres_pct'], 2)
+                                             if muestra.get('contenido_esteres_pct') is not None else None),
+                    'Ésteres sin identificar (%)': (round(muestra['fraccion_esteres_sin_identificar_pct'], 2)
+                                                    if muestra.get('fraccion_esteres_sin_identificar_pct') is not None
+                                                    else None)
+                }
+                if self.composicion_fames:
+                    for nombre, porcentaje in muestra.get('composicion_fames', {}).items():
+                        fila[f'{self.biblioteca.etiqueta(nombre)} (%)'] = round(porcentaje, 2)
+                data.append(fila)
+
+            if self.composicion_fames:
+                self.comprobar_composicion(exp_name, exp_data['muestras'])
 
         df = pd.DataFrame(data)
 
@@ -293,20 +948,54 @@ class ProcesadorCromatogramas:
         print("RESUMEN DE TODOS LOS EXPERIMENTOS")
         print("=" * 80)
 
-        for exp_name in ['Experimento1', 'Experimento2', 'Experimento3']:
-            if exp_name in self.resultados:
-                exp = self.resultados[exp_name]
-                print(f"\n{exp['experimento']} ({exp['fecha']}):")
-                print(f"  Muestras analizadas: {len(exp['muestras'])}")
-                if 'estadisticas' in exp:
-                    print(f"  Conversión promedio: {exp['estadisticas']['conversion_promedio']:.2f}% ± {exp['estadisticas']['conversion_std']:.2f}%")
-                    print(f"  Pureza promedio: {exp['estadisticas']['pureza_promedio']:.2f}% ± {exp['estadisticas']['pureza_std']:.2f}%")
-                    print(f"  Coeficiente de variación: {(exp['estadisticas']['conversion_std'] / exp['estadisticas']['conversion_promedio'] * 100):.2f}%")
+        for exp in self.resultados.values():
+            print(f"\n{exp['experimento']} ({exp['fecha']}):")
+            print(f"  Muestras analizadas: {len(exp['muestras'])}")
+            if 'estadisticas' in exp:
+                print(f"  Conversión promedio: {exp['estadisticas']['conversion_promedio']:.2f}% ± {exp['estadisticas']['conversion_std']:.2f}%")
+                print(f"  Pureza promedio: {exp['estadisticas']['pureza_promedio']:.2f}% ± {exp['estadisticas']['pureza_std']:.2f}%")
+            intervalos = exp.get('intervalos_bootstrap', {}).get('conversion_fames_pct')
+            if intervalos and intervalos['promedio']['ic_inf'] is not None:
+                media, cv = intervalos['promedio'], intervalos['cv_pct']
+                print(f"  IC 95% conversión (bootstrap): [{media['ic_inf']:.2f}, {media['ic_sup']:.2f}]%")
+                if cv['valor'] is not None and cv['ic_inf'] is not None:
+                    print(f"  Coeficiente de variación: {cv['valor']:.2f}% [{cv['ic_inf']:.2f}, {cv['ic_sup']:.2f}]")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Procesa los cromatogramas extraídos en Procesados/')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Número de procesos para procesar muestras en paralelo')
+    parser.add_argument('--tamano-bloque', type=int, default=None,
+                        help='Leer los CSV por bloques de este número de filas')
+    parser.add_argument('--rangos-solapados', action='store_true',
+                        help='Contar cada pico en todos los rangos que lo contienen (solo importa si los rangos se solapan)')
+    parser.add_argument('--rangos-biblioteca', action='store_true',
+                        help='Usar las ventanas de TR derivadas de biblioteca_compuestos.json en lugar de las validadas')
+    parser.add_argument('--composicion-fames', action='store_true',
+                        help='Añadir a la tabla resumen la composición por FAME (identificación aún sin confirmar con patrones)')
+    parser.add_argument('--alinear', action='store_true',
+                        help='Corregir la deriva de tiempos de retención con los picos de referencia')
+    parser.add_argument('--base-datos', action='store_true',
+                        help=f'Guardar las métricas en Procesados/{NOMBRE_BASE_DATOS}')
+    parser.add_argument('--validar', action='store_true',
+                        help='Comparar los resultados con los cálculos de la hoja (validacion_hoja.csv)')
+    parser.add_argument('--estricto', action='store_true',
+                        help='Con --validar, salir con código 1 si alguna muestra queda por revisar')
+    args = parser.parse_args()
+
     procesados_dir = '/home/user/ExperimentosBiodiesel_row/Procesados'
-    procesador = ProcesadorCromatogramas(procesados_dir)
+    procesador = ProcesadorCromatogramas(procesados_dir, tamano_bloque=args.tamano_bloque,
+                                         alinear=args.alinear, rangos_biblioteca=args.rangos_biblioteca,
+                                         composicion_fames=args.composicion_fames,
+                                         asignacion_exclusiva=not args.rangos_solapados,
+                                         base_datos=Path(procesados_dir) / NOMBRE_BASE_DATOS if args.base_datos else None)
 
-    procesador.procesar_todos_experimentos()
+    procesador.procesar_todos_experimentos(workers=args.workers)
     procesador.generar_tabla_resumen()
     procesador.generar_resumen_final()
+
+    if args.validar:
+        from validacion import generar_reporte
+        tabla_validacion = generar_reporte(procesados_dir, procesador.resultados)
+        if args.estricto and (tabla_validacion['estado'] == 'revisar').any():
+            sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Registro declarativo de experimentos
+Lee experimentos.json, que describe para cada lote el libro Excel fuente,
+las hojas de cada muestra (por nombre exacto o patrón) o su reporte PDF,
+el estándar interno y las condiciones de reacción
+"""
+
+import json
+import re
+from pathlib import Path
+
+NOMBRE_REGISTRO = 'experimentos.json'
+
+
+def cargar_registro(ruta):
+    """Devuelve el registro completo {'experimentos': [...]}"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_registro(ruta, registro):
+    """Escribe el registro conservando el formato del archivo"""
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(registro, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def experimentos_activos(registro):
+    """Entradas del registro marcadas como activas, en el orden del archivo"""
+    return [entrada for entrada in registro['experimentos'] if entrada.get('activo', True)]
+
+
+def archivos_fuente(entrada):
+    """Rutas (relativas al directorio base) de los archivos que lee una entrada:
+    el libro fuente, si lo hay, y los PDFs de muestras y estándar interno"""
+    archivos = [entrada['fuente']] if entrada.get('fuente') else []
+    especificaciones = entrada['muestras'] + [entrada.get('estandar_interno') or {}]
+    archivos += [espec['pdf'] for espec in especificaciones if 'pdf' in espec]
+    return archivos
+
+
+def usa_libro(especificacion):
+    """Indica si la muestra se lee de una hoja del libro (y no solo de su PDF)"""
+    return 'hoja' in especificacion or 'patron' in especificacion
+
+
+def buscar_hoja(especificacion, nombres_hojas):
+    """Nombre real de la hoja que corresponde a una especificación
+
+    La especificación tiene 'hoja' (nombre exacto) o 'patron' (expresión
+    regular buscada al inicio del nombre). Devuelve None si no hay hoja.
+    """
+    if not usa_libro(especificacion):
+        return None
+    if 'hoja' in especificacion:
+        return especificacion['hoja'] if especificacion['hoja'] in nombres_hojas else None
+
+    patron = re.compile(especificacion['patron'])
+    for nombre in nombres_hojas:
+        if patron.match(nombre):
+            return nombre
+    return None
+
+
+def nombre_muestra(archivo_csv):
+    """Identificador de muestra a partir del CSV (muestra_2_1_raw.csv -> 2_1)"""
+    return Path(archivo_csv).stem.replace('muestra_', '').replace('_raw', '')
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Intervalos de confianza bootstrap de las estadísticas de cada experimento
+Remuestrea con reemplazo las muestras de cada experimento y calcula, para la
+conversión y la pureza, intervalos percentil de la media, la desviación, el
+CV, la mediana y los extremos, además de las diferencias entre experimentos
+(por defecto solo entre experimentos consecutivos; todos los pares es
+O(G²)). Todos los experimentos y variables se remuestrean a la vez sobre una
+matriz (grupos × remuestras × muestras); cada grupo tiene su propio
+np.random.Generator con semilla, así que sus intervalos no dependen de qué
+otros experimentos se calculen con él
+"""
+
+import argparse
+import json
+import zlib
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+REMUESTRAS = 10000
+SEMILLA = 20251003
+NIVEL_CONFIANZA = 0.95
+
+VARIABLES = ('conversion_fames_pct', 'pureza_biodiesel_pct')
+
+
+def _promedio(x, mascara, n):
+    return np.where(mascara, x, 0.0).sum(axis=-1) / n
+
+
+def _std(x, mascara, n):
+    # Desviación poblacional (ddof=0), como np.std en las estadísticas del procesamiento
+    centrado = np.where(mascara, x - _promedio(x, mascara, n)[..., None], 0.0)
+    return np.sqrt((centrado ** 2).sum(axis=-1) / n)
+
+
+def _cv(x, mascara, n):
+    promedio = _promedio(x, mascara, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(promedio != 0, _std(x, mascara, n) / promedio * 100, np.nan)
+
+
+def _mediana(x, mascara, n):
+    # x viene ordenado con el relleno al final
+    n = np.broadcast_to(n, x.shape[:-1]).astype(int)[..., None]
+    centro = np.take_along_axis(x, (n - 1) // 2, axis=-1) + np.take_along_axis(x, n // 2, axis=-1)
+    return centro[..., 0] / 2
+
+
+ESTADISTICOS = {
+    'promedio': _promedio,
+    'std': _std,
+    'cv_pct': _cv,
+    'mediana': _mediana,
+    'min': lambda x, mascara, n: x[..., 0],
+    'max': lambda x, mascara, n: np.take_along_axis(
+        x, np.broadcast_to(n, x.shape[:-1]).astype(int)[..., None] - 1, axis=-1)[..., 0]
+}
+
+
+def matriz_grupos(grupos):
+    """Matriz (G, N) con los valores finitos de cada grupo al principio y NaN de relleno"""
+    valores = [np.asarray(v, dtype=float)[np.isfinite(np.asarray(v, dtype=float))] for v in grupos]
+    matriz = np.full((len(valores), max((len(v) for v in valores), default=0)), np.nan)
+    for i, v in enumerate(valores):
+        matriz[i, :len(v)] = v
+    return matriz
+
+
+def semilla_grupo(semilla, clave):
+    """Semilla de un grupo (p. ej. 'Experimento1:conversion_fames_pct') derivada de la semilla global"""
+    return np.random.SeedSequence([semilla, zlib.crc32(clave.encode('utf-8'))])
+
+
+def valores_bootstrap(resultado, variables=VARIABLES):
+    """{variable: valores} de las muestras de un experimento (None -> NaN)"""
+    return {variable: [np.nan if m.get(variable) is None else m[variable] for m in resultado['muestras']]
+            for variable in variables}
+
+
+def pares_consecutivos(experimentos):
+    """Pares (a, b) de experimentos consecutivos"""
+    experimentos = list(experimentos)
+    return list(zip(experimentos, experimentos[1:]))
+
+
+def distribuciones_bootstrap(matriz, remuestras=REMUESTRAS, semillas=None):
+    """Estadísticos observados {nombre: (G,)} y sus distribuciones bootstrap {nombre: (G, B)}
+
+    Cada grupo se remuestrea con su propio tamaño y su propia semilla
+    (semillas, una por fila; por defecto derivadas de SEMILLA): los índices
+    se sacan de U(0, 1) × n del grupo, así que el relleno nunca se elige y
+    las remuestras de un grupo no dependen del resto de la matriz.
+    """
+    g, n_max = matriz.shape
+    n = np.isfinite(matriz).sum(axis=1).astype(float)
+    if semillas is None:
+        semillas = np.random.SeedSequence(SEMILLA).spawn(g)
+
+    # Cada remuestra se ordena una vez (mediana y extremos por posición) con el relleno al final
+    mascara = np.arange(n_max) < n[:, None, None]
+    mascara_original = np.arange(n_max) < n[:, None]
+    uniformes = np.ones((g, remuestras, n_max))
+    for i, (semilla, tamano) in enumerate(zip(semillas, n.astype(int))):
+        uniformes[i, :, :tamano] = np.random.default_rng(semilla).random((remuestras, tamano))
+    indices = (uniformes * n[:, None, None]).astype(int)
+    muestras = np.take_along_axis(np.nan_to_num(matriz)[:, None, :], np.minimum(indices, n_max - 1), axis=2)
+    muestras = np.sort(np.where(mascara, muestras, np.inf), axis=-1)
+    originales = np.sort(np.where(mascara_original, matriz, np.inf), axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        observados = {nombre: f(originales, mascara_original, np.maximum(n, 1))
+                      for nombre, f in ESTADISTICOS.items()}
+        distribuciones = {nombre: f(muestras, mascara, np.maximum(n, 1)[:, None]) for nombre, f in ESTADISTICOS.items()}
+
+    vacios = n == 0
+    for nombre in ESTADISTICOS:
+        observados[nombre] = np.where(vacios, np.nan, observados[nombre])
+        distribuciones[nombre] = np.where(vacios[:, None], np.nan, distribuciones[nombre])
+    return observados, distribuciones
+
+
+def intervalo(distribucion, nivel=NIVEL_CONFIANZA):
+    """Límites percentil (inferior, superior) sobre el último eje (NaN si la distribución tiene NaN)"""
+    alfa = (1 - nivel) / 2
+    return np.quantile(distribucion, [alfa, 1 - alfa], axis=-1)
+
+
+def _numero(x):
+    return float(x) if np.isfinite(x) else None
+
+
+def bootstrap_resultados(resultados, variables=VARIABLES, pares=None, experimentos=None,
+                         remuestras=REMUESTRAS, semilla=SEMILLA, nivel=NIVEL_CONFIANZA):
+    """Intervalos por experimento y diferencias entre experimentos
+
+    experimentos limita los intervalos a esos experimentos (por defecto
+    todos los de resultados). pares es una lista de (experimento_a,
+    experimento_b); por defecto los experimentos consecutivos
+    (pares_consecutivos). Solo se remuestrean los experimentos que hacen
+    falta. Devuelve {'experimentos': {exp: {variable: {estadístico:
+    {'valor', 'ic_inf', 'ic_sup'}}}}, 'diferencias': {'a - b': {variable:
+    {estadístico: {'valor', 'ic_inf', 'ic_sup', 'prob_positiva'}}}}} con la
+    diferencia a - b.
+    """
+    experimentos = list(resultados) if experimentos is None else [exp for exp in experimentos if exp in resultados]
+    pares = pares_consecutivos(resultados) if pares is None else pares
+    pares = [(a, b) for a, b in pares if a in resultados and b in resultados]
+    necesarios = list(dict.fromkeys(experimentos + [exp for par in pares for exp in par]))
+
+    claves = [(exp, variable) for exp in necesarios for variable in variables]
+    valores = {exp: valores_bootstrap(resultados[exp], variables) for exp in necesarios}
+    matriz = matriz_grupos([valores[exp][variable] for exp, variable in claves])
+    semillas = [semilla_grupo(semilla, f'{exp}:{variable}') for exp, variable in claves]
+    observados, distribuciones = distribuciones_bootstrap(matriz, remuestras, semillas)
+    fila = {clave: i for i, clave in enumerate(claves)}
+
+    salida = {'remuestras': remuestras, 'semilla': semilla, 'nivel_confianza': nivel,
+              'experimentos': {}, 'diferencias': {}}
+
+    limites = {nombre: intervalo(distribucion, nivel) for nombre, distribucion in distribuciones.items()}
+    for (exp, variable), i in fila.items():
+        if exp not in experimentos:
+            continue
+        salida['experimentos'].setdefault(exp, {})[variable] = {
+            nombre: {'valor': _numero(observados[nombre][i]),
+                     'ic_inf': _numero(limites[nombre][0, i]),
+                     'ic_sup': _numero(limites[nombre][1, i])}
+            for nombre in ESTADISTICOS
+        }
+
+    for a, b in pares:
+        comparacion = {}
+        for variable in variables:
+            i, j = fila[(a, variable)], fila[(b, variable)]
+            comparacion[variable] = {}
+            for nombre, distribucion in distribuciones.items():
+                diferencia = distribucion[i] - distribucion[j]
+                inferior, superior = intervalo(diferencia, nivel)
+                finitas = np.isfinite(diferencia)
+                comparacion[variable][nombre] = {
+                    'valor': _numero(observados[nombre][i] - observados[nombre][j]),
+                    'ic_inf': _numero(inferior),
+                    'ic_sup': _numero(superior),
+                    'prob_positiva': _numero(np.mean(diferencia[finitas] > 0)) if finitas.any() else None
+                }
+        salida['diferencias'][f'{a} - {b}'] = comparacion
+
+    return salida
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Intervalos bootstrap de conversión y pureza por experimento')
+    parser.add_argument('--remuestras', type=int, default=REMUESTRAS)
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    parser.add_argument('--nivel', type=float, default=NIVEL_CONFIANZA)
+    parser.add_argument('--pares', nargs='+', default=None, metavar='A:B',
+                        help='Pares de experimentos a comparar (por defecto los consecutivos)')
+    parser.add_argument('--todos-los-pares', action='store_true',
+                        help='Comparar todos los pares de experimentos (O(G²))')
+    args = parser.parse_args()
+
+    procesados_dir = Path('/home/user/ExperimentosBiodiesel_row/Procesados')
+    with open(procesados_dir / 'resultados_consolidados.json', 'r', encoding='utf-8') as f:
+        resultados = json.load(f)
+
+    pares = [tuple(par.split(':', 1)) for par in args.pares] if args.pares else None
+    if args.todos_los_pares:
+        pares = list(combinations(resultados, 2))
+    salida = bootstrap_resultados(resultados, pares=pares, remuestras=args.remuestras,
+                                  semilla=args.semilla, nivel=args.nivel)
+
+    output_file = procesados_dir / 'bootstrap.json'
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+
+    for exp, variables in salida['experimentos'].items():
+        media = variables['conversion_fames_pct']['promedio']
+        if media['valor'] is not None:
+            print(f"  {exp}: conversión {media['valor']:.2f}% "
+                  f"[{media['ic_inf']:.2f}, {media['ic_sup']:.2f}]")
+    print(f"\n✓ Intervalos bootstrap guardados en {output_file}")
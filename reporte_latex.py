@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+"""
+Reporte LaTeX generado a partir de los resultados procesados
+Construye Procesados/reportes/<nombre>/<nombre>.tex con las tablas, estadísticas
+y referencias a figuras tomadas de resultados_consolidados.json, el registro de
+experimentos y los JSON opcionales (bootstrap, cinética, validación). Cada
+sección se escribe como un fragmento en secciones/ y solo se regenera cuando
+cambian los datos de los experimentos de los que depende. El documento no usa
+índice, \\ref ni longtable, así que compila en una sola pasada de pdflatex
+"""
+
+import argparse
+import inspect
+import json
+import math
+import os
+import shutil
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+from biblioteca_compuestos import BibliotecaCompuestos
+from manifiesto import ManifiestoProcesamiento
+from registro_experimentos import NOMBRE_REGISTRO, cargar_registro
+from visualizar_resultados import FIGURAS, experimentos_figura, nombre_corto
+
+NOMBRE_REPORTE = 'analisis_biodiesel'
+MAX_FILAS_TABLA = 40
+MAX_DIFERENCIAS = 30
+
+ESPECIALES_LATEX = {
+    '\\': r'\textbackslash{}', '&': r'\&', '%': r'\%', '$': r'\$', '#': r'\#', '_': r'\_',
+    '{': r'\{', '}': r'\}', '~': r'\textasciitilde{}', '^': r'\textasciicircum{}'
+}
+
+PREAMBULO = r"""\documentclass[11pt,a4paper]{article}
+\usepackage[utf8]{inputenc}
+\usepackage[T1]{fontenc}
+\usepackage[spanish]{babel}
+\usepackage{amsmath}
+\usepackage{graphicx}
+\usepackage{booktabs}
+\usepackage{geometry}
+\usepackage{float}
+\usepackage{caption}
+
+\geometry{margin=2.5cm}
+\numberwithin{figure}{section}
+\numberwithin{table}{section}
+\graphicspath{{__FIGURAS__}}
+"""
+
+
+def escapar(texto):
+    """Texto con los caracteres especiales de LaTeX escapados"""
+    return ''.join(ESPECIALES_LATEX.get(c, c) for c in str(texto))
+
+
+def numero(valor, decimales=2, formato='f'):
+    """Número formateado ('f' decimales fijos, 'g' cifras significativas), o '--' si falta"""
+    if valor is None or (isinstance(valor, float) and not math.isfinite(valor)):
+        return '--'
+    return f'{valor:.{decimales}{formato}}'
+
+
+def intervalo(estadistico, decimales=2, formato='f'):
+    """'[inf, sup]' de un {'valor', 'ic_inf', 'ic_sup'}, o '--'"""
+    if not estadistico or estadistico.get('ic_inf') is None or estadistico.get('ic_sup') is None:
+        return '--'
+    return (f"[{numero(estadistico['ic_inf'], decimales, formato)}, "
+            f"{numero(estadistico['ic_sup'], decimales, formato)}]")
+
+
+def fecha_corta(iso):
+    """'2025-10-03' -> '03/10/2025' (o el texto original si no es una fecha ISO)"""
+    try:
+        return datetime.strptime(iso, '%Y-%m-%d').strftime('%d/%m/%Y')
+    except (TypeError, ValueError):
+        return iso or 's/f'
+
+
+def tabla_latex(encabezados, filas, alineacion, titulo):
+    """Uno o varios entornos table (partidos cada MAX_FILAS_TABLA filas) con booktabs
+
+    Celdas y encabezados van ya en LaTeX (escapados por quien llama).
+    """
+    bloques = [filas[i:i + MAX_FILAS_TABLA] for i in range(0, len(filas), MAX_FILAS_TABLA)] or [[]]
+    partes = []
+    for i, bloque in enumerate(bloques):
+        partes.append('\n'.join([
+            r'\begin{table}[H]',
+            r'\centering\small',
+            rf'\caption{{{titulo}{" (continuación)" if i else ""}}}',
+            rf'\begin{{tabular}}{{{alineacion}}}',
+            r'\toprule',
+            ' & '.join(rf'\textbf{{{e}}}' for e in encabezados) + r' \\',
+            r'\midrule',
+            *(' & '.join(fila) + r' \\' for fila in bloque),
+            r'\bottomrule',
+            r'\end{tabular}',
+            r'\end{table}'
+        ]))
+    return '\n\n'.join(partes)
+
+
+def _muestras(datos):
+    return sorted(datos['muestras'], key=lambda m: m.get('orden', 0))
+
+
+class GeneradorReporte:
+    def __init__(self, procesados_dir, experimentos=None, desde=None, nombre=NOMBRE_REPORTE):
+        self.procesados_dir = Path(procesados_dir)
+        self.nombre = nombre
+        self.destino = self.procesados_dir / 'reportes' / nombre
+        self.secciones_dir = self.destino / 'secciones'
+        self.manifiesto = ManifiestoProcesamiento(self.destino / 'manifiesto_reporte.json')
+
+        todos = self._cargar('resultados_consolidados.json')
+        claves = [exp for exp in todos if experimentos is None or exp in experimentos]
+        if desde:
+            claves = [exp for exp in claves if (todos[exp].get('fecha') or '') >= desde]
+        if not claves:
+            raise ValueError('Ningún experimento procesado coincide con la selección')
+        self.experimentos = claves
+        self.resultados = {exp: todos[exp] for exp in claves}
+        # Todos los procesados, para saber qué experimento dibuja cada figura
+        self.experimentos_procesados = list(todos)
+
+        registro_file = self.procesados_dir.parent / NOMBRE_REGISTRO
+        registro = cargar_registro(registro_file)['experimentos'] if registro_file.exists() else []
+        self.registro = {entrada['clave']: entrada for entrada in registro}
+
+        self.bootstrap = self._cargar('bootstrap.json') or {}
+        self.cinetica = (self._cargar('cinetica.json') or {}).get('experimentos', {})
+        self.validacion = (self._cargar('validacion_hoja.json') or {}).get('experimentos', {})
+        self.biblioteca = BibliotecaCompuestos()
+
+    def _cargar(self, nombre):
+        ruta = self.procesados_dir / nombre
+        if not ruta.exists():
+            if nombre == 'resultados_consolidados.json':
+                raise FileNotFoundError(ruta)
+            return None
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _titulo_experimento(self, exp):
+        datos = self.resultados[exp]
+        return f"{datos.get('experimento', exp)} ({fecha_corta(datos.get('fecha'))})"
+
+    # ---- Secciones ----
+
+    def seccion_resumen(self, datos):
+        fechas = sorted(f for f in datos['fechas'] if f)
+        periodo = f"entre el {fecha_corta(fechas[0])} y el {fecha_corta(fechas[-1])}" if fechas else ''
+        tipos = ', '.join(escapar(t) for t in datos['tipos']) or 'transesterificación'
+        return (
+            "\\begin{abstract}\n"
+            f"Este documento presenta el análisis de los datos cromatográficos de {datos['muestras']} muestras "
+            f"distribuidas en {len(datos['fechas'])} experimentos realizados {periodo} ({tipos}). "
+            "Para cada experimento se detallan su origen y condiciones, la conversión a ésteres metílicos "
+            "(FAMEs), la pureza del biodiesel y el contenido de glicéridos de cada muestra, con intervalos "
+            "de confianza bootstrap de sus estadísticas. Todas las tablas y cifras se generan a partir de "
+            "los resultados procesados.\n"
+            "\\end{abstract}\n"
+        )
+
+    def seccion_nomenclatura(self, datos):
+        filas = [[escapar(nombre_corto(exp)), escapar(m['nombre']), escapar(m['original']),
+                  str(m['orden']), numero(m['tiempo'], 0)]
+                 for exp, muestras in datos.items() for m in muestras]
+        return (
+            "\\section{Nomenclatura}\n\n"
+            "Cada muestra se identifica con el número de experimento seguido de una letra en orden "
+            "cronológico de toma (E1a, E1b, \\ldots). La tabla siguiente relaciona esa nomenclatura "
+            "con el nombre de la hoja original y el tiempo de reacción.\n\n"
+            + tabla_latex(['Experimento', 'Muestra', 'Hoja original', 'Orden', 'Tiempo (min)'],
+                          filas, 'llccc', 'Mapeo de nomenclatura')
+            + '\n'
+        )
+
+    def seccion_experimentos(self, datos):
+        return (
+            "\\section{Experimentos}\n\n"
+            f"Se analizan {len(datos)} experimentos: {escapar(', '.join(datos))}. Para cada uno se indican "
+            "el archivo fuente y las condiciones de reacción del registro de experimentos, los resultados "
+            "por muestra y las estadísticas con su intervalo de confianza bootstrap.\n"
+        )
+
+    def seccion_experimento(self, datos):
+        resultado, entrada = datos['resultado'], datos['registro']
+        partes = [f"\\subsection{{{escapar(datos['titulo'])}}}\n"]
+
+        origen = []
+        if entrada.get('fuente'):
+            origen.append(f"\\item \\textbf{{Archivo fuente:}} \\texttt{{{escapar(entrada['fuente'])}}}")
+        if entrada.get('tipo'):
+            origen.append(f"\\item \\textbf{{Tipo:}} {escapar(entrada['tipo'])}")
+        origen.append(f"\\item \\textbf{{Muestras analizadas:}} {len(resultado['muestras'])}")
+        partes.append("\\begin{itemize}\n" + '\n'.join(origen) + "\n\\end{itemize}\n")
+
+        condiciones = entrada.get('condiciones') or {}
+        if condiciones:
+            filas = [[escapar(clave.replace('_', ' ').capitalize()), escapar(valor)]
+                     for clave, valor in condiciones.items()]
+            partes.append(tabla_latex(['Condición', 'Valor'], filas, 'll', 'Condiciones de reacción'))
+
+        filas, descartados = [], False
+        for m in _muestras(resultado):
+            gliceridos = m.get('gliceridos') or {}
+            # Los contenidos EN 14103 fuera de rango o con el estándar interno en
+            # desacuerdo con la hoja no se publican
+            if m.get('contenido_esteres_plausible') is False:
+                descartados = True
+                esteres = r'--$^\ddagger$'
+            else:
+                esteres = numero(m.get('contenido_esteres_pct'))
+            filas.append([escapar(m['nombre']), escapar(m.get('nombre_original', '')),
+                          numero(m.get('tiempo_min'), 0), numero(m.get('conversion_fames_pct')),
+                          numero(m.get('pureza_biodiesel_pct')), numero(gliceridos.get('monogliceridos_pct')),
+                          numero(gliceridos.get('digliceridos_pct')), numero(gliceridos.get('trigliceridos_pct')),
+                          esteres])
+        partes.append("La tabla siguiente recoge los resultados de cada muestra (porcentajes de área).\n")
+        partes.append(tabla_latex(
+            ['Muestra', 'Hoja', 't (min)', r'Conv. (\%)', r'Pureza (\%)', r'MAG (\%)', r'DAG (\%)', r'TAG (\%)',
+             r'Ésteres (\%)'], filas, 'llccccccc', 'Resultados por muestra'))
+        if descartados:
+            partes.append("$^\\ddagger$ Contenido de ésteres EN 14103 no publicado: el valor calculado supera el 100\\,\\% "
+                          "o el estándar interno no concuerda con la hoja de laboratorio.\n")
+
+        intervalos = resultado.get('intervalos_bootstrap') or {}
+        nombres = {'promedio': 'Promedio', 'std': 'Desviación', 'cv_pct': 'CV (%)', 'mediana': 'Mediana',
+                   'min': 'Mínimo', 'max': 'Máximo'}
+        filas = []
+        for estadistico, etiqueta in nombres.items():
+            conversion = (intervalos.get('conversion_fames_pct') or {}).get(estadistico)
+            pureza = (intervalos.get('pureza_biodiesel_pct') or {}).get(estadistico)
+            if conversion or pureza:
+                filas.append([escapar(etiqueta), numero((conversion or {}).get('valor')), intervalo(conversion),
+                              numero((pureza or {}).get('valor')), intervalo(pureza)])
+        if filas:
+            nivel = datos['nivel_confianza']
+            partes.append(tabla_latex(
+                ['Estadístico', r'Conversión (\%)', f'IC {nivel * 100:.0f}\\%', r'Pureza (\%)',
+                 f'IC {nivel * 100:.0f}\\%'],
+                filas, 'lcccc', 'Estadísticas con intervalos de confianza bootstrap'))
+
+        if datos['cinetica']:
+            filas, en_limite, fallidos = [], False, []
+            for modelo, ajuste in datos['cinetica'].items():
+                r2 = ajuste.get('r2')
+                if not ajuste.get('valido', r2 is not None and r2 >= 0):
+                    fallidos.append((modelo, ajuste.get('motivos') or ['R² negativo']))
+                    filas.append([escapar(modelo.replace('_', ' ')) + r'$^\dagger$', '--', '--', '--', '--'])
+                    continue
+                for constante, valores in (ajuste.get('constantes') or {}).items():
+                    en_limite |= bool(valores.get('en_limite'))
+                    filas.append([escapar(modelo.replace('_', ' ')),
+                                  escapar(constante) + ('*' if valores.get('en_limite') else ''),
+                                  numero(valores.get('valor'), 4, 'g'), intervalo(valores, 4, 'g'),
+                                  numero(ajuste.get('r2'), 3)])
+            partes.append(tabla_latex(['Modelo', 'Constante', 'Valor', 'IC', '$R^2$'], filas, 'llccc',
+                                      'Constantes cinéticas ajustadas'))
+            if en_limite:
+                partes.append("* Constante en el límite de su intervalo de ajuste; el valor no está determinado "
+                              "por los datos.\n")
+            for modelo, motivos in fallidos:
+                motivos = escapar(', '.join(motivos)).replace('R²', '$R^2$')
+                partes.append(f"$^\\dagger$ Ajuste {escapar(modelo.replace('_', ' '))} no válido "
+                              f"({motivos}); no se reportan sus constantes.\n")
+
+        if datos['validacion']:
+            validacion = datos['validacion']
+            estados = ', '.join(f"{n} {escapar(estado.replace('_', ' '))}"
+                                for estado, n in validacion.get('estados', {}).items())
+            partes.append(
+                f"Frente a los cálculos de la hoja de laboratorio: {estados}. Diferencia media "
+                f"{numero(validacion.get('diferencia_media_pct'))}\\,\\%, máxima "
+                f"{numero(validacion.get('diferencia_max_pct'))}\\,\\%.\n")
+
+        return '\n'.join(partes) + '\n'
+
+    def seccion_metodologia(self, datos):
+        filas = [[escapar(c.get('abreviatura', c['nombre'])), escapar(c['clase']), numero(c['tr']),
+                  numero(c['tolerancia'])] for c in datos]
+        return (
+            "\\section{Metodología de Análisis}\n\n"
+            "Los picos se identifican por su tiempo de retención (TR) frente a la biblioteca de compuestos, "
+            "dentro de la tolerancia de cada compuesto.\n\n"
+            + tabla_latex(['Compuesto', 'Clase', 'TR (min)', 'Tolerancia (min)'], filas, 'llcc',
+                          'Biblioteca de compuestos')
+            + "\n\nLa conversión es el porcentaje de área de FAMEs respecto al total sin el estándar interno:\n"
+            "\\begin{equation*}\n"
+            "\\text{Conversión (\\%)} = \\frac{A_{\\text{FAMEs}}}{A_{\\text{total}} - A_{\\text{heptano}}} \\times 100\n"
+            "\\end{equation*}\n"
+            "La pureza es el porcentaje de FAMEs respecto a todos los productos de reacción:\n"
+            "\\begin{equation*}\n"
+            "\\text{Pureza (\\%)} = \\frac{A_{\\text{FAMEs}}}{A_{\\text{FAMEs}} + A_{\\text{MAG}} + A_{\\text{DAG}}"
+            " + A_{\\text{TAG}}} \\times 100\n"
+            "\\end{equation*}\n"
+            "Los intervalos de confianza se obtienen por bootstrap percentil remuestreando las muestras de "
+            "cada experimento.\n"
+        )
+
+    def seccion_comparacion(self, datos):
+        filas = []
+        for exp, est in datos['experimentos'].items():
+            conversion = est['conversion']
+            filas.append([escapar(nombre_corto(exp)), str(est['n']),
+                          f"{numero(conversion.get('valor'))} $\\pm$ {numero(est['conversion_std'])}",
+                          intervalo(conversion), numero(est['conversion_max']),
+                          numero(est['pureza'].get('valor'))])
+        partes = [
+            "\\section{Comparación entre Experimentos}\n",
+            tabla_latex(['Experimento', 'n', r'Conversión (\%)', 'IC promedio', r'Máximo (\%)', r'Pureza (\%)'],
+                        filas, 'lccccc', 'Conversión y pureza promedio por experimento')
+        ]
+        if datos['diferencias']:
+            filas = []
+            for par, diferencia in datos['diferencias']:
+                excluye_cero = (diferencia.get('ic_inf') or 0) > 0 or (diferencia.get('ic_sup') or 0) < 0
+                filas.append([escapar(par), numero(diferencia.get('valor')), intervalo(diferencia),
+                              numero(diferencia.get('prob_positiva')), 'sí' if excluye_cero else 'no'])
+            partes.append(
+                "Diferencias de conversión promedio entre pares de experimentos; la diferencia es "
+                "significativa cuando su intervalo no contiene el cero"
+                + (f" (se muestran las {len(filas)} mayores en valor absoluto)" if datos['recortadas'] else '')
+                + ".\n")
+            partes.append(tabla_latex(['Par', r'Diferencia (\%)', 'IC', 'P(dif. $>$ 0)', 'Significativa'],
+                                      filas, 'lcccc', 'Diferencias bootstrap de conversión promedio'))
+        return '\n'.join(partes) + '\n'
+
+    def seccion_figuras(self, datos):
+        partes = ["\\section{Figuras}\n"]
+        if not datos['figuras']:
+            partes.append("No hay figuras generadas; ejecutar \\texttt{visualizar\\_resultados.py}.\n")
+            return '\n'.join(partes)
+        referencias = ', '.join(f"{datos['numero']}.{i}" for i in range(1, len(datos['figuras']) + 1))
+        partes.append(f"Las figuras {referencias} se generan con \\texttt{{visualizar\\_resultados.py}} "
+                      "a partir de todos los experimentos procesados.\n")
+        for figura in datos['figuras']:
+            partes.append(f"\\subsection{{{escapar(figura['descripcion'])}}}\n")
+            for j, archivo in enumerate(figura['archivos']):
+                sufijo = f" (página {j + 1} de {len(figura['archivos'])})" if len(figura['archivos']) > 1 else ''
+                # Cada página en su propio float; solo la primera lleva número
+                caption = (f"\\caption{{{escapar(figura['descripcion'])}}}" if j == 0
+                           else f"\\caption*{{{escapar(figura['descripcion'])}{sufijo}}}")
+                partes.append("\\begin{figure}[H]\n\\centering\n"
+                              f"\\includegraphics[width=0.95\\textwidth]{{{archivo}}}\n{caption}\n\\end{{figure}}\n")
+        return '\n'.join(partes)
+
+    def seccion_conclusiones(self, datos):
+        estadisticas = datos['experimentos']
+        promedios = {exp: est['conversion'].get('valor') for exp, est in estadisticas.items()
+                     if est['conversion'].get('valor') is not None}
+        puntos = []
+        if promedios:
+            mejor = max(promedios, key=promedios.get)
+            peor = min(promedios, key=promedios.get)
+            puntos.append(f"La mayor conversión promedio corresponde a {escapar(nombre_corto(mejor))} "
+                          f"({numero(promedios[mejor])}\\,\\%) y la menor a {escapar(nombre_corto(peor))} "
+                          f"({numero(promedios[peor])}\\,\\%).")
+        maximo = max(((est['conversion_max'], exp) for exp, est in estadisticas.items()
+                      if est['conversion_max'] is not None), default=None)
+        if maximo:
+            puntos.append(f"La conversión máxima en una muestra es {numero(maximo[0])}\\,\\% "
+                          f"({escapar(nombre_corto(maximo[1]))}).")
+        variables = [exp for exp, est in estadisticas.items()
+                     if (est['cv'].get('valor') or 0) > 30]
+        if variables:
+            puntos.append("Presentan alta variabilidad entre muestras (CV $>$ 30\\,\\%): "
+                          f"{escapar(', '.join(nombre_corto(exp) for exp in variables))}.")
+        tendencias = [(exp, est['tendencia']) for exp, est in estadisticas.items() if est['tendencia'] is not None]
+        if tendencias:
+            crecientes = [nombre_corto(exp) for exp, t in tendencias if t > 0]
+            puntos.append(f"La conversión aumenta entre la primera y la última muestra en {len(crecientes)} de "
+                          f"{len(tendencias)} experimentos"
+                          + (f" ({escapar(', '.join(crecientes))})" if 0 < len(crecientes) <= 10 else '') + ".")
+        significativas = [par for par, diferencia in datos['diferencias']
+                          if (diferencia.get('ic_inf') or 0) > 0 or (diferencia.get('ic_sup') or 0) < 0]
+        if datos['diferencias']:
+            puntos.append(f"{len(significativas)} de {len(datos['diferencias'])} diferencias de conversión "
+                          "comparadas son significativas según el bootstrap.")
+        return ("\\section{Conclusiones}\n\n\\begin{itemize}\n"
+                + '\n'.join(f"\\item {punto}" for punto in puntos)
+                + "\n\\end{itemize}\n")
+
+    # ---- Datos de cada sección ----
+
+    def _estadisticas(self, exp):
+        resultado = self.resultados[exp]
+        intervalos = resultado.get('intervalos_bootstrap') or {}
+        estadisticas = resultado.get('estadisticas') or {}
+        conversiones = [m.get('conversion_fames_pct') for m in _muestras(resultado)
+                        if m.get('conversion_fames_pct') is not None]
+        return {
+            'n': len(resultado['muestras']),
+            'conversion': (intervalos.get('conversion_fames_pct') or {}).get('promedio')
+            or {'valor': estadisticas.get('conversion_promedio')},
+            'conversion_std': estadisticas.get('conversion_std'),
+            'conversion_max': estadisticas.get('conversion_max'),
+            'cv': (intervalos.get('conversion_fames_pct') or {}).get('cv_pct') or {},
+            'pureza': (intervalos.get('pureza_biodiesel_pct') or {}).get('promedio')
+            or {'valor': estadisticas.get('pureza_promedio')},
+            'tendencia': conversiones[-1] - conversiones[0] if len(conversiones) > 1 else None
+        }
+
+    def _diferencias(self):
+        """[(par, diferencia de conversión promedio)] entre experimentos seleccionados, y si se recortó"""
+        seleccion = set(self.experimentos)
+        diferencias = []
+        for par, variables in (self.bootstrap.get('diferencias') or {}).items():
+            a, _, b = par.partition(' - ')
+            promedio = (variables.get('conversion_fames_pct') or {}).get('promedio')
+            if a in seleccion and b in seleccion and promedio:
+                diferencias.append((f'{nombre_corto(a)} - {nombre_corto(b)}', promedio))
+        recortadas = len(diferencias) > MAX_DIFERENCIAS
+        if recortadas:
+            diferencias = sorted(diferencias, key=lambda d: -abs(d[1].get('valor') or 0))[:MAX_DIFERENCIAS]
+        return diferencias, recortadas
+
+    def _figuras(self):
+        """Figuras existentes que incluyen algún experimento seleccionado, con todas sus páginas"""
+        figuras_dir = self.procesados_dir / 'figuras'
+        manifiesto = ManifiestoProcesamiento(figuras_dir / 'manifiesto_figuras.json')
+        figuras = []
+        for clave, figura in FIGURAS.items():
+            dibujados = experimentos_figura(figura, self.experimentos_procesados)
+            if dibujados is not None and not set(dibujados) & set(self.experimentos):
+                continue
+            registro = manifiesto.datos['unidades'].get(clave) or {}
+            archivos = registro.get('resultado') or [figura['archivo']]
+            archivos = [archivo for archivo in archivos if (figuras_dir / archivo).exists()]
+            if archivos:
+                figuras.append({'descripcion': figura['descripcion'], 'archivos': archivos})
+        return figuras
+
+    def secciones(self):
+        """[(clave, título, nivel, método, datos)] en el orden del documento
+
+        Cada sección depende solo de sus datos: los fragmentos por experimento
+        no cambian cuando se procesa otro experimento.
+        """
+        estadisticas = {exp: self._estadisticas(exp) for exp in self.experimentos}
+        diferencias, recortadas = self._diferencias()
+        nivel_confianza = self.bootstrap.get('nivel_confianza', 0.95)
+
+        secciones = [
+            ('resumen', None, None, self.seccion_resumen, {
+                'muestras': sum(len(d['muestras']) for d in self.resultados.values()),
+                'fechas': [d.get('fecha') for d in self.resultados.values()],
+                'tipos': sorted({self.registro.get(exp, {}).get('tipo') for exp in self.experimentos} - {None})
+            }),
+            ('nomenclatura', 'Nomenclatura', 1, self.seccion_nomenclatura, {
+                exp: [{'nombre': m['nombre'], 'original': m.get('nombre_original', ''),
+                       'orden': m.get('orden', 0), 'tiempo': m.get('tiempo_min')} for m in _muestras(d)]
+                for exp, d in self.resultados.items()
+            }),
+            ('experimentos', 'Experimentos', 1, self.seccion_experimentos, self.experimentos)
+        ]
+        for exp in self.experimentos:
+            secciones.append((f'experimento_{exp}', self._titulo_experimento(exp), 2, self.seccion_experimento, {
+                'titulo': self._titulo_experimento(exp),
+                'resultado': self.resultados[exp],
+                'registro': self.registro.get(exp, {}),
+                'nivel_confianza': nivel_confianza,
+                'cinetica': {modelo: ajuste for modelo, ajuste in self.cinetica.get(exp, {}).items()
+                             if isinstance(ajuste, dict) and 'constantes' in ajuste},
+                'validacion': self.validacion.get(exp)
+            }))
+        secciones += [
+            ('metodologia', 'Metodología de Análisis', 1, self.seccion_metodologia, self.biblioteca.compuestos),
+            ('comparacion', 'Comparación entre Experimentos', 1, self.seccion_comparacion, {
+                'experimentos': estadisticas, 'diferencias': diferencias, 'recortadas': recortadas
+            }),
+            ('figuras', 'Figuras', 1, self.seccion_figuras, {'figuras': self._figuras()}),
+            ('conclusiones', 'Conclusiones', 1, self.seccion_conclusiones, {
+                'experimentos': estadisticas, 'diferencias': diferencias
+            })
+        ]
+
+        # Número de cada sección (las figuras se numeran dentro de la suya)
+        numeradas, n = [], 0
+        for clave, titulo, nivel, metodo, datos in secciones:
+            n += nivel == 1
+            if clave == 'figuras':
+                datos = {**datos, 'numero': n}
+            numeradas.append((clave, titulo, nivel, metodo, datos))
+        return numeradas
+
+    # ---- Escritura ----
+
+    def documento(self, secciones):
+        """Archivo principal: preámbulo, contenido (sin \\tableofcontents) e \\input de cada fragmento"""
+        figuras = Path(os.path.relpath(self.procesados_dir / 'figuras', self.destino)).as_posix() + '/'
+        contenido, n, m = [], 0, 0
+        for _, titulo, nivel, _, _ in secciones:
+            if nivel == 1:
+                n, m = n + 1, 0
+                contenido.append(f"\\item[{n}] {escapar(titulo)}")
+            elif nivel == 2:
+                m += 1
+                contenido.append(f"\\item[] \\quad {n}.{m} {escapar(titulo)}")
+
+        lotes = ', '.join(nombre_corto(exp) for exp in self.experimentos)
+        return '\n'.join([
+            PREAMBULO.replace('__FIGURAS__', figuras),
+            "\\title{Análisis de Cromatogramas de Biodiesel:\\\\",
+            "Producción por Transesterificación de Aceite Usado de Cocina}",
+            f"\\author{{{escapar(lotes if len(self.experimentos) <= 6 else f'{len(self.experimentos)} experimentos')}}}",
+            f"\\date{{{datetime.now().strftime('%d/%m/%Y')}}}",
+            '',
+            "\\begin{document}",
+            '',
+            "\\maketitle",
+            '',
+            *(f"\\input{{secciones/{clave}}}" for clave, _, nivel, _, _ in secciones if nivel is None),
+            '',
+            "\\section*{Contenido}",
+            "\\begin{description}",
+            *contenido,
+            "\\end{description}",
+            "\\newpage",
+            '',
+            *(f"\\input{{secciones/{clave}}}" for clave, _, nivel, _, _ in secciones if nivel is not None),
+            '',
+            "\\end{document}",
+            ''
+        ])
+
+    def escribir(self, forzar=False):
+        """Regenera los fragmentos cuyos datos cambiaron y el archivo principal; devuelve su ruta"""
+        self.secciones_dir.mkdir(parents=True, exist_ok=True)
+        secciones = self.secciones()
+
+        regeneradas = []
+        for clave, _, _, metodo, datos in secciones:
+            ruta = self.secciones_dir / f'{clave}.tex'
+            # El código de la sección forma parte de la huella: cambiar la plantilla regenera el fragmento
+            parametros = {'datos': datos, 'plantilla': inspect.getsource(metodo)}
+            if not forzar and self.manifiesto.vigente(clave, [], parametros):
+                continue
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(metodo(datos))
+            self.manifiesto.registrar(clave, [], parametros, derivados=[ruta])
+            regeneradas.append(clave)
+
+        # Fragmentos de experimentos que ya no forman parte del reporte
+        vigentes = {clave for clave, *_ in secciones}
+        for anterior in self.secciones_dir.glob('*.tex'):
+            if anterior.stem not in vigentes:
+                anterior.unlink()
+                self.manifiesto.datos['unidades'].pop(anterior.stem, None)
+        self.manifiesto.guardar()
+
+        ruta = self.destino / f'{self.nombre}.tex'
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write(self.documento(secciones))
+
+        print(f"✓ Reporte de {len(self.experimentos)} experimentos: {ruta}")
+        print(f"  {len(regeneradas)} de {len(secciones)} secciones regeneradas"
+              + (f" ({', '.join(regeneradas)})" if 0 < len(regeneradas) <= 10 else ''))
+        return ruta
+
+    def compilar(self, ruta):
+        """Una pasada de pdflatex en el directorio del reporte; devuelve la ruta del PDF o None"""
+        if shutil.which('pdflatex') is None:
+            print("  ! pdflatex no está disponible; se deja solo el .tex")
+            return None
+        proceso = subprocess.run(['pdflatex', '-interaction=nonstopmode', '-halt-on-error', ruta.name],
+                                 cwd=ruta.parent, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            print(f"  ! pdflatex falló; ver {ruta.with_suffix('.log')}")
+            return None
+        pdf = ruta.with_suffix('.pdf')
+        print(f"✓ PDF: {pdf}")
+        return pdf
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera el reporte LaTeX a partir de los resultados procesados')
+    parser.add_argument('--experimentos', nargs='+', default=None,
+                        help='Solo estos experimentos (p. ej. Experimento2 Experimento3)')
+    parser.add_argument('--desde', default=None, help='Solo experimentos desde esta fecha (AAAA-MM-DD)')
+    parser.add_argument('--nombre', default=None,
+                        help=f'Nombre del reporte (por defecto {NOMBRE_REPORTE}, con el lote si hay selección)')
+    parser.add_argument('--forzar', action='store_true', help='Regenerar todas las secciones')
+    parser.add_argument('--pdf', action='store_true', help='Compilar con pdflatex (una pasada)')
+    args = parser.parse_args()
+
+    nombre = args.nombre or NOMBRE_REPORTE
+    if args.nombre is None and args.experimentos:
+        nombre += '_' + '_'.join(nombre_corto(exp) for exp in args.experimentos[:3])
+        nombre += '_etc' if len(args.experimentos) > 3 else ''
+    if args.nombre is None and args.desde:
+        nombre += f'_desde_{args.desde}'
+
+    procesados_dir = Path('/home/user/ExperimentosBiodiesel_row/Procesados')
+    generador = GeneradorReporte(procesados_dir, experimentos=args.experimentos, desde=args.desde, nombre=nombre)
+    ruta = generador.escribir(forzar=args.forzar)
+    if args.pdf:
+        generador.compilar(ruta)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Integración de cromatogramas a partir de la señal cruda del detector
+Corrige la línea base, suaviza (Savitzky-Golay), detecta picos e integra
+(trapecios o Simpson) trazas (tiempo en min, señal en µV) y devuelve la tabla
+de picos con el mismo esquema que exporta el equipo (Index, Name, Time,
+Quantity, Height, Area, Area %), lista para ProcesadorCromatogramas
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_TABLA = ['Index', 'Name', 'Time', 'Quantity', 'Height', 'Area', 'Area %']
+METODOS_INTEGRACION = ('trapecio', 'simpson')
+
+# Factor que convierte la MAD en desviación estándar para ruido gaussiano
+FACTOR_MAD = 1.4826
+
+
+def coeficientes_savitzky_golay(ventana, orden):
+    """Coeficientes del filtro de suavizado Savitzky-Golay (ventana impar)"""
+    if ventana % 2 == 0 or ventana <= orden:
+        raise ValueError("La ventana debe ser impar y mayor que el orden del polinomio")
+
+    mitad = ventana // 2
+    x = np.arange(-mitad, mitad + 1, dtype=float)
+    vandermonde = np.vander(x, orden + 1, increasing=True)
+    # Fila 0 de la pseudoinversa: valor del polinomio ajustado en el centro
+    return np.linalg.pinv(vandermonde)[0]
+
+
+def integral_acumulada(tiempo, senal, metodo='trapecio'):
+    """Integral acumulada de la señal desde el primer punto hasta cada punto
+
+    El área entre los puntos i y j es acumulada[j] - acumulada[i], de modo que
+    se integran todos los picos con una resta vectorizada. Simpson usa la
+    fórmula para paso no uniforme sobre pares de intervalos; en índices impares
+    se completa con el trapecio del último intervalo.
+    """
+    h = np.diff(tiempo)
+    trapecios = 0.5 * (senal[1:] + senal[:-1]) * h
+    acumulada = np.concatenate(([0.0], np.cumsum(trapecios)))
+
+    if metodo == 'trapecio' or len(senal) < 3:
+        return acumulada
+    if metodo != 'simpson':
+        raise ValueError(f"Método de integración desconocido: {metodo}")
+
+    h1, h2 = h[0:-1:2], h[1::2]
+    y0, y1, y2 = senal[0:-2:2], senal[1:-1:2], senal[2::2]
+    pares = (h1 + h2) / 6.0 * ((2.0 - h2 / h1) * y0
+                               + (h1 + h2) ** 2 / (h1 * h2) * y1
+                               + (2.0 - h1 / h2) * y2)
+
+    simpson = np.empty_like(acumulada)
+    simpson[0::2] = np.concatenate(([0.0], np.cumsum(pares)))[:len(simpson[0::2])]
+    simpson[1::2] = simpson[0:-1:2][:len(simpson[1::2])] + trapecios[0::2][:len(simpson[1::2])]
+    return simpson
+
+
+class IntegradorSenal:
+    def __init__(self, ventana_suavizado=11, orden_suavizado=3, ventana_linea_base=0.5,
+                 relacion_senal_ruido=10.0, altura_minima=0.0, ancho_minimo=0.0,
+                 metodo='trapecio', decimales_tiempo=2):
+        """
+        Args:
+            ventana_suavizado: Puntos del filtro Savitzky-Golay (impar; 1 = sin suavizado)
+            orden_suavizado: Orden del polinomio del filtro
+            ventana_linea_base: Ancho (min) de los tramos donde se busca el mínimo de línea base
+            relacion_senal_ruido: Altura mínima de un pico en múltiplos del ruido
+            altura_minima: Altura mínima absoluta de un pico (µV)
+            ancho_minimo: Ancho mínimo de un pico (min)
+            metodo: 'trapecio' o 'simpson'
+            decimales_tiempo: Decimales del tiempo de retención reportado (el equipo usa 2)
+        """
+        if metodo not in METODOS_INTEGRACION:
+            raise ValueError(f"Método de integración desconocido: {metodo}")
+
+        self.ventana_suavizado = ventana_suavizado
+        self.orden_suavizado = orden_suavizado
+        self.ventana_linea_base = ventana_linea_base
+        self.relacion_senal_ruido = relacion_senal_ruido
+        self.altura_minima = altura_minima
+        self.ancho_minimo = ancho_minimo
+        self.metodo = metodo
+        self.decimales_tiempo = decimales_tiempo
+
+        self._coeficientes = None
+        if ventana_suavizado > 1:
+            self._coeficientes = coeficientes_savitzky_golay(ventana_suavizado, orden_suavizado)
+
+    def parametros(self):
+        """Parámetros que determinan la tabla de picos (para huellas de caché)"""
+        return {
+            'ventana_suavizado': self.ventana_suavizado,
+            'orden_suavizado': self.orden_suavizado,
+            'ventana_linea_base': self.ventana_linea_base,
+            'relacion_senal_ruido': self.relacion_senal_ruido,
+            'altura_minima': self.altura_minima,
+            'ancho_minimo': self.ancho_minimo,
+            'metodo': self.metodo,
+            'decimales_tiempo': self.decimales_tiempo
+        }
+
+    def suavizar(self, senal):
+        """Filtro Savitzky-Golay con los extremos reflejados"""
+        if self._coeficientes is None or len(senal) < self.ventana_suavizado:
+            return senal.astype(float)
+
+        mitad = self.ventana_suavizado // 2
+        extendida = np.pad(senal.astype(float), mitad, mode='reflect')
+        # El filtro es simétrico, así que la convolución equivale a la correlación
+        return np.convolve(extendida, self._coeficientes[::-1], mode='valid')
+
+    def linea_base(self, tiempo, senal):
+        """Línea base por interpolación lineal entre los mínimos de tramos consecutivos
+
+        Cada tramo cubre ventana_linea_base minutos; la línea base nunca queda
+        por encima de la señal.
+        """
+        n = len(senal)
+        paso = np.median(np.diff(tiempo))
+        puntos = max(int(round(self.ventana_linea_base / paso)), 2)
+        tramos = -(-n // puntos)
+
+        # Rellenar el último tramo con +inf para poder usar reshape
+        relleno = np.full(tramos * puntos, np.inf)
+        relleno[:n] = senal
+        minimos = np.argmin(relleno.reshape(tramos, puntos), axis=1) + np.arange(tramos) * puntos
+
+        base = np.interp(tiempo, tiempo[minimos], senal[minimos])
+        return np.minimum(base, senal)
+
+    @staticmethod
+    def ruido(senal):
+        """Desviación estándar del ruido estimada con la MAD de las diferencias"""
+        diferencias = np.diff(senal)
+        mad = np.median(np.abs(diferencias - np.median(diferencias)))
+        return FACTOR_MAD * mad / np.sqrt(2.0)
+
+    def detectar_picos(self, tiempo, senal, ruido=None):
+        """Ápices y límites (índices) de los picos sobre la señal corregida y suavizada
+
+        Los límites de cada pico son el valle más cercano a cada lado o, si
+        llega antes, el punto donde la señal vuelve al nivel del ruido. El
+        ruido debe estimarse sobre la señal sin suavizar; si no se da, se
+        estima sobre senal.
+        """
+        n = len(senal)
+        ruido = self.ruido(senal) if ruido is None else ruido
+        umbral = max(self.relacion_senal_ruido * ruido, self.altura_minima)
+        if n < 3:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+        pendiente = np.diff(senal)
+        apices = np.flatnonzero((pendiente[:-1] > 0) & (pendiente[1:] <= 0)) + 1
+        apices = apices[senal[apices] > umbral]
+
+        valles = np.flatnonzero((pendiente[:-1] < 0) & (pendiente[1:] >= 0)) + 1
+        valles = np.concatenate(([0], valles, [n - 1]))
+        posicion = np.searchsorted(valles, apices)
+        inicio = valles[posicion - 1]
+        fin = valles[posicion]
+
+        # Puntos al nivel del ruido; con centinelas para no salirse del trazo
+        bajos = np.concatenate(([0], np.flatnonzero(senal <= ruido), [n - 1]))
+        posicion = np.searchsorted(bajos, apices)
+        inicio = np.maximum(inicio, bajos[posicion - 1])
+        fin = np.minimum(fin, bajos[posicion])
+
+        prominencia = senal[apices] - np.maximum(senal[inicio], senal[fin])
+        validos = (prominencia >= umbral) & (tiempo[fin] - tiempo[inicio] >= self.ancho_minimo)
+        return apices[validos], inicio[validos], fin[validos]
+
+    def integrar(self, tiempo, senal):
+        """Tabla de picos de una traza con el esquema de la exportación del equipo"""
+        tiempo = np.asarray(tiempo, dtype=float)
+        senal = np.asarray(senal, dtype=float)
+
+        corregida = senal - self.linea_base(tiempo, self.suavizar(senal))
+        suavizada = self.suavizar(corregida)
+        apices, inicio, fin = self.detectar_picos(tiempo, suavizada, self.ruido(corregida))
+
+        # Ápice refinado con una parábola por los tres puntos centrales
+        izquierda = suavizada[np.maximum(apices - 1, 0)]
+        centro = suavizada[apices]
+        derecha = suavizada[np.minimum(apices + 1, len(suavizada) - 1)]
+        curvatura = izquierda - 2.0 * centro + derecha
+        desplazamiento = np.divide(0.5 * (izquierda - derecha), curvatura,
+                                   out=np.zeros_like(curvatura), where=curvatura != 0)
+        paso = np.gradient(tiempo)[apices] if len(tiempo) > 1 else np.zeros_like(centro)
+        tiempos = tiempo[apices] + np.clip(desplazamiento, -0.5, 0.5) * paso
+        alturas = centro - 0.25 * (izquierda - derecha) * desplazamiento
+
+        acumulada = integral_acumulada(tiempo, corregida, self.metodo)
+        areas = acumulada[fin] - acumulada[inicio]
+        total = areas.sum()
+        porcentajes = areas / total * 100 if total else np.zeros_like(areas)
+
+        return pd.DataFrame({
+            'Index': np.arange(1, len(apices) + 1),
+            'Name': 'UNKNOWN',
+            'Time': np.round(tiempos, self.decimales_tiempo),
+            'Quantity': np.round(porcentajes, 2),
+            'Height': np.round(alturas, 1),
+            'Area': np.round(areas, 1),
+            'Area %': np.round(porcentajes, 3)
+        }, columns=COLUMNAS_TABLA)
+
+
+def leer_traza(ruta):
+    """Lee una traza de dos columnas (tiempo en min, señal en µV) desde CSV"""
+    traza = pd.read_csv(ruta)
+    traza = traza.apply(pd.to_numeric, errors='coerce').dropna()
+    return traza.iloc[:, 0].to_numpy(dtype=float), traza.iloc[:, 1].to_numpy(dtype=float)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Integra trazas crudas del detector')
+    parser.add_argument('trazas', nargs='+', help='CSV con columnas tiempo (min) y señal (µV)')
+    parser.add_argument('--metodo', choices=METODOS_INTEGRACION, default='trapecio')
+    parser.add_argument('--ventana-suavizado', type=int, default=11)
+    parser.add_argument('--relacion-senal-ruido', type=float, default=10.0)
+    args = parser.parse_args()
+
+    integrador = IntegradorSenal(ventana_suavizado=args.ventana_suavizado,
+                                 relacion_senal_ruido=args.relacion_senal_ruido,
+                                 metodo=args.metodo)
+
+    for ruta in map(Path, args.trazas):
+        tabla = integrador.integrar(*leer_traza(ruta))
+        salida = ruta.with_name(f'{ruta.stem}_picos.csv')
+        tabla.to_csv(salida, index=False)
+        print(f"  ✓ {ruta.name}: {len(tabla)} picos -> {salida.name}")
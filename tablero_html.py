@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Tablero HTML estático de resultados
+Genera Procesados/tablero/index.html, que se abre directamente en el navegador
+(sin servidor): la tabla resumen, los indicadores y los gráficos por
+experimento van incrustados en la página; las tablas de picos de cada muestra
+y, si la muestra tiene reporte PDF, su traza reducida se guardan por
+experimento en bloques datos/bloque_NNNN.js (columnas Float32 en base64) que
+la página solo carga al abrir una muestra, así que el tiempo de carga no
+crece con el número de inyecciones archivadas
+"""
+
+import argparse
+import base64
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacen_picos import almacen_disponible, leer_picos
+from base_datos import NOMBRE_BASE_DATOS, BaseDatosResultados, picos_experimento
+from alineacion_tiempos import AlineadorTiempos
+from biblioteca_compuestos import BibliotecaCompuestos
+from pdf_cromatogramas import PYPDF_DISPONIBLE, LectorPDFCromatogramas
+from registro_experimentos import NOMBRE_REGISTRO, cargar_registro, nombre_muestra
+from visualizar_resultados import CONVERSION, PUREZA, colores_experimentos, nombre_corto
+
+# Columnas de picos de cada bloque, en este orden (compuesto = índice en la biblioteca, -1 sin identificar)
+COLUMNAS_PICOS = ['time', 'height', 'area', 'area_pct', 'compuesto']
+
+# Puntos máximos de cada traza en el bloque (pares mínimo/máximo por tramo)
+PUNTOS_TRAZA = 1500
+
+
+def codificar_float32(matriz):
+    """Matriz en base64 como Float32 little-endian (lo que lee Float32Array en el navegador)"""
+    return base64.b64encode(np.ascontiguousarray(matriz, dtype='<f4').tobytes()).decode('ascii')
+
+
+def reducir_traza(tiempo, senal, puntos=PUNTOS_TRAZA):
+    """Traza con a lo sumo puntos puntos: en cada tramo se conservan el mínimo
+    y el máximo de la señal, de modo que los picos estrechos no desaparecen"""
+    if len(tiempo) <= puntos:
+        return tiempo, senal
+    limites = np.linspace(0, len(tiempo), puntos // 2 + 1).astype(int)
+    tramo = np.searchsorted(limites, np.arange(len(tiempo)), side='right') - 1
+    orden = np.lexsort((senal, tramo))
+    indices = np.unique(np.concatenate((orden[limites[:-1]], orden[limites[1:] - 1])))
+    return tiempo[indices], senal[indices]
+
+
+def pdfs_muestras(base_dir, entrada):
+    """{muestra: ruta del reporte PDF} de una entrada del registro
+
+    Se usa el 'pdf' de la especificación o, para las muestras del libro, el
+    PDF junto al libro fuente cuyo nombre (sin el sufijo ' (fecha)') es la
+    hoja o el identificador de la muestra.
+    """
+    def clave(texto):
+        return re.sub(r'\s*\(.*\)$', '', str(texto)).replace(' ', '').lower()
+
+    disponibles = {}
+    if entrada.get('fuente'):
+        fuente_dir = (base_dir / entrada['fuente']).parent
+        if fuente_dir.is_dir():
+            disponibles = {clave(pdf.stem): pdf for pdf in sorted(fuente_dir.glob('*.pdf'))}
+
+    pdfs = {}
+    for espec in entrada['muestras']:
+        if 'archivo' not in espec:
+            continue
+        muestra = nombre_muestra(espec['archivo'])
+        if 'pdf' in espec:
+            pdfs[muestra] = base_dir / espec['pdf']
+            continue
+        for candidato in (espec.get('hoja'), muestra):
+            if candidato is not None and clave(candidato) in disponibles:
+                pdfs[muestra] = disponibles[clave(candidato)]
+                break
+    return {muestra: ruta for muestra, ruta in pdfs.items() if ruta.exists()}
+
+
+def tiempos_identificacion(picos, anclas):
+    """Tiempos con los que el procesador asignó cada pico
+
+    anclas es {muestra: anclas_tr} de resultados_procesados.json; las
+    muestras que el procesador alineó se corrigen con las mismas anclas y
+    el resto conserva el tiempo del equipo.
+    """
+    tiempos = picos['time'].to_numpy(dtype=float).copy()
+    if not anclas:
+        return tiempos
+
+    alineador = AlineadorTiempos()
+    muestras = picos['sample'].astype(str).to_numpy()
+    for muestra, observadas in anclas.items():
+        seleccion = muestras == muestra
+        if not observadas or not seleccion.any():
+            continue
+        observados = np.array([[np.nan if observadas.get(ref) is None else observadas[ref]
+                                for ref in alineador.referencias]], dtype=float)
+        tiempos[seleccion] = alineador.corregir(tiempos[seleccion][None, :], observados)[0]
+    return tiempos
+
+
+def bloque_experimento(picos, biblioteca, anclas=None, trazas=None):
+    """{muestra: {'n', 'datos', 'traza'}} con las columnas de COLUMNAS_PICOS una tras otra
+
+    Los picos de todas las muestras se identifican en una sola llamada, cada
+    pico como una inyección propia con el tiempo de referencia de la
+    biblioteca, sobre los tiempos alineados como en el procesamiento
+    (tiempos_identificacion); la columna time conserva el tiempo del equipo,
+    el mismo eje que la traza. trazas es {muestra: (tiempo, señal)}; cada
+    traza se guarda reducida como {'n', 'datos'} con tiempo y señal.
+    """
+    trazas = trazas or {}
+    bloque = {}
+    if not picos.empty:
+        picos = picos.sort_values(['sample', 'time'], kind='stable')
+        tiempos = tiempos_identificacion(picos, anclas)[:, None]
+        picos = picos.assign(compuesto=biblioteca.identificar_lote(tiempos, np.full(len(tiempos), np.nan))[:, 0])
+
+        for muestra, grupo in picos.groupby('sample', sort=False):
+            matriz = grupo[COLUMNAS_PICOS].to_numpy(dtype=float).T
+            bloque[str(muestra)] = {'n': len(grupo), 'datos': codificar_float32(matriz)}
+
+    for muestra, (tiempo, senal) in trazas.items():
+        tiempo, senal = reducir_traza(np.asarray(tiempo, dtype=float), np.asarray(senal, dtype=float))
+        entrada = bloque.setdefault(muestra, {'n': 0, 'datos': ''})
+        entrada['traza'] = {'n': len(tiempo), 'datos': codificar_float32(np.vstack((tiempo, senal)))}
+    return bloque
+
+
+def indicadores(tabla):
+    """Indicadores globales de la tabla resumen"""
+    mejor = tabla.loc[tabla[CONVERSION].idxmax()] if tabla[CONVERSION].notna().any() else None
+    return {
+        'experimentos': int(tabla['Experimento'].nunique()),
+        'muestras': int(len(tabla)),
+        'conversion_media': float(tabla[CONVERSION].mean()),
+        'pureza_media': float(tabla[PUREZA].mean()),
+        'conversion_max': None if mejor is None else float(mejor[CONVERSION]),
+        'muestra_max': None if mejor is None else f"{mejor['Muestra']} ({nombre_corto(mejor['Experimento'])})"
+    }
+
+
+def _filas(tabla):
+    """Filas de la tabla como listas JSON (NaN -> null)"""
+    return json.loads(tabla.to_json(orient='values', force_ascii=False))
+
+
+def anclas_experimento(exp_dir):
+    """{muestra: anclas_tr} de las muestras que el procesador alineó"""
+    ruta = Path(exp_dir) / 'resultados_procesados.json'
+    if not ruta.exists():
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        muestras = json.load(f).get('muestras', [])
+    return {str(m['nombre_original']): m['anclas_tr'] for m in muestras if m.get('anclas_tr')}
+
+
+def trazas_experimento(lector, pdfs):
+    """{muestra: (tiempo, señal)} de los PDFs que se pueden leer"""
+    trazas = {}
+    for muestra, ruta in pdfs.items():
+        try:
+            trazas[muestra] = lector.traza(ruta)
+        except Exception as e:
+            print(f"  ! Sin traza para {ruta.name}: {e}")
+    return trazas
+
+
+def escribir_tablero(procesados_dir, base_datos=None, destino=None, trazas=True):
+    """Escribe index.html y los bloques de picos; devuelve la ruta de index.html
+
+    Con trazas, las muestras con reporte PDF (según experimentos.json del
+    directorio base) llevan su traza en el bloque; requiere pypdf.
+    """
+    procesados_dir = Path(procesados_dir)
+    destino = Path(destino) if destino else procesados_dir / 'tablero'
+    datos_dir = destino / 'datos'
+    datos_dir.mkdir(parents=True, exist_ok=True)
+
+    if base_datos is not None and Path(base_datos).exists():
+        with BaseDatosResultados(base_datos) as base:
+            tabla = base.tabla_resumen()
+    else:
+        tabla = pd.read_csv(procesados_dir / 'tabla_resumen.csv')
+
+    experimentos = list(pd.unique(tabla['Experimento']))
+    colores = colores_experimentos(experimentos)
+    estadisticas = (tabla.groupby('Experimento', sort=False)[[CONVERSION, PUREZA]]
+                    .agg(['mean', 'std', 'count']).reindex(experimentos))
+
+    biblioteca = BibliotecaCompuestos()
+    almacen_dir = procesados_dir / 'picos'
+    usar_almacen = almacen_disponible(almacen_dir)
+
+    lector = None
+    entradas = {}
+    registro_file = procesados_dir.parent / NOMBRE_REGISTRO
+    if trazas and not PYPDF_DISPONIBLE:
+        print("  ! Se requiere pypdf para incluir las trazas; el tablero solo tendrá los picos")
+    elif trazas and registro_file.exists():
+        lector = LectorPDFCromatogramas(procesados_dir / '.cache_pdf')
+        entradas = {entrada['clave']: entrada for entrada in cargar_registro(registro_file)['experimentos']}
+
+    info_experimentos = []
+    escritos = set()
+    for i, experimento in enumerate(experimentos):
+        if usar_almacen:
+            picos = leer_picos(almacen_dir, experimento=experimento)
+        else:
+            picos = picos_experimento(procesados_dir / experimento)
+        muestras = tabla.loc[tabla['Experimento'] == experimento, 'Nombre_Original'].astype(str)
+        picos = picos[picos['sample'].astype(str).isin(set(muestras))]
+
+        trazas_exp = {}
+        if lector is not None and experimento in entradas:
+            pdfs = pdfs_muestras(procesados_dir.parent, entradas[experimento])
+            trazas_exp = trazas_experimento(lector, {m: r for m, r in pdfs.items() if m in set(muestras)})
+        bloque = bloque_experimento(picos, biblioteca, anclas=anclas_experimento(procesados_dir / experimento),
+                                    trazas=trazas_exp)
+
+        archivo = f'bloque_{i:04d}.js'
+        with open(datos_dir / archivo, 'w', encoding='utf-8') as f:
+            f.write(f"tablero.recibir({json.dumps(experimento)}, {json.dumps(bloque, separators=(',', ':'))});\n")
+        escritos.add(archivo)
+
+        fila = estadisticas.loc[experimento]
+        info_experimentos.append({
+            'clave': experimento,
+            'corto': nombre_corto(experimento),
+            'color': colores[experimento],
+            'bloque': archivo,
+            'muestras': int(fila[(CONVERSION, 'count')]),
+            'conversion_media': fila[(CONVERSION, 'mean')],
+            'conversion_std': fila[(CONVERSION, 'std')],
+            'pureza_media': fila[(PUREZA, 'mean')]
+        })
+
+    # Bloques de experimentos que ya no están en la tabla
+    for anterior in datos_dir.glob('bloque_*.js'):
+        if anterior.name not in escritos:
+            anterior.unlink()
+
+    datos = {
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'columnas': list(tabla.columns),
+        'filas': _filas(tabla),
+        'indicadores': indicadores(tabla),
+        'experimentos': json.loads(pd.DataFrame(info_experimentos).to_json(orient='records', force_ascii=False)),
+        'columnas_picos': COLUMNAS_PICOS,
+        'compuestos': [{'abreviatura': c.get('abreviatura', c['nombre']), 'clase': c['clase']}
+                       for c in biblioteca.compuestos]
+    }
+    # '</' cerraría el <script> que contiene los datos
+    contenido = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+    ruta = destino / 'index.html'
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(PLANTILLA.replace('__DATOS__', contenido))
+
+    print(f"✓ Tablero con {len(tabla)} muestras de {len(experimentos)} experimentos: {ruta}")
+    return ruta
+
+
+PLANTILLA = r"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>Resultados de cromatogramas - Biodiesel</title>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 0; background: #f4f5f7; color: #222; }
+  header { background: #2E86AB; color: white; padding: 12px 24px; }
+  header small { opacity: 0.8; }
+  main { padding: 16px 24px; }
+  .tarjetas { display: flex; flex-wrap: wrap; gap: 12px; margin-bottom: 16px; }
+  .tarjeta { background: white; border-radius: 6px; padding: 10px 16px; min-width: 150px; box-shadow: 0 1px 3px #0002; }
+  .tarjeta b { display: block; font-size: 1.5em; }
+  .graficos { display: grid; grid-template-columns: 1fr 1fr; gap: 12px; }
+  .panel { background: white; border-radius: 6px; padding: 10px; box-shadow: 0 1px 3px #0002; margin-bottom: 12px; }
+  .desplazable { overflow-x: auto; }
+  canvas { display: block; }
+  table { border-collapse: collapse; font-size: 0.85em; width: 100%; }
+  th, td { padding: 3px 6px; border-bottom: 1px solid #ddd; text-align: right; white-space: nowrap; }
+  th { cursor: pointer; background: #eef; position: sticky; top: 0; }
+  td:nth-child(-n+4), th:nth-child(-n+4) { text-align: left; }
+  tbody tr:hover { background: #fff6d5; cursor: pointer; }
+  tr.seleccionada { background: #ffe9a8; }
+  .controles { display: flex; gap: 8px; align-items: center; margin-bottom: 8px; }
+  #detalle { display: none; }
+  .muestra-picos { max-height: 320px; overflow-y: auto; }
+</style>
+</head>
+<body>
+<header><h2 style="margin:0">Análisis de cromatogramas - Biodiesel</h2><small id="generado"></small></header>
+<main>
+  <div class="tarjetas" id="tarjetas"></div>
+  <div class="graficos">
+    <div class="panel"><h4>Conversión FAMEs promedio por experimento (± std)</h4>
+      <div class="desplazable"><canvas id="grafico-conversion" height="280"></canvas></div></div>
+    <div class="panel"><h4>Conversión vs pureza</h4><canvas id="grafico-dispersion" height="280"></canvas></div>
+  </div>
+  <div class="panel" id="detalle">
+    <h4 id="detalle-titulo"></h4>
+    <canvas id="grafico-picos" height="260"></canvas>
+    <canvas id="grafico-traza" height="200"></canvas>
+    <div class="muestra-picos"><table id="tabla-picos"></table></div>
+  </div>
+  <div class="panel">
+    <div class="controles">
+      <select id="filtro-experimento"><option value="">Todos los experimentos</option></select>
+      <input id="filtro-texto" placeholder="Buscar muestra...">
+      <button id="anterior">&lt;</button><span id="pagina"></span><button id="siguiente">&gt;</button>
+    </div>
+    <div class="desplazable"><table id="tabla"></table></div>
+  </div>
+</main>
+<script>
+const DATOS = __DATOS__;
+const FILAS_POR_PAGINA = 50;
+const COLORES_CLASE = { fame: '#2ecc71', estandar_interno: '#3498db', disolvente: '#95a5a6',
+  monogliceridos: '#e74c3c', digliceridos: '#f39c12', trigliceridos: '#9b59b6' };
+const col = nombre => DATOS.columnas.indexOf(nombre);
+const EXP = Object.fromEntries(DATOS.experimentos.map(e => [e.clave, e]));
+const fmt = (v, d = 2) => v === null || v === undefined || Number.isNaN(v) ? '' :
+  (typeof v === 'number' ? v.toLocaleString('es', { maximumFractionDigits: d }) : v);
+
+// Bloques de picos: un <script> por experimento que se inserta al abrir una de sus muestras
+const tablero = {
+  bloques: {}, pendientes: {},
+  recibir(experimento, bloque) {
+    this.bloques[experimento] = bloque;
+    (this.pendientes[experimento] || []).forEach(f => f(bloque));
+    delete this.pendientes[experimento];
+  },
+  cargar(experimento, listo) {
+    if (this.bloques[experimento]) return listo(this.bloques[experimento]);
+    if (!this.pendientes[experimento]) {
+      this.pendientes[experimento] = [];
+      const script = document.createElement('script');
+      script.src = 'datos/' + EXP[experimento].bloque;
+      document.head.appendChild(script);
+    }
+    this.pendientes[experimento].push(listo);
+  }
+};
+
+function decodificar(entrada, columnas) {
+  const bytes = Uint8Array.from(atob(entrada.datos), c => c.charCodeAt(0));
+  const valores = new Float32Array(bytes.buffer);
+  return Object.fromEntries(columnas.map((c, i) => [c, valores.subarray(i * entrada.n, (i + 1) * entrada.n)]));
+}
+
+// Ejes de un canvas: devuelve las escalas x(v), y(v) ya dibujados marco y marcas
+function ejes(canvas, xmin, xmax, ymin, ymax, { etiquetasX = null, log = false } = {}) {
+  const ctx = canvas.getContext('2d');
+  const m = { izq: 55, der: 10, arr: 10, aba: etiquetasX ? 60 : 30 };
+  const w = canvas.width - m.izq - m.der, h = canvas.height - m.arr - m.aba;
+  const t = v => log ? Math.log10(Math.max(v, 1)) : v;
+  const y0 = t(ymin), y1 = t(ymax) === y0 ? y0 + 1 : t(ymax), x1 = xmax === xmin ? xmin + 1 : xmax;
+  const x = v => m.izq + (v - xmin) / (x1 - xmin) * w;
+  const y = v => m.arr + h - (t(v) - y0) / (y1 - y0) * h;
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  ctx.strokeStyle = '#999'; ctx.fillStyle = '#444'; ctx.font = '11px sans-serif';
+  ctx.strokeRect(m.izq, m.arr, w, h);
+  for (let i = 0; i <= 4; i++) {
+    const v = y0 + (y1 - y0) * i / 4, py = m.arr + h - h * i / 4;
+    ctx.fillText(log ? '1e' + v.toFixed(1) : fmt(v, 1), 4, py + 4);
+  }
+  if (etiquetasX) {
+    etiquetasX.forEach(([v, texto]) => {
+      ctx.save(); ctx.translate(x(v), m.arr + h + 8); ctx.rotate(-Math.PI / 4);
+      ctx.textAlign = 'right'; ctx.fillText(texto, 0, 0); ctx.restore();
+    });
+  } else {
+    for (let i = 0; i <= 5; i++) ctx.fillText(fmt(xmin + (x1 - xmin) * i / 5, 1), x(xmin + (x1 - xmin) * i / 5) - 10, m.arr + h + 15);
+  }
+  return { ctx, x, y, base: m.arr + h };
+}
+
+function graficoConversion() {
+  const canvas = document.getElementById('grafico-conversion');
+  const exps = DATOS.experimentos;
+  canvas.width = Math.max(canvas.parentElement.clientWidth - 4, exps.length * 22 + 70);
+  const techo = Math.max(1, ...exps.map(e => (e.conversion_media || 0) + (e.conversion_std || 0)));
+  const { ctx, x, y, base } = ejes(canvas, -0.5, exps.length - 0.5, 0, techo * 1.05,
+    { etiquetasX: exps.map((e, i) => [i, e.corto]) });
+  const ancho = (x(1) - x(0)) * 0.7;
+  exps.forEach((e, i) => {
+    ctx.fillStyle = e.color;
+    ctx.fillRect(x(i) - ancho / 2, y(e.conversion_media || 0), ancho, base - y(e.conversion_media || 0));
+    if (e.conversion_std) {
+      ctx.strokeStyle = '#000'; ctx.beginPath();
+      ctx.moveTo(x(i), y(e.conversion_media - e.conversion_std)); ctx.lineTo(x(i), y(e.conversion_media + e.conversion_std));
+      ctx.stroke();
+    }
+  });
+}
+
+function graficoDispersion() {
+  const canvas = document.getElementById('grafico-dispersion');
+  canvas.width = canvas.parentElement.clientWidth - 20;
+  const ic = col('Conversión FAMEs (%)'), ip = col('Pureza (%)'), ie = col('Experimento');
+  const filas = DATOS.filas.filter(f => f[ic] !== null && f[ip] !== null);
+  const xs = filas.map(f => f[ic]), ys = filas.map(f => f[ip]);
+  const { ctx, x, y } = ejes(canvas, Math.min(...xs, 0), Math.max(...xs, 1), Math.min(...ys, 0), Math.max(...ys, 1));
+  const radio = filas.length > 500 ? 2 : 4;
+  filas.forEach(f => {
+    ctx.fillStyle = EXP[f[ie]].color; ctx.globalAlpha = 0.7;
+    ctx.beginPath(); ctx.arc(x(f[ic]), y(f[ip]), radio, 0, 2 * Math.PI); ctx.fill();
+  });
+  ctx.globalAlpha = 1;
+}
+
+function mostrarMuestra(fila) {
+  const experimento = fila[col('Experimento')], nombre = String(fila[col('Nombre_Original')]);
+  const detalle = document.getElementById('detalle');
+  detalle.style.display = 'block';
+  document.getElementById('detalle-titulo').textContent = `${fila[col('Muestra')]} (${experimento}, ${nombre}) - cargando picos...`;
+  tablero.cargar(experimento, bloque => {
+    if (!bloque[nombre]) {
+      document.getElementById('detalle-titulo').textContent = `${fila[col('Muestra')]}: sin tabla de picos`;
+      return;
+    }
+    const picos = decodificar(bloque[nombre], DATOS.columnas_picos);
+    const traza = bloque[nombre].traza ? decodificar(bloque[nombre].traza, ['time', 'signal']) : null;
+    document.getElementById('detalle-titulo').textContent =
+      `${fila[col('Muestra')]} (${experimento}, ${nombre}) - ${bloque[nombre].n} picos` + (traza ? ' · traza del PDF' : '');
+    const tmax = Math.max(...picos.time, ...(traza ? traza.time : []), 1) * 1.02;
+    const canvas = document.getElementById('grafico-picos');
+    canvas.width = detalle.clientWidth - 20;
+    const { ctx, x, y, base } = ejes(canvas, 0, tmax, 1, Math.max(...picos.height, 10), { log: true });
+    picos.time.forEach((t, i) => {
+      const compuesto = DATOS.compuestos[picos.compuesto[i]];
+      ctx.strokeStyle = compuesto ? COLORES_CLASE[compuesto.clase] || '#555' : '#bbb';
+      ctx.lineWidth = 2; ctx.beginPath(); ctx.moveTo(x(t), base); ctx.lineTo(x(t), y(picos.height[i])); ctx.stroke();
+    });
+    // Traza del detector (del reporte PDF) bajo las barras, en escala lineal y el mismo eje de tiempo
+    const lienzoTraza = document.getElementById('grafico-traza');
+    lienzoTraza.style.display = traza ? 'block' : 'none';
+    if (traza) {
+      lienzoTraza.width = canvas.width;
+      const e = ejes(lienzoTraza, 0, tmax, Math.min(...traza.signal, 0), Math.max(...traza.signal, 1));
+      e.ctx.strokeStyle = '#2E86AB'; e.ctx.lineWidth = 1; e.ctx.beginPath();
+      traza.time.forEach((t, i) => i ? e.ctx.lineTo(e.x(t), e.y(traza.signal[i])) : e.ctx.moveTo(e.x(t), e.y(traza.signal[i])));
+      e.ctx.stroke();
+    }
+    const filas = Array.from(picos.time, (t, i) => {
+      const compuesto = DATOS.compuestos[picos.compuesto[i]];
+      return `<tr><td>${i + 1}</td><td>${compuesto ? compuesto.abreviatura : ''}</td><td>${fmt(t, 3)}</td>` +
+        `<td>${fmt(picos.height[i], 1)}</td><td>${fmt(picos.area[i], 1)}</td><td>${fmt(picos.area_pct[i], 3)}</td></tr>`;
+    });
+    document.getElementById('tabla-picos').innerHTML =
+      '<thead><tr><th>#</th><th>Compuesto</th><th>Tiempo (min)</th><th>Altura (µV)</th><th>Área (µV·min)</th><th>Área %</th></tr></thead>' +
+      '<tbody>' + filas.join('') + '</tbody>';
+  });
+}
+
+// Tabla resumen paginada, con filtro y orden por columna
+const estado = { pagina: 0, orden: null, descendente: false, filas: DATOS.filas };
+function filtrar() {
+  const exp = document.getElementById('filtro-experimento').value;
+  const texto = document.getElementById('filtro-texto').value.toLowerCase();
+  const ie = col('Experimento'), im = col('Muestra'), io = col('Nombre_Original');
+  estado.filas = DATOS.filas.filter(f => (!exp || f[ie] === exp) &&
+    (!texto || String(f[im]).toLowerCase().includes(texto) || String(f[io]).toLowerCase().includes(texto)));
+  if (estado.orden !== null) {
+    const signo = estado.descendente ? -1 : 1;
+    estado.filas = estado.filas.slice().sort((a, b) =>
+      (a[estado.orden] === null) - (b[estado.orden] === null) ||
+      signo * (a[estado.orden] < b[estado.orden] ? -1 : a[estado.orden] > b[estado.orden] ? 1 : 0));
+  }
+  estado.pagina = 0;
+  dibujarTabla();
+}
+function dibujarTabla() {
+  const paginas = Math.max(1, Math.ceil(estado.filas.length / FILAS_POR_PAGINA));
+  estado.pagina = Math.min(Math.max(estado.pagina, 0), paginas - 1);
+  const visibles = estado.filas.slice(estado.pagina * FILAS_POR_PAGINA, (estado.pagina + 1) * FILAS_POR_PAGINA);
+  const tabla = document.getElementById('tabla');
+  tabla.innerHTML = '<thead><tr>' + DATOS.columnas.map((c, i) =>
+    `<th data-i="${i}">${c}${estado.orden === i ? (estado.descendente ? ' ▼' : ' ▲') : ''}</th>`).join('') + '</tr></thead>' +
+    '<tbody>' + visibles.map((f, i) => `<tr data-i="${i}">` + f.map(v => `<td>${fmt(v)}</td>`).join('') + '</tr>').join('') + '</tbody>';
+  tabla.querySelectorAll('th').forEach(th => th.onclick = () => {
+    const i = Number(th.dataset.i);
+    estado.descendente = estado.orden === i && !estado.descendente;
+    estado.orden = i;
+    filtrar();
+  });
+  tabla.querySelectorAll('tbody tr').forEach(tr => tr.onclick = () => {
+    tabla.querySelectorAll('tr.seleccionada').forEach(t => t.classList.remove('seleccionada'));
+    tr.classList.add('seleccionada');
+    mostrarMuestra(visibles[Number(tr.dataset.i)]);
+  });
+  document.getElementById('pagina').textContent = `Página ${estado.pagina + 1} de ${paginas} (${estado.filas.length} muestras)`;
+}
+
+const ind = DATOS.indicadores;
+document.getElementById('generado').textContent = 'Generado: ' + DATOS.generado;
+document.getElementById('tarjetas').innerHTML = [
+  ['Experimentos', ind.experimentos], ['Muestras', ind.muestras],
+  ['Conversión media', fmt(ind.conversion_media) + ' %'], ['Pureza media', fmt(ind.pureza_media) + ' %'],
+  ['Conversión máxima', ind.conversion_max === null ? '' : fmt(ind.conversion_max) + ' % · ' + ind.muestra_max]
+].map(([titulo, valor]) => `<div class="tarjeta">${titulo}<b>${valor}</b></div>`).join('');
+const selector = document.getElementById('filtro-experimento');
+DATOS.experimentos.forEach(e => selector.add(new Option(`${e.corto} (${e.muestras} muestras)`, e.clave)));
+selector.onchange = filtrar;
+document.getElementById('filtro-texto').oninput = filtrar;
+document.getElementById('anterior').onclick = () => { estado.pagina--; dibujarTabla(); };
+document.getElementById('siguiente').onclick = () => { estado.pagina++; dibujarTabla(); };
+graficoConversion();
+graficoDispersion();
+dibujarTabla();
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera el tablero HTML estático de resultados')
+    parser.add_argument('--base-datos', action='store_true',
+                        help=f'Leer la tabla de resultados de Procesados/{NOMBRE_BASE_DATOS}')
+    parser.add_argument('--sin-trazas', action='store_true',
+                        help='No incluir las trazas de los reportes PDF (no requiere pypdf)')
+    args = parser.parse_args()
+
+    procesados_dir = Path('/home/user/ExperimentosBiodiesel_row/Procesados')
+    escribir_tablero(procesados_dir, base_datos=procesados_dir / NOMBRE_BASE_DATOS if args.base_datos else None,
+                     trazas=not args.sin_trazas)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Validación cruzada de las métricas del procesamiento contra la hoja del laboratorio
+Compara, para cada muestra de resultados_consolidados.json, el '% FAMEs'
+calculado por el analista (calculos_hoja.json) con el contenido de ésteres
+EN 14103 y la conversión por áreas del procesamiento; aplica tolerancias por
+lote, marca atípicos con un z robusto (mediana/MAD) y escribe un reporte de
+diferencias. Todo se calcula por columnas sobre la tabla consolidada
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from calculos_hoja import cargar_calculos, calculos_muestra
+from registro_experimentos import NOMBRE_REGISTRO, cargar_registro
+
+# La celda '% FAMEs' de la hoja guarda una fracción (0.089 = 8.9 %)
+FACTOR_HOJA = 100.0
+
+# Constante que hace comparable la MAD con la desviación estándar (z = 0.6745 (x - mediana) / MAD)
+CONSTANTE_Z_ROBUSTO = 0.6745
+
+TOLERANCIAS_PREDETERMINADAS = {
+    'tolerancia_abs': 2.0,   # puntos porcentuales
+    'tolerancia_rel': 0.05,  # fracción del valor de la hoja
+    'umbral_z': 3.5
+}
+
+COLUMNAS_VALIDACION = ['Experimento', 'Muestra', 'Nombre_Original', 'fames_hoja_pct', 'contenido_esteres_pct',
+                       'conversion_fames_pct', 'area_fames_hoja', 'area_esteres', 'area_si_hoja',
+                       'area_estandar_interno']
+
+
+def tolerancias_registro(registro):
+    """Tolerancias por lote declaradas en experimentos.json ({'validacion': {...}} en cada entrada)"""
+    return {entrada['clave']: entrada['validacion']
+            for entrada in registro.get('experimentos', []) if entrada.get('validacion')}
+
+
+def tabla_validacion(procesados_dir, resultados):
+    """Una fila por muestra con los valores de la hoja y del procesamiento
+    (tabla vacía con las mismas columnas si no hay resultados)"""
+    procesados_dir = Path(procesados_dir)
+    filas = []
+
+    for experimento, datos in resultados.items():
+        calculos = cargar_calculos(procesados_dir / experimento)
+        for muestra in datos['muestras']:
+            registro = calculos_muestra(calculos, muestra.get('nombre_original', muestra['nombre']))
+            filas.append({
+                'Experimento': experimento,
+                'Muestra': muestra['nombre'],
+                'Nombre_Original': muestra.get('nombre_original', muestra['nombre']),
+                'fames_hoja_pct': registro['fraccion_fames'],
+                # Se valida el valor calculado aunque no se publique por no plausible
+                'contenido_esteres_pct': muestra.get('contenido_esteres_calculado_pct',
+                                                     muestra.get('contenido_esteres_pct')),
+                'conversion_fames_pct': muestra['conversion_fames_pct'],
+                'area_fames_hoja': registro['area_fames'],
+                'area_esteres': muestra.get('area_esteres'),
+                'area_si_hoja': registro['area_si'],
+                'area_estandar_interno': muestra.get('area_estandar_interno')
+            })
+
+    tabla = pd.DataFrame(filas, columns=COLUMNAS_VALIDACION)
+    numericas = [c for c in tabla.columns if c not in ('Experimento', 'Muestra', 'Nombre_Original')]
+    tabla[numericas] = tabla[numericas].apply(pd.to_numeric, errors='coerce')
+    tabla['fames_hoja_pct'] *= FACTOR_HOJA
+    return tabla
+
+
+def z_robusto(valores, grupos):
+    """z robusto de cada valor dentro de su grupo; 0 si la MAD del grupo es cero"""
+    serie = pd.Series(valores)
+    mediana = serie.groupby(grupos).transform('median')
+    mad = (serie - mediana).abs().groupby(grupos).transform('median')
+    z = CONSTANTE_Z_ROBUSTO * (serie - mediana) / mad.where(mad > 0)
+    return z.fillna(0.0).where(serie.notna())
+
+
+def validar(tabla, tolerancias=None, predeterminadas=None):
+    """Añade diferencias, tolerancias y atípicos a la tabla de validación
+
+    tolerancias es {experimento: {'tolerancia_abs', 'tolerancia_rel', 'umbral_z'}};
+    los lotes sin entrada usan predeterminadas (por defecto
+    TOLERANCIAS_PREDETERMINADAS). Una muestra pasa si |contenido - hoja| <=
+    max(tolerancia_abs, tolerancia_rel × hoja), no es atípica y no tiene
+    discrepancia de escala con la conversión.
+    """
+    tabla = tabla.copy()
+    tolerancias = tolerancias or {}
+    predeterminadas = {**TOLERANCIAS_PREDETERMINADAS, **(predeterminadas or {})}
+    for campo, defecto in predeterminadas.items():
+        tabla[campo] = tabla['Experimento'].map(
+            lambda exp: tolerancias.get(exp, {}).get(campo, defecto)).astype(float)
+
+    hoja = tabla['fames_hoja_pct']
+    tabla['diferencia_pct'] = tabla['contenido_esteres_pct'] - hoja
+    tabla['diferencia_rel'] = tabla['diferencia_pct'] / hoja.where(hoja != 0)
+    tabla['diferencia_area_rel'] = ((tabla['area_esteres'] - tabla['area_fames_hoja'])
+                                    / tabla['area_fames_hoja'].where(tabla['area_fames_hoja'] != 0))
+
+    # La conversión por áreas y el % de la hoja no miden lo mismo; se señala
+    # cuando difieren en más de un orden de magnitud
+    cociente = tabla['conversion_fames_pct'] / hoja.where(hoja > 0)
+    tabla['discrepancia_escala'] = (np.abs(np.log10(cociente)) > 1).fillna(False)
+
+    limite = np.maximum(tabla['tolerancia_abs'], tabla['tolerancia_rel'] * hoja.abs())
+    tabla['dentro_tolerancia'] = tabla['diferencia_pct'].abs() <= limite
+
+    tabla['z_robusto'] = z_robusto(tabla['diferencia_pct'].to_numpy(), tabla['Experimento'].to_numpy())
+    tabla['atipico'] = (tabla['z_robusto'].abs() > tabla['umbral_z']).fillna(False)
+
+    comparable = hoja.notna() & tabla['contenido_esteres_pct'].notna()
+    tabla['estado'] = np.select(
+        [hoja.isna(), ~comparable,
+         tabla['dentro_tolerancia'] & ~tabla['atipico'] & ~tabla['discrepancia_escala']],
+        ['sin_dato_hoja', 'sin_cuantificar', 'ok'],
+        default='revisar')
+    return tabla
+
+
+def resumen_validacion(tabla):
+    """Conteo de estados y métricas de diferencia por experimento"""
+    resumen = {}
+    for experimento, grupo in tabla.groupby('Experimento', sort=False):
+        comparables = grupo[grupo['estado'].isin(['ok', 'revisar'])]
+        resumen[experimento] = {
+            'muestras': int(len(grupo)),
+            'estados': {estado: int(n) for estado, n in grupo['estado'].value_counts().items()},
+            'diferencia_media_pct': float(comparables['diferencia_pct'].mean()) if len(comparables) else None,
+            'diferencia_max_pct': float(comparables['diferencia_pct'].abs().max()) if len(comparables) else None,
+            'discrepancias_escala': int(grupo['discrepancia_escala'].sum())
+        }
+    return resumen
+
+
+def generar_reporte(procesados_dir, resultados=None, tolerancias=None, predeterminadas=None):
+    """Valida los resultados consolidados y escribe validacion_hoja.csv y .json
+
+    Si no se dan tolerancias se leen del registro de experimentos junto a
+    Procesados/; predeterminadas sustituye a TOLERANCIAS_PREDETERMINADAS
+    para los lotes sin entrada. Devuelve la tabla validada.
+    """
+    predeterminadas = {**TOLERANCIAS_PREDETERMINADAS, **(predeterminadas or {})}
+    procesados_dir = Path(procesados_dir)
+    if tolerancias is None:
+        registro_file = procesados_dir.parent / NOMBRE_REGISTRO
+        tolerancias = tolerancias_registro(cargar_registro(registro_file)) if registro_file.exists() else {}
+    if resultados is None:
+        with open(procesados_dir / 'resultados_consolidados.json', 'r', encoding='utf-8') as f:
+            resultados = json.load(f)
+
+    tabla = validar(tabla_validacion(procesados_dir, resultados), tolerancias, predeterminadas)
+    tabla.to_csv(procesados_dir / 'validacion_hoja.csv', index=False)
+
+    with open(procesados_dir / 'validacion_hoja.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'tolerancias_predeterminadas': predeterminadas,
+            'tolerancias': tolerancias or {},
+            'experimentos': resumen_validacion(tabla)
+        }, f, indent=2, ensure_ascii=False)
+
+    revisar = tabla[tabla['estado'] == 'revisar']
+    print(f"\n✓ Validación contra la hoja: {int((tabla['estado'] == 'ok').sum())} ok, "
+          f"{len(revisar)} por revisar, {int((tabla['estado'] == 'sin_dato_hoja').sum())} sin dato en la hoja")
+    for _, fila in revisar.iterrows():
+        print(f"  ! {fila['Experimento']} {fila['Muestra']}: hoja {fila['fames_hoja_pct']:.2f}% "
+              f"vs EN 14103 {fila['contenido_esteres_pct']:.2f}% (z={fila['z_robusto']:.1f})"
+              + (f"; conversión por áreas {fila['conversion_fames_pct']:.2f}% en otra escala"
+                 if fila['discrepancia_escala'] else ''))
+
+    return tabla
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara las métricas procesadas con los cálculos de la hoja')
+    parser.add_argument('--tolerancia-abs', type=float, default=TOLERANCIAS_PREDETERMINADAS['tolerancia_abs'])
+    parser.add_argument('--tolerancia-rel', type=float, default=TOLERANCIAS_PREDETERMINADAS['tolerancia_rel'])
+    parser.add_argument('--umbral-z', type=float, default=TOLERANCIAS_PREDETERMINADAS['umbral_z'])
+    parser.add_argument('--estricto', action='store_true',
+                        help='Salir con código 1 si alguna muestra queda por revisar')
+    args = parser.parse_args()
+
+    predeterminadas = {'tolerancia_abs': args.tolerancia_abs,
+                       'tolerancia_rel': args.tolerancia_rel,
+                       'umbral_z': args.umbral_z}
+
+    procesados_dir = '/home/user/ExperimentosBiodiesel_row/Procesados'
+    tabla = generar_reporte(procesados_dir, predeterminadas=predeterminadas)
+    if args.estricto and (tabla['estado'] == 'revisar').any():
+        sys.exit(1)
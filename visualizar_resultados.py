@@ -10,76 +10,318 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import inspect
 import json
+import re
+
+from matplotlib.colors import to_hex
+
+from base_datos import NOMBRE_BASE_DATOS, BaseDatosResultados
+from manifiesto import ManifiestoProcesamiento
 
 # Configuración de estilo
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
+ESTILO = 'seaborn-v0_8-darkgrid'
+PALETA = 'husl'
+plt.style.use(ESTILO)
+sns.set_palette(PALETA)
 plt.rcParams['figure.figsize'] = (12, 8)
 plt.rcParams['font.size'] = 10
 
+CONVERSION = 'Conversión FAMEs (%)'
+PUREZA = 'Pureza (%)'
+GLICERIDOS = ['Monoglicéridos (%)', 'Diglicéridos (%)', 'Triglicéridos (%)']
+COMPOSICION = [PUREZA, *GLICERIDOS]
+COLORES_COMPOSICION = ['#2ecc71', '#e74c3c', '#f39c12', '#9b59b6']
+
+# Experimento de la figura de evolución temporal (el primero de la tabla si no está)
+EXPERIMENTO_REFERENCIA = 'Experimento1'
+# Valor de 'experimentos' en FIGURAS para las figuras del experimento de referencia
+REFERENCIA = 'referencia'
+
+# Límites de legibilidad: con más muestras las figuras por muestra pasan a
+# promedios por experimento; los experimentos se reparten en paneles
+# (small multiples) y los paneles en páginas fig*_p2.png, fig*_p3.png, ...
+MAX_MUESTRAS = 60
+MAX_EXPERIMENTOS_PANEL = 30
+PANELES_POR_PAGINA = 4
+MAX_LEYENDA = 12
+MAX_ETIQUETAS = 60
+MAX_VALORES_BARRAS = 20
+
+# Figura -> método del visualizador, archivo, descripción y datos de los que
+# depende: filas de 'experimentos' (None = toda la tabla, REFERENCIA = el de
+# experimento_referencia) y 'columnas' de la tabla resumen. Solo ese recorte
+# entra en la huella de la caché de figuras
+FIGURAS = {
+    'fig1': {'metodo': 'graficar_evolucion_temporal_exp1', 'archivo': 'fig1_evolucion_temporal_exp1.png',
+             'descripcion': 'Evolución temporal Exp1', 'experimentos': REFERENCIA,
+             'columnas': ['Muestra', 'Orden', 'Tiempo (min)', CONVERSION, PUREZA, 'Triglicéridos (%)']},
+    'fig2': {'metodo': 'graficar_comparacion_experimentos', 'archivo': 'fig2_comparacion_experimentos.png',
+             'descripcion': 'Comparación entre experimentos', 'experimentos': None,
+             'columnas': ['Muestra', 'Orden', CONVERSION]},
+    'fig3': {'metodo': 'graficar_composicion_apilada', 'archivo': 'fig3_composicion_apilada.png',
+             'descripcion': 'Composición de muestras', 'experimentos': None,
+             'columnas': ['Muestra', 'Orden', *COMPOSICION]},
+    'fig4': {'metodo': 'graficar_comparacion_temporal_experimentos', 'archivo': 'fig4_comparacion_temporal.png',
+             'descripcion': 'Comparación temporal promedio', 'experimentos': None,
+             'columnas': [CONVERSION, PUREZA]},
+    'fig5': {'metodo': 'graficar_estadisticas_boxplot', 'archivo': 'fig5_estadisticas_boxplot.png',
+             'descripcion': 'Distribuciones estadísticas', 'experimentos': None,
+             'columnas': [CONVERSION, PUREZA]},
+    'fig6': {'metodo': 'graficar_scatter_conversion_pureza', 'archivo': 'fig6_scatter_conversion_pureza.png',
+             'descripcion': 'Relación conversión-pureza', 'experimentos': None,
+             'columnas': ['Muestra', CONVERSION, PUREZA]},
+    'fig7': {'metodo': 'graficar_gliceridos_promedio', 'archivo': 'fig7_gliceridos_promedio.png',
+             'descripcion': 'Contenido de glicéridos', 'experimentos': None,
+             'columnas': GLICERIDOS},
+    'fig8': {'metodo': 'graficar_area_fames', 'archivo': 'fig8_area_fames.png',
+             'descripcion': 'Área de picos FAMEs', 'experimentos': None,
+             'columnas': ['Muestra', 'Orden', 'Área FAMEs']},
+    'fig9': {'metodo': 'graficar_picos_fames', 'archivo': 'fig9_picos_fames.png',
+             'descripcion': 'Número de picos FAMEs', 'experimentos': None,
+             'columnas': ['Muestra', 'Orden', 'Picos FAMEs']},
+    'fig10': {'metodo': 'graficar_heatmap_calidad', 'archivo': 'fig10_heatmap_calidad.png',
+              'descripcion': 'Mapa de calor de parámetros', 'experimentos': None,
+              'columnas': ['Muestra', 'Orden', CONVERSION, *COMPOSICION]}
+}
+
+
+def experimento_referencia(experimentos):
+    """EXPERIMENTO_REFERENCIA si está entre los experimentos; si no, el primero (None sin experimentos)"""
+    experimentos = list(experimentos)
+    if EXPERIMENTO_REFERENCIA in experimentos:
+        return EXPERIMENTO_REFERENCIA
+    return experimentos[0] if experimentos else None
+
+
+def experimentos_figura(figura, experimentos):
+    """Experimentos que dibuja una figura de FIGURAS (None = todos)"""
+    if figura['experimentos'] == REFERENCIA:
+        referencia = experimento_referencia(experimentos)
+        return [] if referencia is None else [referencia]
+    return figura['experimentos']
+
+
+def seleccionar_figuras(seleccion=None):
+    """Claves de FIGURAS en orden a partir de 'fig3', '3' o el nombre del método; None son todas"""
+    if not seleccion:
+        return list(FIGURAS)
+    por_metodo = {figura['metodo']: clave for clave, figura in FIGURAS.items()}
+    claves = set()
+    for nombre in seleccion:
+        clave = nombre if nombre in FIGURAS else f'fig{nombre}' if f'fig{nombre}' in FIGURAS else por_metodo.get(nombre)
+        if clave is None:
+            raise ValueError(f"Figura desconocida: {nombre} (disponibles: {', '.join(FIGURAS)})")
+        claves.add(clave)
+    return [clave for clave in FIGURAS if clave in claves]
+
+
+def _iniciar_trabajador():
+    # Cada proceso dibuja sin pantalla; el estilo ya viene de importar este módulo
+    plt.switch_backend('Agg')
+
+
+def nombre_corto(experimento):
+    """'Experimento12' -> 'Exp12'; otros nombres se dejan igual"""
+    numero = re.search(r'(\d+)$', experimento)
+    return f'Exp{numero.group(1)}' if numero else experimento
+
+
+def colores_experimentos(experimentos):
+    """Un color por experimento: tab10 hasta 10 experimentos, si no una paleta husl de n colores"""
+    paleta = plt.get_cmap('tab10').colors if len(experimentos) <= 10 else sns.color_palette(PALETA, len(experimentos))
+    return {exp: to_hex(color) for exp, color in zip(experimentos, paleta)}
+
+
+def divisiones(grupos):
+    """Posiciones x de las líneas divisorias entre grupos consecutivos distintos"""
+    grupos = np.asarray(grupos)
+    return np.flatnonzero(grupos[1:] != grupos[:-1]) + 0.5
+
+
+def paginas(n, por_panel, paneles_por_pagina=PANELES_POR_PAGINA):
+    """Reparte n elementos en paneles (slices) de hasta por_panel, agrupados en páginas"""
+    paneles = [slice(i, min(i + por_panel, n)) for i in range(0, n, por_panel)] or [slice(0, 0)]
+    return [paneles[i:i + paneles_por_pagina] for i in range(0, len(paneles), paneles_por_pagina)]
+
+
 class VisualizadorResultados:
-    def __init__(self, procesados_dir):
+    def __init__(self, procesados_dir, base_datos=None):
         self.procesados_dir = Path(procesados_dir)
         self.figuras_dir = self.procesados_dir / 'figuras'
         self.figuras_dir.mkdir(exist_ok=True)
+        # Huellas de las figuras ya dibujadas
+        self.manifiesto = ManifiestoProcesamiento(self.figuras_dir / 'manifiesto_figuras.json')
 
-        # Cargar datos
-        self.tabla = pd.read_csv(self.procesados_dir / 'tabla_resumen.csv')
+        # Cargar datos: de la base SQLite si se indica y existe, si no de la tabla resumen
+        if base_datos is not None and Path(base_datos).exists():
+            with BaseDatosResultados(base_datos) as base:
+                self.tabla = base.tabla_resumen()
+        else:
+            self.tabla = pd.read_csv(self.procesados_dir / 'tabla_resumen.csv')
 
         with open(self.procesados_dir / 'resultados_consolidados.json', 'r') as f:
             self.resultados = json.load(f)
 
-        # Colores para experimentos
-        self.colores_exp = {
-            'Experimento1': '#1f77b4',
-            'Experimento2': '#ff7f0e',
-            'Experimento3': '#2ca02c'
-        }
-
-        # Información de experimentos
-        self.info_exp = {
-            'Experimento1': 'Exp1 (03/10/2025)',
-            'Experimento2': 'Exp2 (20/10/2025)',
-            'Experimento3': 'Exp3 (07/11/2025)'
-        }
+        # Experimentos en el orden de la tabla, con colores y etiquetas derivados de los datos
+        self.experimentos = list(pd.unique(self.tabla['Experimento']))
+        self.colores_exp = colores_experimentos(self.experimentos)
+        fechas = (pd.to_datetime(self.tabla.groupby('Experimento', sort=False)['Fecha'].first(), errors='coerce')
+                  if 'Fecha' in self.tabla.columns else pd.Series(dtype='datetime64[ns]'))
+        fechas = {exp: fechas.get(exp, pd.NaT) for exp in self.experimentos}
+
+        # Información de experimentos: 'Exp1 (03/10/2025)' en leyendas y 'Exp1\n03/10/2025' en ejes
+        self.info_exp = {exp: nombre_corto(exp) if pd.isna(fecha) else f"{nombre_corto(exp)} ({fecha:%d/%m/%Y})"
+                         for exp, fecha in fechas.items()}
+        self.etiquetas_exp = {exp: nombre_corto(exp) if pd.isna(fecha) else f"{nombre_corto(exp)}\n{fecha:%d/%m/%Y}"
+                              for exp, fecha in fechas.items()}
+
+    def _muestras(self):
+        """Tabla ordenada por experimento (orden de la tabla) y orden de muestreo"""
+        posicion = self.tabla['Experimento'].map({exp: i for i, exp in enumerate(self.experimentos)})
+        return (self.tabla.assign(_posicion=posicion)
+                .sort_values(['_posicion', 'Orden'], kind='stable')
+                .drop(columns='_posicion')
+                .reset_index(drop=True))
+
+    def _por_experimento(self, columnas, estadisticos=('mean', 'std')):
+        """Estadísticos por experimento, columnas (columna, estadístico) y filas en el orden de self.experimentos"""
+        return (self.tabla.groupby('Experimento', sort=False)[list(columnas)]
+                .agg(list(estadisticos))
+                .reindex(self.experimentos))
+
+    def _agregar_por_experimento(self):
+        return len(self.tabla) > MAX_MUESTRAS
+
+    def _etiquetas_experimentos(self, ax, x, etiquetas):
+        """Etiquetas de experimento en el eje x, inclinadas si no caben horizontales"""
+        ax.set_xticks(x)
+        if len(x) > 10:
+            ax.set_xticklabels(etiquetas, rotation=45, ha='right', fontsize=9)
+        else:
+            ax.set_xticklabels(etiquetas)
+
+    def _leyenda_experimentos(self, ax, experimentos, loc):
+        """Leyenda de colores por experimento (se omite con más de MAX_LEYENDA experimentos)"""
+        if len(experimentos) > MAX_LEYENDA:
+            return
+        from matplotlib.patches import Patch
+        legend_elements = [Patch(facecolor=self.colores_exp[exp], edgecolor='black', label=self.info_exp[exp])
+                           for exp in experimentos]
+        ax.legend(handles=legend_elements, loc=loc, fontsize=10, ncol=1 + len(experimentos) // 7)
+
+    def _guardar(self, fig, clave, pagina=0):
+        """Guarda una página de una figura; la primera con el nombre de FIGURAS y las demás con _pN"""
+        archivo = FIGURAS[clave]['archivo']
+        if pagina > 0:
+            archivo = f"{Path(archivo).stem}_p{pagina + 1}.png"
+        fig.tight_layout()
+        fig.savefig(self.figuras_dir / archivo, dpi=300, bbox_inches='tight')
+        print(f"  ✓ Guardado: {archivo}")
+        plt.close(fig)
+        return archivo
+
+    def _figura_paginada(self, clave, n, dibujar, por_panel=MAX_EXPERIMENTOS_PANEL, filas_panel=1,
+                         ancho=14, alto_panel=8, primera_pagina=0):
+        """Dibuja n elementos en paneles apilados y páginas; devuelve los archivos
+
+        dibujar(ejes, panel) recibe los filas_panel ejes de un panel y el
+        slice de elementos que le corresponde.
+        """
+        archivos = []
+        for pagina, paneles in enumerate(paginas(n, por_panel), start=primera_pagina):
+            fig, ejes = plt.subplots(len(paneles) * filas_panel, 1, squeeze=False,
+                                     figsize=(ancho, alto_panel * len(paneles)))
+            for ejes_panel, panel in zip(ejes[:, 0].reshape(len(paneles), filas_panel), paneles):
+                dibujar(ejes_panel, panel)
+            archivos.append(self._guardar(fig, clave, pagina))
+        return archivos
+
+    def _barras(self, clave, columna, ylabel, titulo, loc_leyenda, valores_en_barras=False):
+        """Barras de una columna por muestra o, con muchas muestras, promedio ± std por experimento"""
+        if self._agregar_por_experimento():
+            estadisticas = self._por_experimento([columna])
+            grupos = estadisticas.index.to_numpy()
+            etiquetas = [self.etiquetas_exp[exp] for exp in grupos]
+            valores = estadisticas[(columna, 'mean')].to_numpy()
+            errores = estadisticas[(columna, 'std')].fillna(0).to_numpy()
+            xlabel, titulo, por_panel = 'Experimento', f'{titulo} (promedio por experimento)', MAX_EXPERIMENTOS_PANEL
+        else:
+            datos = self._muestras()
+            grupos = datos['Experimento'].to_numpy()
+            etiquetas = datos['Muestra'].to_numpy()
+            valores = datos[columna].to_numpy()
+            errores = None
+            xlabel, por_panel = 'Muestra', MAX_MUESTRAS
+        colores = np.array([self.colores_exp[exp] for exp in grupos])
+
+        def dibujar(ejes, panel):
+            ax = ejes[0]
+            x_pos = np.arange(len(valores[panel]))
+            bars = ax.bar(x_pos, valores[panel], yerr=None if errores is None else errores[panel],
+                          color=colores[panel], alpha=0.7, edgecolor='black', linewidth=1.5, capsize=3)
+
+            ax.set_xlabel(xlabel, fontsize=12, fontweight='bold')
+            ax.set_ylabel(ylabel, fontsize=12, fontweight='bold')
+            ax.set_title(titulo, fontsize=14, fontweight='bold')
+            ax.set_xticks(x_pos)
+            ax.set_xticklabels(etiquetas[panel], rotation=45, ha='right', fontsize=9)
+            ax.grid(True, axis='y', alpha=0.3)
+
+            # Líneas divisorias entre experimentos
+            if errores is None:
+                for x in divisiones(grupos[panel]):
+                    ax.axvline(x=x, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+                self._leyenda_experimentos(ax, list(pd.unique(grupos[panel])), loc_leyenda)
+
+            if valores_en_barras and len(x_pos) <= MAX_VALORES_BARRAS:
+                for bar, valor in zip(bars, valores[panel]):
+                    ax.text(bar.get_x() + bar.get_width()/2., valor + 0.5,
+                            f'{valor:.0f}', ha='center', va='bottom', fontsize=8)
+
+        return self._figura_paginada(clave, len(valores), dibujar, por_panel=por_panel)
 
     def graficar_evolucion_temporal_exp1(self):
-        """Gráfico 1: Evolución temporal para Experimento 1 con ordenamiento cronológico correcto"""
-        print("\nGenerando gráfico 1: Evolución temporal Experimento 1...")
+        """Gráfico 1: Evolución temporal del experimento de referencia con ordenamiento cronológico correcto"""
+        experimento = experimento_referencia(self.experimentos)
+        print(f"\nGenerando gráfico 1: Evolución temporal {experimento}...")
 
-        # Filtrar Experimento 1 y ordenar por campo Orden
-        df_exp1 = self.tabla[self.tabla['Experimento'] == 'Experimento1'].copy()
-        df_exp1 = df_exp1.sort_values('Orden')
+        # Filtrar el experimento, ya ordenado por campo Orden
+        df_exp1 = self._muestras()
+        df_exp1 = df_exp1[df_exp1['Experimento'] == experimento]
 
-        # Tiempos en minutos (cada muestra a 24 min)
-        tiempos = [0, 24, 48, 72, 96, 120]
-        df_exp1['Tiempo_min'] = tiempos[:len(df_exp1)]
+        # Tiempos de muestreo del registro; las tablas anteriores sin esa
+        # columna suponen una muestra cada 24 min
+        if 'Tiempo (min)' in df_exp1.columns and df_exp1['Tiempo (min)'].notna().all():
+            tiempo = df_exp1['Tiempo (min)'].to_numpy()
+        else:
+            tiempo = np.arange(len(df_exp1)) * 24
 
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
 
         # Gráfico 1a: Conversión vs Tiempo
-        ax1.plot(df_exp1['Tiempo_min'], df_exp1['Conversión FAMEs (%)'],
+        ax1.plot(tiempo, df_exp1[CONVERSION],
                 marker='o', linewidth=2, markersize=8, label='Conversión FAMEs', color='#2E86AB')
         ax1.set_xlabel('Tiempo (minutos)', fontsize=12)
-        ax1.set_ylabel('Conversión FAMEs (%)', fontsize=12)
-        ax1.set_title('Evolución Temporal de la Conversión a Biodiesel\nExp1 (03/10/2025) - Muestras ordenadas cronológicamente',
-                     fontsize=14, fontweight='bold')
+        ax1.set_ylabel(CONVERSION, fontsize=12)
+        ax1.set_title(f'Evolución Temporal de la Conversión a Biodiesel\n{self.info_exp[experimento]} - '
+                      'Muestras ordenadas cronológicamente', fontsize=14, fontweight='bold')
         ax1.grid(True, alpha=0.3)
-        ax1.set_ylim([95, 100])
         ax1.legend()
 
         # Añadir anotaciones con nueva nomenclatura
-        for i, row in df_exp1.iterrows():
-            ax1.annotate(f"{row['Muestra']}: {row['Conversión FAMEs (%)']:.2f}%",
-                        (row['Tiempo_min'], row['Conversión FAMEs (%)']),
-                        textcoords="offset points", xytext=(0,10),
-                        ha='center', fontsize=9)
+        if len(df_exp1) <= MAX_ETIQUETAS:
+            for muestra, t, conversion in zip(df_exp1['Muestra'], tiempo, df_exp1[CONVERSION]):
+                ax1.annotate(f"{muestra}: {conversion:.2f}%", (t, conversion),
+                            textcoords="offset points", xytext=(0,10),
+                            ha='center', fontsize=9)
 
         # Gráfico 1b: Pureza y Glicéridos
-        ax2.plot(df_exp1['Tiempo_min'], df_exp1['Pureza (%)'],
+        ax2.plot(tiempo, df_exp1[PUREZA],
                 marker='s', linewidth=2, markersize=8, label='Pureza Biodiesel', color='#06A77D')
-        ax2.plot(df_exp1['Tiempo_min'], df_exp1['Triglicéridos (%)'],
+        ax2.plot(tiempo, df_exp1['Triglicéridos (%)'],
                 marker='^', linewidth=2, markersize=8, label='Triglicéridos', color='#D62828')
         ax2.set_xlabel('Tiempo (minutos)', fontsize=12)
         ax2.set_ylabel('Porcentaje (%)', fontsize=12)
@@ -88,233 +330,139 @@ class VisualizadorResultados:
         ax2.grid(True, alpha=0.3)
         ax2.legend()
 
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig1_evolucion_temporal_exp1.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig1_evolucion_temporal_exp1.png")
-        plt.close()
+        return [self._guardar(fig, 'fig1')]
 
     def graficar_comparacion_experimentos(self):
         """Gráfico 2: Comparación de conversión entre todos los experimentos"""
         print("\nGenerando gráfico 2: Comparación entre experimentos...")
-
-        fig, ax = plt.subplots(figsize=(14, 8))
-
-        # Preparar datos
-        muestras_labels = []
-        conversiones = []
-        colors = []
-
-        for exp in ['Experimento1', 'Experimento2', 'Experimento3']:
-            df_exp = self.tabla[self.tabla['Experimento'] == exp].sort_values('Orden')
-            for _, row in df_exp.iterrows():
-                muestras_labels.append(row['Muestra'])
-                conversiones.append(row['Conversión FAMEs (%)'])
-                colors.append(self.colores_exp[exp])
-
-        # Crear gráfico de barras
-        x_pos = np.arange(len(conversiones))
-        bars = ax.bar(x_pos, conversiones, color=colors, alpha=0.7, edgecolor='black', linewidth=1.5)
-
-        ax.set_xlabel('Muestra', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Conversión FAMEs (%)', fontsize=12, fontweight='bold')
-        ax.set_title('Comparación de Conversión a Biodiesel entre Todos los Experimentos',
-                    fontsize=14, fontweight='bold')
-        ax.set_xticks(x_pos)
-        ax.set_xticklabels(muestras_labels, rotation=45, ha='right', fontsize=9)
-        ax.set_ylim([95, 100])
-        ax.grid(True, axis='y', alpha=0.3)
-
-        # Agregar líneas divisorias entre experimentos
-        ax.axvline(x=5.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-        ax.axvline(x=11.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-
-        # Leyenda
-        from matplotlib.patches import Patch
-        legend_elements = [Patch(facecolor=self.colores_exp[exp], edgecolor='black',
-                                label=self.info_exp[exp])
-                          for exp in ['Experimento1', 'Experimento2', 'Experimento3']]
-        ax.legend(handles=legend_elements, loc='lower right', fontsize=10)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig2_comparacion_experimentos.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig2_comparacion_experimentos.png")
-        plt.close()
+        return self._barras('fig2', CONVERSION, CONVERSION,
+                            'Comparación de Conversión a Biodiesel entre Todos los Experimentos', 'lower right')
 
     def graficar_composicion_apilada(self):
         """Gráfico 3: Composición de muestras (FAMEs vs Glicéridos) - Barras apiladas"""
         print("\nGenerando gráfico 3: Composición de muestras...")
 
-        fig, ax = plt.subplots(figsize=(14, 8))
-
-        # Preparar datos
-        muestras_labels = []
-        purezas = []
-        monogliceridos = []
-        digliceridos = []
-        trigliceridos = []
-
-        for _, row in self.tabla.iterrows():
-            muestras_labels.append(row['Muestra'])
-            purezas.append(row['Pureza (%)'])
-            monogliceridos.append(row['Monoglicéridos (%)'])
-            digliceridos.append(row['Diglicéridos (%)'])
-            trigliceridos.append(row['Triglicéridos (%)'])
-
-        x = np.arange(len(muestras_labels))
-        width = 0.8
-
-        # Crear barras apiladas
-        p1 = ax.bar(x, purezas, width, label='Pureza FAMEs', color='#2ecc71', alpha=0.9)
-        p2 = ax.bar(x, monogliceridos, width, bottom=purezas,
-                   label='Monoglicéridos', color='#e74c3c', alpha=0.9)
-        p3 = ax.bar(x, digliceridos, width,
-                   bottom=np.array(purezas)+np.array(monogliceridos),
-                   label='Diglicéridos', color='#f39c12', alpha=0.9)
-        p4 = ax.bar(x, trigliceridos, width,
-                   bottom=np.array(purezas)+np.array(monogliceridos)+np.array(digliceridos),
-                   label='Triglicéridos', color='#9b59b6', alpha=0.9)
-
-        ax.set_xlabel('Muestra', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Composición (%)', fontsize=12, fontweight='bold')
-        ax.set_title('Composición de Muestras: FAMEs vs Glicéridos Residuales',
-                    fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(muestras_labels, rotation=45, ha='right', fontsize=8)
-        ax.legend(loc='upper right', fontsize=10)
-        ax.grid(True, axis='y', alpha=0.3)
-
-        # Agregar líneas divisorias entre experimentos
-        ax.axvline(x=5.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-        ax.axvline(x=11.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig3_composicion_apilada.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig3_composicion_apilada.png")
-        plt.close()
+        if self._agregar_por_experimento():
+            composicion = self.tabla.groupby('Experimento', sort=False)[COMPOSICION].mean().reindex(self.experimentos)
+            etiquetas = np.array([self.etiquetas_exp[exp] for exp in composicion.index])
+            grupos, xlabel, por_panel = None, 'Experimento', MAX_EXPERIMENTOS_PANEL
+            titulo = 'Composición Promedio por Experimento: FAMEs vs Glicéridos Residuales'
+        else:
+            composicion = self._muestras()
+            etiquetas = composicion['Muestra'].to_numpy()
+            grupos, xlabel, por_panel = composicion['Experimento'].to_numpy(), 'Muestra', MAX_MUESTRAS
+            titulo = 'Composición de Muestras: FAMEs vs Glicéridos Residuales'
+
+        # Base de cada segmento = suma acumulada de los componentes anteriores
+        valores = composicion[COMPOSICION].to_numpy()
+        bases = np.cumsum(valores, axis=1) - valores
+        nombres = ['Pureza FAMEs', *(columna.replace(' (%)', '') for columna in GLICERIDOS)]
+
+        def dibujar(ejes, panel):
+            ax = ejes[0]
+            x = np.arange(len(valores[panel]))
+            for j, (nombre, color) in enumerate(zip(nombres, COLORES_COMPOSICION)):
+                ax.bar(x, valores[panel, j], 0.8, bottom=bases[panel, j], label=nombre, color=color, alpha=0.9)
+
+            ax.set_xlabel(xlabel, fontsize=12, fontweight='bold')
+            ax.set_ylabel('Composición (%)', fontsize=12, fontweight='bold')
+            ax.set_title(titulo, fontsize=14, fontweight='bold')
+            ax.set_xticks(x)
+            ax.set_xticklabels(etiquetas[panel], rotation=45, ha='right', fontsize=8)
+            ax.legend(loc='upper right', fontsize=10)
+            ax.grid(True, axis='y', alpha=0.3)
+
+            # Agregar líneas divisorias entre experimentos
+            if grupos is not None:
+                for x_div in divisiones(grupos[panel]):
+                    ax.axvline(x=x_div, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+
+        return self._figura_paginada('fig3', len(valores), dibujar, por_panel=por_panel)
 
     def graficar_comparacion_temporal_experimentos(self):
         """Gráfico 4: Comparación temporal de conversión y pureza promedio por experimento"""
         print("\nGenerando gráfico 4: Comparación temporal entre experimentos...")
 
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
-
-        experimentos = ['Experimento1', 'Experimento2', 'Experimento3']
-        fechas = ['03/10/2025', '20/10/2025', '07/11/2025']
-        nombres_cortos = ['Exp1', 'Exp2', 'Exp3']
-
-        conversiones_promedio = []
-        conversiones_std = []
-        purezas_promedio = []
-        purezas_std = []
-
-        for exp in experimentos:
-            df_exp = self.tabla[self.tabla['Experimento'] == exp]
-            conversiones_promedio.append(df_exp['Conversión FAMEs (%)'].mean())
-            conversiones_std.append(df_exp['Conversión FAMEs (%)'].std())
-            purezas_promedio.append(df_exp['Pureza (%)'].mean())
-            purezas_std.append(df_exp['Pureza (%)'].std())
-
-        x = np.arange(len(experimentos))
-        width = 0.6
-
-        # Gráfico 4a: Conversión promedio
-        ax1.bar(x, conversiones_promedio, width, yerr=conversiones_std,
-               color=['#3498db', '#e74c3c', '#2ecc71'], alpha=0.7,
-               capsize=5, edgecolor='black', linewidth=1.5)
-        ax1.set_xlabel('Experimento', fontsize=12, fontweight='bold')
-        ax1.set_ylabel('Conversión FAMEs Promedio (%)', fontsize=12, fontweight='bold')
-        ax1.set_title('Evolución Temporal de la Conversión Promedio entre Experimentos',
-                     fontsize=14, fontweight='bold')
-        ax1.set_xticks(x)
-        ax1.set_xticklabels([f'{nombre}\n{fecha}' for nombre, fecha in zip(nombres_cortos, fechas)])
-        ax1.grid(True, axis='y', alpha=0.3)
-        ax1.set_ylim([95, 100])
-
-        # Añadir valores
-        for i, (conv, std) in enumerate(zip(conversiones_promedio, conversiones_std)):
-            ax1.text(i, conv + std + 0.2, f'{conv:.2f}%\n±{std:.2f}',
-                    ha='center', va='bottom', fontsize=10, fontweight='bold')
-
-        # Gráfico 4b: Pureza promedio
-        ax2.bar(x, purezas_promedio, width, yerr=purezas_std,
-               color=['#3498db', '#e74c3c', '#2ecc71'], alpha=0.7,
-               capsize=5, edgecolor='black', linewidth=1.5)
-        ax2.set_xlabel('Experimento', fontsize=12, fontweight='bold')
-        ax2.set_ylabel('Pureza Promedio (%)', fontsize=12, fontweight='bold')
-        ax2.set_title('Evolución Temporal de la Pureza Promedio entre Experimentos',
-                     fontsize=14, fontweight='bold')
-        ax2.set_xticks(x)
-        ax2.set_xticklabels([f'{nombre}\n{fecha}' for nombre, fecha in zip(nombres_cortos, fechas)])
-        ax2.grid(True, axis='y', alpha=0.3)
-
-        # Añadir valores
-        for i, (pur, std) in enumerate(zip(purezas_promedio, purezas_std)):
-            ax2.text(i, pur + std + 0.5, f'{pur:.2f}%\n±{std:.2f}',
-                    ha='center', va='bottom', fontsize=10, fontweight='bold')
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig4_comparacion_temporal.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig4_comparacion_temporal.png")
-        plt.close()
+        estadisticas = self._por_experimento([CONVERSION, PUREZA])
+        colores = np.array([self.colores_exp[exp] for exp in estadisticas.index])
+        etiquetas = np.array([self.etiquetas_exp[exp] for exp in estadisticas.index])
+        paneles = [(CONVERSION, 'Conversión FAMEs Promedio (%)',
+                    'Evolución Temporal de la Conversión Promedio entre Experimentos', 0.2),
+                   (PUREZA, 'Pureza Promedio (%)',
+                    'Evolución Temporal de la Pureza Promedio entre Experimentos', 0.5)]
+
+        def dibujar(ejes, panel):
+            for ax, (columna, ylabel, titulo, separacion) in zip(ejes, paneles):
+                promedios = estadisticas[(columna, 'mean')].to_numpy()[panel]
+                desviaciones = estadisticas[(columna, 'std')].to_numpy()[panel]
+                x = np.arange(len(promedios))
+
+                ax.bar(x, promedios, 0.6, yerr=desviaciones, color=colores[panel], alpha=0.7,
+                       capsize=5, edgecolor='black', linewidth=1.5)
+                ax.set_xlabel('Experimento', fontsize=12, fontweight='bold')
+                ax.set_ylabel(ylabel, fontsize=12, fontweight='bold')
+                ax.set_title(titulo, fontsize=14, fontweight='bold')
+                self._etiquetas_experimentos(ax, x, etiquetas[panel])
+                ax.grid(True, axis='y', alpha=0.3)
+
+                # Añadir valores
+                if len(x) <= MAX_VALORES_BARRAS:
+                    for i, (valor, std) in enumerate(zip(promedios, np.nan_to_num(desviaciones))):
+                        ax.text(i, valor + std + separacion, f'{valor:.2f}%\n±{std:.2f}',
+                                ha='center', va='bottom', fontsize=10, fontweight='bold')
+
+        return self._figura_paginada('fig4', len(estadisticas), dibujar, filas_panel=2, alto_panel=10)
+
+    def _boxplots(self, ejes, panel):
+        """Boxplots de conversión y pureza por experimento para un panel de experimentos"""
+        experimentos = self.experimentos[panel]
+        grupos = self.tabla.groupby('Experimento', sort=False)
+        for ax, columna, color, nombre in zip(ejes, [CONVERSION, PUREZA], ['#3498db', '#2ecc71'],
+                                              ['Conversión', 'Pureza']):
+            datos = [grupos.get_group(exp)[columna].dropna().to_numpy() for exp in experimentos]
+            bp = ax.boxplot(datos, tick_labels=[nombre_corto(exp) for exp in experimentos], patch_artist=True,
+                            showmeans=True, meanline=True)
+            for patch in bp['boxes']:
+                patch.set_facecolor(color)
+                patch.set_alpha(0.7)
+            ax.set_ylabel(columna, fontweight='bold')
+            ax.set_title(f'Distribución de {nombre} por Experimento', fontweight='bold')
+            ax.tick_params(axis='x', rotation=45 if len(experimentos) > 10 else 0)
+            ax.grid(True, alpha=0.3)
+
+    def _histogramas(self, ax3, ax4):
+        """Histogramas globales de conversión y pureza con su media"""
+        for ax, columna, color, nombre in [(ax3, CONVERSION, '#9b59b6', 'Conversión'),
+                                           (ax4, PUREZA, '#e67e22', 'Pureza')]:
+            ax.hist(self.tabla[columna].dropna(), bins=15, color=color,
+                    alpha=0.7, edgecolor='black', linewidth=1.5)
+            ax.set_xlabel(columna, fontweight='bold')
+            ax.set_ylabel('Frecuencia', fontweight='bold')
+            ax.set_title(f'Distribución Global de {nombre}', fontweight='bold')
+            media = self.tabla[columna].mean()
+            ax.axvline(media, color='red', linestyle='--', linewidth=2,
+                       label=f'Media: {media:.2f}%')
+            ax.legend()
+            ax.grid(True, alpha=0.3)
 
     def graficar_estadisticas_boxplot(self):
-        """Gráfico 5: Boxplots de conversión y pureza por experimento"""
-        print("\nGenerando gráfico 5: Distribuciones estadísticas...")
+        """Gráfico 5: Boxplots de conversión y pureza por experimento
 
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-
-        # Gráfico 5a: Boxplot de conversión
-        data_conv = [self.tabla[self.tabla['Experimento'] == exp]['Conversión FAMEs (%)'].values
-                     for exp in ['Experimento1', 'Experimento2', 'Experimento3']]
-        bp1 = ax1.boxplot(data_conv, tick_labels=['Exp1', 'Exp2', 'Exp3'], patch_artist=True,
-                         showmeans=True, meanline=True)
-        for patch in bp1['boxes']:
-            patch.set_facecolor('#3498db')
-            patch.set_alpha(0.7)
-        ax1.set_ylabel('Conversión FAMEs (%)', fontweight='bold')
-        ax1.set_title('Distribución de Conversión por Experimento', fontweight='bold')
-        ax1.grid(True, alpha=0.3)
+        Con más de MAX_EXPERIMENTOS_PANEL experimentos la primera página
+        lleva los histogramas globales y las siguientes los boxplots por panel.
+        """
+        print("\nGenerando gráfico 5: Distribuciones estadísticas...")
 
-        # Gráfico 5b: Boxplot de pureza
-        data_pur = [self.tabla[self.tabla['Experimento'] == exp]['Pureza (%)'].values
-                    for exp in ['Experimento1', 'Experimento2', 'Experimento3']]
-        bp2 = ax2.boxplot(data_pur, tick_labels=['Exp1', 'Exp2', 'Exp3'], patch_artist=True,
-                         showmeans=True, meanline=True)
-        for patch in bp2['boxes']:
-            patch.set_facecolor('#2ecc71')
-            patch.set_alpha(0.7)
-        ax2.set_ylabel('Pureza (%)', fontweight='bold')
-        ax2.set_title('Distribución de Pureza por Experimento', fontweight='bold')
-        ax2.grid(True, alpha=0.3)
+        if len(self.experimentos) <= MAX_EXPERIMENTOS_PANEL:
+            fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+            self._boxplots([ax1, ax2], slice(None))
+            self._histogramas(ax3, ax4)
+            return [self._guardar(fig, 'fig5')]
 
-        # Gráfico 5c: Histograma de conversión global
-        ax3.hist(self.tabla['Conversión FAMEs (%)'], bins=15, color='#9b59b6',
-                alpha=0.7, edgecolor='black', linewidth=1.5)
-        ax3.set_xlabel('Conversión FAMEs (%)', fontweight='bold')
-        ax3.set_ylabel('Frecuencia', fontweight='bold')
-        ax3.set_title('Distribución Global de Conversión', fontweight='bold')
-        media_conv = self.tabla['Conversión FAMEs (%)'].mean()
-        ax3.axvline(media_conv, color='red', linestyle='--', linewidth=2,
-                   label=f'Media: {media_conv:.2f}%')
-        ax3.legend()
-        ax3.grid(True, alpha=0.3)
-
-        # Gráfico 5d: Histograma de pureza global
-        ax4.hist(self.tabla['Pureza (%)'], bins=15, color='#e67e22',
-                alpha=0.7, edgecolor='black', linewidth=1.5)
-        ax4.set_xlabel('Pureza (%)', fontweight='bold')
-        ax4.set_ylabel('Frecuencia', fontweight='bold')
-        ax4.set_title('Distribución Global de Pureza', fontweight='bold')
-        media_pur = self.tabla['Pureza (%)'].mean()
-        ax4.axvline(media_pur, color='red', linestyle='--', linewidth=2,
-                   label=f'Media: {media_pur:.2f}%')
-        ax4.legend()
-        ax4.grid(True, alpha=0.3)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig5_estadisticas_boxplot.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig5_estadisticas_boxplot.png")
-        plt.close()
+        fig, (ax3, ax4) = plt.subplots(1, 2, figsize=(16, 6))
+        self._histogramas(ax3, ax4)
+        return [self._guardar(fig, 'fig5')] + self._figura_paginada(
+            'fig5', len(self.experimentos), self._boxplots, filas_panel=2, ancho=16, alto_panel=12, primera_pagina=1)
 
     def graficar_scatter_conversion_pureza(self):
         """Gráfico 6: Scatter plot - Relación entre Conversión y Pureza"""
@@ -322,248 +470,239 @@ class VisualizadorResultados:
 
         fig, ax = plt.subplots(figsize=(12, 8))
 
-        for exp in ['Experimento1', 'Experimento2', 'Experimento3']:
-            df_exp = self.tabla[self.tabla['Experimento'] == exp]
-            ax.scatter(df_exp['Conversión FAMEs (%)'], df_exp['Pureza (%)'],
-                      label=self.info_exp[exp], s=150, alpha=0.7,
-                      color=self.colores_exp[exp], edgecolors='black', linewidth=1.5)
-
-            # Añadir etiquetas de muestras
-            for _, row in df_exp.iterrows():
-                ax.annotate(row['Muestra'],
-                           (row['Conversión FAMEs (%)'], row['Pureza (%)']),
+        # Puntos más pequeños y sin etiquetas cuando hay muchas muestras
+        muchas = len(self.tabla) > MAX_MUESTRAS
+        if len(self.experimentos) <= MAX_LEYENDA:
+            for exp, df_exp in self.tabla.groupby('Experimento', sort=False):
+                ax.scatter(df_exp[CONVERSION], df_exp[PUREZA],
+                          label=self.info_exp[exp], s=30 if muchas else 150, alpha=0.7,
+                          color=self.colores_exp[exp], edgecolors='black', linewidth=0.5 if muchas else 1.5)
+            ax.legend(fontsize=10)
+        else:
+            ax.scatter(self.tabla[CONVERSION], self.tabla[PUREZA], s=30 if muchas else 150, alpha=0.7,
+                       color=self.tabla['Experimento'].map(self.colores_exp), edgecolors='black',
+                       linewidth=0.5 if muchas else 1.5)
+
+        # Añadir etiquetas de muestras
+        if len(self.tabla) <= MAX_ETIQUETAS:
+            for muestra, conversion, pureza in zip(self.tabla['Muestra'], self.tabla[CONVERSION], self.tabla[PUREZA]):
+                ax.annotate(muestra, (conversion, pureza),
                            textcoords="offset points", xytext=(5,5),
                            ha='left', fontsize=8, alpha=0.7)
 
-        ax.set_xlabel('Conversión FAMEs (%)', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Pureza (%)', fontsize=12, fontweight='bold')
+        ax.set_xlabel(CONVERSION, fontsize=12, fontweight='bold')
+        ax.set_ylabel(PUREZA, fontsize=12, fontweight='bold')
         ax.set_title('Relación entre Conversión y Pureza del Biodiesel',
                     fontsize=14, fontweight='bold')
-        ax.legend(fontsize=10)
         ax.grid(True, alpha=0.3)
 
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig6_scatter_conversion_pureza.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig6_scatter_conversion_pureza.png")
-        plt.close()
+        return [self._guardar(fig, 'fig6')]
 
     def graficar_gliceridos_promedio(self):
         """Gráfico 7: Contenido promedio de glicéridos por experimento"""
         print("\nGenerando gráfico 7: Contenido de glicéridos...")
 
-        fig, ax = plt.subplots(figsize=(14, 8))
-
-        experimentos = ['Experimento1', 'Experimento2', 'Experimento3']
-        nombres_cortos = ['Exp1\n03/10/25', 'Exp2\n20/10/25', 'Exp3\n07/11/25']
-
-        mag_promedio = []
-        dag_promedio = []
-        tag_promedio = []
-
-        for exp in experimentos:
-            df_exp = self.tabla[self.tabla['Experimento'] == exp]
-            mag_promedio.append(df_exp['Monoglicéridos (%)'].mean())
-            dag_promedio.append(df_exp['Diglicéridos (%)'].mean())
-            tag_promedio.append(df_exp['Triglicéridos (%)'].mean())
-
-        x = np.arange(len(experimentos))
+        promedios = self.tabla.groupby('Experimento', sort=False)[GLICERIDOS].mean().reindex(self.experimentos)
+        etiquetas = np.array([self.etiquetas_exp[exp] for exp in promedios.index])
+        valores = promedios.to_numpy()
         width = 0.25
 
-        bars1 = ax.bar(x - width, mag_promedio, width, label='Monoglicéridos',
-                      color='#e74c3c', alpha=0.8, edgecolor='black', linewidth=1.5)
-        bars2 = ax.bar(x, dag_promedio, width, label='Diglicéridos',
-                      color='#f39c12', alpha=0.8, edgecolor='black', linewidth=1.5)
-        bars3 = ax.bar(x + width, tag_promedio, width, label='Triglicéridos',
-                      color='#9b59b6', alpha=0.8, edgecolor='black', linewidth=1.5)
-
-        ax.set_xlabel('Experimento', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Contenido Promedio (%)', fontsize=12, fontweight='bold')
-        ax.set_title('Contenido Promedio de Glicéridos Residuales por Experimento',
-                    fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(nombres_cortos)
-        ax.legend(fontsize=11)
-        ax.grid(True, axis='y', alpha=0.3)
-
-        # Añadir valores en las barras
-        for bars in [bars1, bars2, bars3]:
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{height:.1f}%', ha='center', va='bottom', fontsize=9)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig7_gliceridos_promedio.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig7_gliceridos_promedio.png")
-        plt.close()
+        def dibujar(ejes, panel):
+            ax = ejes[0]
+            x = np.arange(len(valores[panel]))
+            for j, (columna, color) in enumerate(zip(GLICERIDOS, COLORES_COMPOSICION[1:])):
+                bars = ax.bar(x + (j - 1) * width, valores[panel, j], width, label=columna.replace(' (%)', ''),
+                              color=color, alpha=0.8, edgecolor='black', linewidth=1.5)
+                # Añadir valores en las barras
+                if len(x) * len(GLICERIDOS) <= MAX_VALORES_BARRAS:
+                    for bar in bars:
+                        height = bar.get_height()
+                        ax.text(bar.get_x() + bar.get_width()/2., height,
+                               f'{height:.1f}%', ha='center', va='bottom', fontsize=9)
+
+            ax.set_xlabel('Experimento', fontsize=12, fontweight='bold')
+            ax.set_ylabel('Contenido Promedio (%)', fontsize=12, fontweight='bold')
+            ax.set_title('Contenido Promedio de Glicéridos Residuales por Experimento',
+                        fontsize=14, fontweight='bold')
+            self._etiquetas_experimentos(ax, x, etiquetas[panel])
+            ax.legend(fontsize=11)
+            ax.grid(True, axis='y', alpha=0.3)
+
+        return self._figura_paginada('fig7', len(valores), dibujar)
 
     def graficar_area_fames(self):
         """Gráfico 8: Área de picos FAMEs por muestra"""
         print("\nGenerando gráfico 8: Área de picos FAMEs...")
-
-        fig, ax = plt.subplots(figsize=(14, 8))
-
-        muestras = self.tabla['Muestra'].values
-        areas = self.tabla['Área FAMEs'].values
-        colors = [self.colores_exp[exp] for exp in self.tabla['Experimento'].values]
-
-        x_pos = np.arange(len(muestras))
-        bars = ax.bar(x_pos, areas, color=colors, alpha=0.7, edgecolor='black', linewidth=1.5)
-
-        ax.set_xlabel('Muestra', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Área Total de Picos FAMEs', fontsize=12, fontweight='bold')
-        ax.set_title('Área Total de Picos FAMEs por Muestra',
-                    fontsize=14, fontweight='bold')
-        ax.set_xticks(x_pos)
-        ax.set_xticklabels(muestras, rotation=45, ha='right', fontsize=9)
-        ax.grid(True, axis='y', alpha=0.3)
-
-        # Agregar líneas divisorias entre experimentos
-        ax.axvline(x=5.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-        ax.axvline(x=11.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-
-        # Leyenda
-        from matplotlib.patches import Patch
-        legend_elements = [Patch(facecolor=self.colores_exp[exp], edgecolor='black',
-                                label=self.info_exp[exp])
-                          for exp in ['Experimento1', 'Experimento2', 'Experimento3']]
-        ax.legend(handles=legend_elements, loc='upper right', fontsize=10)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig8_area_fames.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig8_area_fames.png")
-        plt.close()
+        return self._barras('fig8', 'Área FAMEs', 'Área Total de Picos FAMEs',
+                            'Área Total de Picos FAMEs por Muestra', 'upper right')
 
     def graficar_picos_fames(self):
         """Gráfico 9: Número de picos FAMEs identificados por muestra"""
         print("\nGenerando gráfico 9: Número de picos FAMEs...")
-
-        fig, ax = plt.subplots(figsize=(14, 8))
-
-        muestras = self.tabla['Muestra'].values
-        picos = self.tabla['Picos FAMEs'].values
-        colors = [self.colores_exp[exp] for exp in self.tabla['Experimento'].values]
-
-        x_pos = np.arange(len(muestras))
-        bars = ax.bar(x_pos, picos, color=colors, alpha=0.7, edgecolor='black', linewidth=1.5)
-
-        ax.set_xlabel('Muestra', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Número de Picos FAMEs', fontsize=12, fontweight='bold')
-        ax.set_title('Número de Picos FAMEs Identificados por Muestra',
-                    fontsize=14, fontweight='bold')
-        ax.set_xticks(x_pos)
-        ax.set_xticklabels(muestras, rotation=45, ha='right', fontsize=9)
-        ax.grid(True, axis='y', alpha=0.3)
-
-        # Agregar líneas divisorias entre experimentos
-        ax.axvline(x=5.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-        ax.axvline(x=11.5, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-
-        # Añadir valores en las barras
-        for i, (bar, pico) in enumerate(zip(bars, picos)):
-            ax.text(bar.get_x() + bar.get_width()/2., pico + 0.5,
-                   f'{int(pico)}', ha='center', va='bottom', fontsize=8)
-
-        # Leyenda
-        from matplotlib.patches import Patch
-        legend_elements = [Patch(facecolor=self.colores_exp[exp], edgecolor='black',
-                                label=self.info_exp[exp])
-                          for exp in ['Experimento1', 'Experimento2', 'Experimento3']]
-        ax.legend(handles=legend_elements, loc='upper right', fontsize=10)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig9_picos_fames.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig9_picos_fames.png")
-        plt.close()
+        return self._barras('fig9', 'Picos FAMEs', 'Número de Picos FAMEs',
+                            'Número de Picos FAMEs Identificados por Muestra', 'upper right',
+                            valores_en_barras=True)
 
     def graficar_heatmap_calidad(self):
-        """Gráfico 10: Heatmap de parámetros de calidad"""
+        """Gráfico 10: Heatmap de parámetros de calidad (por muestra o promedio por experimento)"""
         print("\nGenerando gráfico 10: Heatmap de parámetros de calidad...")
 
-        fig, ax = plt.subplots(figsize=(14, 10))
-
-        # Preparar datos para heatmap
-        parametros = ['Conversión FAMEs (%)', 'Pureza (%)',
-                     'Monoglicéridos (%)', 'Diglicéridos (%)', 'Triglicéridos (%)']
-        muestras = self.tabla['Muestra'].values
-
-        # Normalizar datos para visualización (0-1)
-        data_matrix = []
-        for param in parametros:
-            values = self.tabla[param].values
-            # Normalizar
-            norm_values = (values - values.min()) / (values.max() - values.min())
-            data_matrix.append(norm_values)
-
-        data_matrix = np.array(data_matrix)
-
-        # Crear heatmap
-        im = ax.imshow(data_matrix, cmap='RdYlGn', aspect='auto')
-
-        # Configurar ejes
-        ax.set_xticks(np.arange(len(muestras)))
-        ax.set_yticks(np.arange(len(parametros)))
-        ax.set_xticklabels(muestras, rotation=45, ha='right', fontsize=9)
-        ax.set_yticklabels(parametros, fontsize=10)
-
-        # Agregar colorbar
-        cbar = plt.colorbar(im, ax=ax)
-        cbar.set_label('Valor Normalizado (0-1)', rotation=270, labelpad=20, fontweight='bold')
-
-        # Añadir valores reales en las celdas
-        for i in range(len(parametros)):
-            for j in range(len(muestras)):
-                valor_real = self.tabla[parametros[i]].values[j]
-                text = ax.text(j, i, f'{valor_real:.1f}',
-                             ha="center", va="center", color="black", fontsize=7)
-
-        ax.set_title('Mapa de Calor: Parámetros de Calidad por Muestra',
-                    fontsize=14, fontweight='bold', pad=20)
-
-        # Agregar líneas divisorias entre experimentos
-        ax.axvline(x=5.5, color='white', linestyle='-', linewidth=2)
-        ax.axvline(x=11.5, color='white', linestyle='-', linewidth=2)
-
-        plt.tight_layout()
-        plt.savefig(self.figuras_dir / 'fig10_heatmap_calidad.png', dpi=300, bbox_inches='tight')
-        print(f"  ✓ Guardado: fig10_heatmap_calidad.png")
-        plt.close()
-
-    def generar_todos_graficos(self):
-        """Genera todos los gráficos"""
+        parametros = [CONVERSION, *COMPOSICION]
+        if self._agregar_por_experimento():
+            datos = self.tabla.groupby('Experimento', sort=False)[parametros].mean().reindex(self.experimentos)
+            columnas = np.array([nombre_corto(exp) for exp in datos.index])
+            grupos, por_panel = None, MAX_EXPERIMENTOS_PANEL
+            titulo = 'Mapa de Calor: Parámetros de Calidad Promedio por Experimento'
+        else:
+            datos = self._muestras()
+            columnas = datos['Muestra'].to_numpy()
+            grupos, por_panel = datos['Experimento'].to_numpy(), MAX_MUESTRAS
+            titulo = 'Mapa de Calor: Parámetros de Calidad por Muestra'
+
+        # Normalizar cada parámetro a 0-1 sobre todos los paneles
+        valores = datos[parametros].to_numpy(dtype=float).T
+        minimo = np.nanmin(valores, axis=1, keepdims=True)
+        rango = np.nanmax(valores, axis=1, keepdims=True) - minimo
+        with np.errstate(invalid='ignore', divide='ignore'):
+            normalizados = np.where(rango > 0, (valores - minimo) / rango, 0.5)
+
+        def dibujar(ejes, panel):
+            ax = ejes[0]
+            im = ax.imshow(normalizados[:, panel], cmap='RdYlGn', aspect='auto', vmin=0, vmax=1)
+
+            # Configurar ejes
+            ax.set_xticks(np.arange(len(columnas[panel])))
+            ax.set_yticks(np.arange(len(parametros)))
+            ax.set_xticklabels(columnas[panel], rotation=45, ha='right', fontsize=9)
+            ax.set_yticklabels(parametros, fontsize=10)
+
+            cbar = plt.colorbar(im, ax=ax)
+            cbar.set_label('Valor Normalizado (0-1)', rotation=270, labelpad=20, fontweight='bold')
+
+            # Añadir valores reales en las celdas
+            for (i, j), valor_real in np.ndenumerate(valores[:, panel]):
+                ax.text(j, i, f'{valor_real:.1f}', ha="center", va="center", color="black", fontsize=7)
+
+            ax.set_title(titulo, fontsize=14, fontweight='bold', pad=20)
+
+            # Agregar líneas divisorias entre experimentos
+            if grupos is not None:
+                for x in divisiones(grupos[panel]):
+                    ax.axvline(x=x, color='white', linestyle='-', linewidth=2)
+
+        return self._figura_paginada('fig10', len(columnas), dibujar, por_panel=por_panel, alto_panel=10)
+
+    def codigo_figura(self, metodo):
+        """Código de un método y de todo lo que usa de este módulo
+
+        Recorre recursivamente los métodos referidos como self.<nombre>
+        (_barras, _figura_paginada, _boxplots, _guardar...) y las funciones
+        del módulo llamadas por nombre, de modo que un cambio en un auxiliar
+        también invalida las figuras que lo usan.
+        """
+        funciones = {nombre: f for nombre, f in globals().items()
+                     if inspect.isfunction(f) and f.__module__ == __name__}
+        codigo = {}
+        pendientes = [('self', metodo)]
+        while pendientes:
+            ambito, nombre = pendientes.pop()
+            objeto = getattr(type(self), nombre, None) if ambito == 'self' else funciones.get(nombre)
+            if not inspect.isfunction(objeto) or (ambito, nombre) in codigo:
+                continue
+            fuente = inspect.getsource(objeto)
+            codigo[(ambito, nombre)] = fuente
+            pendientes += [('self', atributo) for atributo in re.findall(r'self\.([A-Za-z_]\w*)', fuente)]
+            pendientes += [('modulo', llamado) for llamado in re.findall(r'\b([A-Za-z_]\w*)\s*\(', fuente)]
+        return [codigo[clave] for clave in sorted(codigo)]
+
+    def huella_figura(self, clave):
+        """Parámetros de la caché de una figura: su recorte de la tabla, el estilo y el código
+        del método y de sus auxiliares"""
+        figura = FIGURAS[clave]
+        datos = self.tabla
+        experimentos = experimentos_figura(figura, self.experimentos)
+        if experimentos is not None:
+            datos = datos[datos['Experimento'].isin(experimentos)]
+        datos = datos.reindex(columns=['Experimento', *figura['columnas']])
+        return {
+            'datos': datos.to_json(orient='split', index=False, force_ascii=False),
+            'estilo': [ESTILO, PALETA, list(plt.rcParams['figure.figsize']), plt.rcParams['font.size']],
+            'colores': self.colores_exp,
+            'etiquetas': self.info_exp,
+            'limites': [MAX_MUESTRAS, MAX_EXPERIMENTOS_PANEL, PANELES_POR_PAGINA, MAX_LEYENDA, MAX_ETIQUETAS,
+                        MAX_VALORES_BARRAS],
+            'codigo': self.codigo_figura(figura['metodo'])
+        }
+
+    def graficar(self, clave):
+        """Genera una figura de FIGURAS y devuelve sus archivos (uno por página)"""
+        figura = FIGURAS[clave]
+        # Las páginas de una ejecución anterior con más datos no deben quedar sueltas
+        for anterior in self.figuras_dir.glob(f"{Path(figura['archivo']).stem}_p*.png"):
+            anterior.unlink()
+        return getattr(self, figura['metodo'])()
+
+    def generar_todos_graficos(self, figuras=None, workers=None, forzar=False):
+        """Genera todos los gráficos (o las claves de FIGURAS indicadas)
+
+        Una figura solo se vuelve a dibujar si cambió su huella (datos de los
+        que depende, estilo o código) o su PNG; forzar=True las redibuja todas.
+        Con workers > 1 cada figura es una tarea independiente en un
+        ProcessPoolExecutor cuyos procesos dibujan con el backend Agg.
+        """
         print("=" * 80)
         print("GENERACIÓN DE GRÁFICOS CON NUEVA NOMENCLATURA")
         print("=" * 80)
 
-        self.graficar_evolucion_temporal_exp1()
-        self.graficar_comparacion_experimentos()
-        self.graficar_composicion_apilada()
-        self.graficar_comparacion_temporal_experimentos()
-        self.graficar_estadisticas_boxplot()
-        self.graficar_scatter_conversion_pureza()
-        self.graficar_gliceridos_promedio()
-        self.graficar_area_fames()
-        self.graficar_picos_fames()
-        self.graficar_heatmap_calidad()
+        claves = seleccionar_figuras(figuras)
+        huellas = {clave: self.huella_figura(clave) for clave in claves}
+        pendientes = [clave for clave in claves
+                      if forzar or self.manifiesto.vigente(clave, [], huellas[clave]) is None]
+
+        if workers and workers > 1 and len(pendientes) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_trabajador) as executor:
+                archivos = dict(zip(pendientes, executor.map(self.graficar, pendientes)))
+        else:
+            archivos = {clave: self.graficar(clave) for clave in pendientes}
+
+        for clave in pendientes:
+            self.manifiesto.registrar(clave, [], huellas[clave],
+                                      derivados=[self.figuras_dir / archivo for archivo in archivos[clave]],
+                                      resultado=archivos[clave])
+        self.manifiesto.guardar()
 
         print("\n" + "=" * 80)
         print("GENERACIÓN COMPLETADA")
         print("=" * 80)
         print(f"\nTodas las figuras guardadas en: {self.figuras_dir}")
-        print(f"Total de gráficos generados: 10")
+        print(f"Total de gráficos generados: {len(pendientes)} (sin cambios: {len(claves) - len(pendientes)})")
         print("\nÍndice de figuras:")
-        print("  fig1_evolucion_temporal_exp1.png - Evolución temporal Exp1")
-        print("  fig2_comparacion_experimentos.png - Comparación entre experimentos")
-        print("  fig3_composicion_apilada.png - Composición de muestras")
-        print("  fig4_comparacion_temporal.png - Comparación temporal promedio")
-        print("  fig5_estadisticas_boxplot.png - Distribuciones estadísticas")
-        print("  fig6_scatter_conversion_pureza.png - Relación conversión-pureza")
-        print("  fig7_gliceridos_promedio.png - Contenido de glicéridos")
-        print("  fig8_area_fames.png - Área de picos FAMEs")
-        print("  fig9_picos_fames.png - Número de picos FAMEs")
-        print("  fig10_heatmap_calidad.png - Mapa de calor de parámetros")
+        for clave in claves:
+            figura = FIGURAS[clave]
+            registro = self.manifiesto.datos['unidades'].get(clave, {})
+            extra = len(registro.get('resultado') or [figura['archivo']]) - 1
+            print(f"  {figura['archivo']} - {figura['descripcion']}"
+                  f"{f' (+{extra} páginas)' if extra else ''}"
+                  f"{'' if clave in pendientes else ' (sin cambios)'}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera las figuras de resultados')
+    parser.add_argument('--base-datos', action='store_true',
+                        help=f'Leer la tabla de resultados de Procesados/{NOMBRE_BASE_DATOS}')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Número de procesos para generar las figuras en paralelo')
+    parser.add_argument('--figuras', nargs='+', default=None, metavar='FIG',
+                        help=f"Figuras a generar ({', '.join(FIGURAS)}; por defecto todas)")
+    parser.add_argument('--forzar', action='store_true',
+                        help='Redibujar las figuras aunque sus datos no hayan cambiado')
+    args = parser.parse_args()
+
+    try:
+        seleccionar_figuras(args.figuras)
+    except ValueError as e:
+        parser.error(str(e))
+
     procesados_dir = '/home/user/ExperimentosBiodiesel_row/Procesados'
-    visualizador = VisualizadorResultados(procesados_dir)
-    visualizador.generar_todos_graficos()
+    visualizador = VisualizadorResultados(
+        procesados_dir, base_datos=Path(procesados_dir) / NOMBRE_BASE_DATOS if args.base_datos else None)
+    visualizador.generar_todos_graficos(figuras=args.figuras, workers=args.workers, forzar=args.forzar)